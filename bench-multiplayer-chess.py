@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Chess Rules Benchmark - perft check and move validation throughput
+Runs perft on the standard test positions (node counts must match the
+published ones, so this doubles as the move generator's test), then
+measures how many client moves per second multiplayer_chess validates
+the way the server does: parse, legality check, play.
+**Timestamp**: 2026-10-18
+
+Usage: python bench-multiplayer-chess.py [--depth 3] [--games 200] [--seed 1] [--json]
+Exits non-zero if any perft count is wrong.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from multiplayer_chess import START_FEN, ChessBoard, IllegalMove
+
+# (name, FEN, node counts for depth 1, 2, ...) from the Chess Programming Wiki perft results
+PERFT_POSITIONS = [
+    ('start', START_FEN, [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238, 674624]),
+    ('position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333]),
+    ('position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379, 2103487]),
+    ('position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594]),
+]
+MAX_PLIES = 200
+
+
+def run_perft(depth, log):
+    """Every position to `depth` (or its deepest known count); returns (results, all correct)"""
+    results = []
+    ok = True
+    for name, fen, counts in PERFT_POSITIONS:
+        d = min(depth, len(counts))
+        board = ChessBoard(fen)
+        started = time.perf_counter()
+        nodes = board.perft(d)
+        seconds = time.perf_counter() - started
+        correct = nodes == counts[d - 1] and board.fen() == fen
+        ok = ok and correct
+        results.append({
+            'position': name,
+            'depth': d,
+            'nodes': nodes,
+            'expected': counts[d - 1],
+            'nodes_per_second': round(nodes / seconds, 1)
+        })
+        print(f"{'✅' if correct else '❌'} {name:<11} depth {d}: {nodes:>9} nodes "
+              f"(expected {counts[d - 1]}), {nodes / seconds:,.0f} nodes/s", file=log)
+    return results, ok
+
+
+def random_games(count, seed):
+    """Random legal games as the row/col dicts chess.html sends"""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = ChessBoard()
+        moves = []
+        while len(moves) < MAX_PLIES and board.outcome() is None:
+            move = rng.choice(board.legal_moves())
+            from_square, to_square = move & 63, (move >> 6) & 63
+            moves.append({'fromRow': 7 - (from_square >> 3), 'fromCol': from_square & 7,
+                          'toRow': 7 - (to_square >> 3), 'toCol': to_square & 7,
+                          'promotion': 'qrbn'[4 - ((move >> 12) & 7)] if (move >> 12) & 7 else None})
+            board.push(move)
+        games.append(moves)
+    return games
+
+
+def bench_validation(games):
+    """Replay every game through ChessBoard.play, plus one illegal attempt per move"""
+    validated = rejected = 0
+    started = time.perf_counter()
+    for moves in games:
+        board = ChessBoard()
+        for move in moves:
+            # A piece moving onto its own square is never legal
+            try:
+                board.play({'fromRow': move['fromRow'], 'fromCol': move['fromCol'],
+                            'toRow': move['fromRow'], 'toCol': move['fromCol']})
+            except IllegalMove:
+                rejected += 1
+            board.play(move)
+            validated += 1
+    seconds = time.perf_counter() - started
+    return {
+        'games': len(games),
+        'moves': validated,
+        'rejected': rejected,
+        'validations_per_second': round((validated + rejected) / seconds, 1),
+        'microseconds_per_validation': round(seconds / (validated + rejected) * 1e6, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and benchmark the multiplayer chess move validator')
+    parser.add_argument('--depth', type=int, default=3, help='perft depth (4 takes a few minutes)')
+    parser.add_argument('--games', type=int, default=200, help='random games to validate')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    log = sys.stderr if args.json else sys.stdout
+    print(f"🧮 Perft to depth {args.depth}...", file=log)
+    perft, ok = run_perft(args.depth, log)
+
+    print(f"🎲 Generating {args.games} random games...", file=log)
+    validation = bench_validation(random_games(args.games, args.seed))
+
+    if args.json:
+        print(json.dumps({'perft': perft, 'perft_ok': ok, 'validation': validation}, indent=2))
+    else:
+        print()
+        print(f"♟️  {validation['moves']} moves + {validation['rejected']} illegal attempts from "
+              f"{validation['games']} games: {validation['validations_per_second']:,.0f} validations/s "
+              f"({validation['microseconds_per_validation']} µs each)")
+    if not ok:
+        print("❌ Perft mismatch: the move generator is wrong", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Multiplayer Database Benchmark - read latency before/after the indexes
+Fills a scratch database with synthetic games, times the player-history
+and leaderboard queries on the original schema, then lets MultiplayerDB
+migrate it and times the same reads again.
+**Timestamp**: 2026-10-18
+
+Usage: python bench-multiplayer-db.py [--games 1000000] [--players 20000] [--db PATH] [--json]
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from multiplayer_db import MultiplayerDB
+
+GAME_TYPES = ['chess', 'checkers', 'connect4', 'go', 'shogi', 'reversi']
+
+# The queries as they were before migration v1
+LEGACY_QUERIES = {
+    'player_history': ('''
+        SELECT * FROM games
+        WHERE player1_id = ? OR player2_id = ?
+        ORDER BY finished_at DESC
+        LIMIT 10
+    ''', lambda player_id, game_type: (player_id, player_id)),
+    'league_table': ('''
+        SELECT * FROM league_standings
+        WHERE total_games > 0
+        ORDER BY points DESC, win_rate DESC, total_games DESC
+        LIMIT 50
+    ''', lambda player_id, game_type: ()),
+    'game_type_leaderboard': ('''
+        SELECT ps.*, p.player_name
+        FROM player_statistics ps
+        JOIN players p ON ps.player_id = p.player_id
+        WHERE ps.game_type = ? AND ps.games_played > 0
+        ORDER BY ps.win_rate DESC, ps.games_played DESC
+        LIMIT 20
+    ''', lambda player_id, game_type: (game_type,)),
+}
+
+
+def populate(conn, games, players, seed=42):
+    """Bulk-load synthetic players, games, stats and standings"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    player_ids = [f'p{i:06d}' for i in range(players)]
+    stamp = now.isoformat()
+
+    conn.executemany(
+        'INSERT INTO players (player_id, player_name, first_seen, last_seen, created_at) '
+        'VALUES (?, ?, ?, ?, ?)',
+        ((pid, f'Player {pid}', stamp, stamp, stamp) for pid in player_ids)
+    )
+
+    def game_rows():
+        for i in range(games):
+            p1, p2 = rng.sample(player_ids, 2)
+            started = now - timedelta(seconds=rng.randrange(365 * 86400))
+            finished = started + timedelta(seconds=rng.randrange(60, 3600))
+            winner = rng.choice((p1, p2, None))
+            yield (f'g{i:08d}', rng.choice(GAME_TYPES), p1, p2, f'Player {p1}', f'Player {p2}',
+                   winner, 'finished', rng.randrange(10, 120), started.isoformat(),
+                   finished.isoformat(), int((finished - started).total_seconds()))
+
+    conn.executemany('''
+        INSERT INTO games
+        (game_id, game_type, player1_id, player2_id, player1_name, player2_name,
+         winner_id, status, move_count, started_at, finished_at, duration_seconds)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', game_rows())
+
+    # Aggregates straight from the games table
+    conn.execute('''
+        INSERT INTO player_statistics
+        (player_id, game_type, games_played, wins, losses, draws, win_rate, last_played)
+        SELECT player_id, game_type, COUNT(*),
+               SUM(winner_id = player_id),
+               SUM(winner_id IS NOT NULL AND winner_id != player_id),
+               SUM(winner_id IS NULL),
+               100.0 * SUM(winner_id = player_id) / COUNT(*),
+               MAX(finished_at)
+        FROM (SELECT player1_id AS player_id, game_type, winner_id, finished_at FROM games
+              UNION ALL
+              SELECT player2_id, game_type, winner_id, finished_at FROM games)
+        GROUP BY player_id, game_type
+    ''')
+    conn.execute('''
+        INSERT INTO league_standings
+        (player_id, player_name, total_games, wins, losses, draws, win_rate, points, last_updated)
+        SELECT ps.player_id, p.player_name, SUM(games_played), SUM(wins), SUM(losses), SUM(draws),
+               100.0 * SUM(wins) / SUM(games_played), 3 * SUM(wins) + SUM(draws), ?
+        FROM player_statistics ps JOIN players p ON p.player_id = ps.player_id
+        GROUP BY ps.player_id
+    ''', (stamp,))
+    conn.commit()
+    return player_ids
+
+
+def time_calls(fn, args_list):
+    """Latency in ms for each call"""
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'calls': len(ordered),
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        'max_ms': round(ordered[-1], 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark MultiplayerDB read queries')
+    parser.add_argument('--games', type=int, default=1_000_000)
+    parser.add_argument('--players', type=int, default=20_000)
+    parser.add_argument('--queries', type=int, default=200, help='calls per query type')
+    parser.add_argument('--db', type=Path, help='scratch database path (default: temp dir)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    workdir = None
+    if args.db is None:
+        workdir = tempfile.TemporaryDirectory()
+        args.db = Path(workdir.name) / 'bench.db'
+    elif args.db.exists():
+        print(f"❌ {args.db} already exists; pass a fresh path", file=sys.stderr)
+        sys.exit(1)
+
+    log = sys.stderr if args.json else sys.stdout
+    print(f"📦 Generating {args.games:,} games for {args.players:,} players...", file=log)
+    started = time.perf_counter()
+    with redirect_stdout(log):
+        MultiplayerDB(args.db).close()
+    # Back to the original schema: no indexes, no migrations applied
+    conn = sqlite3.connect(str(args.db))
+    indexes = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+    ).fetchall()
+    for (name,) in indexes:
+        conn.execute(f'DROP INDEX {name}')
+    conn.execute('PRAGMA user_version = 0')
+    conn.execute('PRAGMA synchronous=OFF')
+    player_ids = populate(conn, args.games, args.players)
+    print(f"   done in {time.perf_counter() - started:.1f}s", file=log)
+
+    rng = random.Random(7)
+    sample = [(rng.choice(player_ids), rng.choice(GAME_TYPES)) for _ in range(args.queries)]
+
+    results = {'games': args.games, 'players': args.players, 'before': {}, 'after': {}}
+    for name, (sql, params) in LEGACY_QUERIES.items():
+        run = lambda player_id, game_type: conn.execute(sql, params(player_id, game_type)).fetchall()
+        results['before'][name] = summarize(time_calls(run, sample))
+    conn.close()
+
+    started = time.perf_counter()
+    with redirect_stdout(log):
+        db = MultiplayerDB(args.db)
+    results['migration_seconds'] = round(time.perf_counter() - started, 2)
+    results['after'] = {
+        'player_history': summarize(time_calls(lambda pid, gt: db.get_player_stats(pid), sample)),
+        'league_table': summarize(time_calls(lambda pid, gt: db.get_league_table(50), sample)),
+        'game_type_leaderboard': summarize(
+            time_calls(lambda pid, gt: db.get_game_type_leaderboard(gt, 20), sample)
+        ),
+    }
+    db.close()
+    if workdir:
+        workdir.cleanup()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"🔧 Migration (index build) took {results['migration_seconds']}s")
+    print()
+    print(f"{'query':<24}{'before p50':>12}{'before p99':>12}{'after p50':>12}{'after p99':>12}")
+    for name in LEGACY_QUERIES:
+        before, after = results['before'][name], results['after'][name]
+        print(f"{name:<24}{before['p50_ms']:>10.3f}ms{before['p99_ms']:>10.3f}ms"
+              f"{after['p50_ms']:>10.3f}ms{after['p99_ms']:>10.3f}ms")
+    print()
+    print("ℹ️  'after' player_history is the full get_player_stats() call (profile, per-type stats, recent games)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Game Journal Benchmark - recovery time by journal size
+Journals N active chess games of M moves each with multiplayer_journal,
+then times what a restarted server does: replay the log (which also
+compacts it), load the resulting snapshot, and rebuild each game's board
+with multiplayer_chess. Also reports append throughput with batched fsync.
+**Timestamp**: 2026-10-18
+
+Usage: python bench-multiplayer-journal.py [--games 100 1000 5000] [--moves 40] [--json]
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from multiplayer_chess import ChessBoard
+from multiplayer_journal import GameJournal
+
+SAMPLE_GAMES = 50  # Distinct random games, reused round-robin across game ids
+WRITER_THREADS = 8  # Concurrent producers, like moves arriving from many games at once
+
+
+def sample_games(moves, seed):
+    """Random legal games (UCI) at least `moves` plies long where possible"""
+    rng = random.Random(seed)
+    games = []
+    while len(games) < SAMPLE_GAMES:
+        board = ChessBoard()
+        line = []
+        while len(line) < moves and board.outcome() is None:
+            move = rng.choice(board.legal_moves())
+            line.append(board.uci(move))
+            board.push(move)
+        games.append(line)
+    return games
+
+
+def write_journal(directory, game_count, lines):
+    """Journal `game_count` games from several threads; returns (seconds, journal stats)"""
+    journal = GameJournal(directory, compact_records=10 ** 9)  # One long log, no snapshot
+    journal.recover()
+    journal.start()
+
+    def produce(worker):
+        for index in range(worker, game_count, WRITER_THREADS):
+            game_id = f'g{index:07d}'
+            players = [[f'w{index}', 'White'], [f'b{index}', 'Black']]
+            journal.record('start', game_id=game_id, game_type='chess', players=players,
+                           tokens={players[0][0]: 'x', players[1][0]: 'y'}, started_at='2026-10-18T00:00:00')
+            for ply, move in enumerate(lines[index % len(lines)]):
+                journal.record('move', game_id=game_id, player_id=players[ply % 2][0],
+                               move=move, timestamp='2026-10-18T00:00:00')
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(worker,)) for worker in range(WRITER_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.flush()
+    seconds = time.perf_counter() - started
+    stats = journal.stats()
+    journal.close()
+    return seconds, stats
+
+
+def rebuild_boards(games):
+    """What the server does per recovered chess game"""
+    for saved in games.values():
+        board = ChessBoard()
+        for entry in saved['moves']:
+            board.play(entry['move'], validate=False)
+
+
+def bench_size(game_count, lines):
+    with tempfile.TemporaryDirectory() as directory:
+        write_seconds, write_stats = write_journal(directory, game_count, lines)
+        log_bytes = (Path(directory) / 'games.journal').stat().st_size
+
+        started = time.perf_counter()
+        games = GameJournal(directory).recover()  # Replays the log, then compacts it
+        replay_seconds = time.perf_counter() - started
+        snapshot_bytes = (Path(directory) / 'games.snapshot').stat().st_size
+
+        started = time.perf_counter()
+        games = GameJournal(directory).recover()  # Snapshot only
+        snapshot_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        rebuild_boards(games)
+        rebuild_seconds = time.perf_counter() - started
+
+    records = write_stats['records']
+    return {
+        'games': len(games),
+        'records': records,
+        'log_mb': round(log_bytes / 1e6, 2),
+        'snapshot_mb': round(snapshot_bytes / 1e6, 2),
+        'append_records_per_second': round(records / write_seconds, 1),
+        'fsyncs': write_stats['batches'],
+        'replay_seconds': round(replay_seconds, 3),
+        'snapshot_load_seconds': round(snapshot_seconds, 3),
+        'board_rebuild_seconds': round(rebuild_seconds, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark multiplayer game journal recovery')
+    parser.add_argument('--games', type=int, nargs='+', default=[100, 1000, 5000],
+                        help='active games in the journal')
+    parser.add_argument('--moves', type=int, default=40, help='moves per game')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    log = sys.stderr if args.json else sys.stdout
+    lines = sample_games(args.moves, args.seed)
+    results = []
+    for game_count in args.games:
+        print(f"📝 {game_count} games x {args.moves} moves...", file=log)
+        results.append(bench_size(game_count, lines))
+
+    if args.json:
+        print(json.dumps({'moves_per_game': args.moves, 'runs': results}, indent=2))
+        return
+
+    print()
+    print(f"{'games':>7}{'records':>9}{'log MB':>8}{'append/s':>10}{'fsyncs':>8}"
+          f"{'replay s':>10}{'snap s':>8}{'boards s':>10}")
+    for run in results:
+        print(f"{run['games']:>7}{run['records']:>9}{run['log_mb']:>8.2f}{run['append_records_per_second']:>10.0f}"
+              f"{run['fsyncs']:>8}{run['replay_seconds']:>10.3f}{run['snapshot_load_seconds']:>8.3f}"
+              f"{run['board_rebuild_seconds']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Multiplayer Load Test - latency under a realistic session mix
+Drives multiplayer-server.py with thousands of simulated players, each
+going through register -> join -> moves and chat -> game_end. Reports
+p50/p90/p99 latency for connecting, pairing, move acknowledgement,
+move and chat delivery to the opponent, and saving the finished game
+to the database, plus message throughput. The JSON result records the
+git commit so runs can be compared between commits (--compare).
+**Timestamp**: 2026-10-18
+
+Usage: python bench-multiplayer-load.py [--clients 1000] [--moves 20] [--chats 2]
+                                        [--workers 1 | --url ws://host:9877]
+                                        [--output result.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import aiohttp
+import websockets
+
+SERVER = Path(__file__).resolve().parent / 'multiplayer-server.py'
+CONNECT_CONCURRENCY = 50  # per client process, keeps SYN bursts under the listen backlog
+RECV_TIMEOUT = 60.0  # A player waiting this long for anything counts as stalled
+DB_POLL_INTERVAL = 0.01  # Seconds between checks that a finished game is in the database
+DB_POLL_TIMEOUT = 10.0
+# Knights out and back: always legal, so chess games go through server-side validation
+LINES = {'white': ['g1f3', 'f3g1'], 'black': ['g8f6', 'f6g8']}
+LATENCIES = ('connect', 'pairing', 'move_ack', 'move_delivery', 'chat_delivery', 'db_save')
+
+
+async def receive(ws):
+    return json.loads(await asyncio.wait_for(ws.recv(), RECV_TIMEOUT))
+
+
+async def saved_in_database(http, http_url, player_id, game_id):
+    """Poll the stats API until the game shows up in the player's recent games"""
+    deadline = time.perf_counter() + DB_POLL_TIMEOUT
+    while time.perf_counter() < deadline:
+        async with http.get(f'{http_url}/api/player/{player_id}/stats') as response:
+            if response.status == 503:
+                return False  # Server runs without a database
+            if response.status == 200:
+                stats = await response.json()
+                if any(game['game_id'] == game_id for game in stats.get('recent_games', [])):
+                    return True
+        await asyncio.sleep(DB_POLL_INTERVAL)
+    return False
+
+
+async def play_session(ws, player_id, game_type, moves, chats, db_every, http, http_url, out):
+    """One player's game, from join to game_saved; timings go into `out`"""
+    started = time.perf_counter()
+    await ws.send(json.dumps({'type': 'join', 'game_type': game_type}))
+    out['sent'] += 1
+    while True:
+        message = await receive(ws)
+        out['received'] += 1
+        if message['type'] == 'game_started':
+            break
+    out['pairing'].append(time.perf_counter() - started)
+    game_id = message['game_id']
+    color = message['your_color']
+    my_turn = message['your_turn']
+    line = LINES[color]
+    first_ply = 0 if color == 'white' else 1
+    chat_after = {(i + 1) * moves // (chats + 1) for i in range(chats)}
+
+    made = acked = received = chats_in = 0
+    pending_ack = {}  # ply -> perf_counter at send
+    saved = False
+
+    async def move():
+        nonlocal made
+        ply = first_ply + 2 * made
+        pending_ack[ply] = time.perf_counter()
+        out['move_sent'][f'{game_id}:{ply}'] = time.time()
+        await ws.send(json.dumps({'type': 'move', 'game_id': game_id, 'move': line[made % 2]}))
+        made += 1
+        out['sent'] += 1
+        if made in chat_after:
+            key = f'{game_id}:{color}:{made}'
+            out['chat_sent'][key] = time.time()
+            await ws.send(json.dumps({'type': 'chat', 'game_id': game_id, 'message': key}))
+            out['sent'] += 1
+
+    if my_turn:
+        await move()
+    while made < moves or acked < made or received < moves or chats_in < len(chat_after):
+        message = await receive(ws)
+        out['received'] += 1
+        kind = message['type']
+        if kind == 'move_applied':
+            ply = first_ply + 2 * acked
+            out['move_ack'].append(time.perf_counter() - pending_ack.pop(ply))
+            acked += 1
+        elif kind == 'opponent_move':
+            out['move_received'][f'{game_id}:{1 - first_ply + 2 * received}'] = time.time()
+            received += 1
+            if made < moves:
+                await move()
+        elif kind == 'chat':
+            out['chat_received'][message['message']] = time.time()
+            chats_in += 1
+        elif kind == 'game_saved':
+            saved = True
+        elif kind == 'error':
+            out['errors'] += 1
+            return
+
+    if color == 'white':
+        ended = time.perf_counter()
+        await ws.send(json.dumps({'type': 'game_end', 'game_id': game_id, 'result': 'draw'}))
+        out['sent'] += 1
+    while not saved:
+        message = await receive(ws)
+        out['received'] += 1
+        saved = message['type'] == 'game_saved'
+    out['games'] += color == 'white'
+    if color == 'white' and zlib.crc32(game_id.encode()) % db_every == 0:
+        if await saved_in_database(http, http_url, player_id, game_id):
+            out['db_save'].append(time.perf_counter() - ended)
+
+
+async def client_load(url, http_url, names, game_type, moves, chats, db_every, barrier):
+    """All of one process's players; returns raw timings for the parent to merge"""
+    out = {key: [] for key in LATENCIES if not key.endswith('_delivery')}
+    out.update(move_sent={}, move_received={}, chat_sent={}, chat_received={},
+               sent=0, received=0, games=0, errors=0, stalled=0)
+    limit = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def connect(name):
+        async with limit:
+            started = time.perf_counter()
+            ws = await websockets.connect(url, max_queue=None, open_timeout=RECV_TIMEOUT)
+            await ws.send(json.dumps({'type': 'register', 'name': name}))
+            registered = await receive(ws)
+            out['connect'].append(time.perf_counter() - started)
+            out['sent'] += 1
+            out['received'] += 1
+            return ws, registered['player_id']
+
+    clients = await asyncio.gather(*(connect(name) for name in names))
+    # Everyone joins at once, so pairing latency is the matchmaker's and not connect stragglers'
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+    out['play_started'] = time.time()
+
+    async def session(ws, player_id):
+        try:
+            await play_session(ws, player_id, game_type, moves, chats, db_every, http, http_url, out)
+        except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed):
+            out['stalled'] += 1
+
+    async with aiohttp.ClientSession() as http:
+        await asyncio.gather(*(session(ws, player_id) for ws, player_id in clients))
+    out['play_finished'] = time.time()
+    await asyncio.gather(*(ws.close() for ws, _ in clients))
+    return out
+
+
+def run_client_process(args, barrier, results):
+    try:
+        results.put(asyncio.run(client_load(*args, barrier)))
+    except Exception as e:
+        barrier.abort()
+        results.put({'failed': f'{type(e).__name__}: {e}'})
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not open port {port}')
+
+
+def distribution(seconds):
+    """Nearest-rank percentiles in milliseconds"""
+    if not seconds:
+        return {'count': 0}
+    ordered = sorted(seconds)
+
+    def rank(fraction):
+        return round(ordered[min(len(ordered) - 1, max(0, int(fraction * len(ordered) + 0.5) - 1))] * 1000, 2)
+    return {'count': len(ordered), 'p50': rank(0.50), 'p90': rank(0.90), 'p99': rank(0.99),
+            'max': round(ordered[-1] * 1000, 2)}
+
+
+def deliveries(sent, received):
+    return [received[key] - sent[key] for key in received.keys() & sent.keys()]
+
+
+def merge(outs):
+    """Combine every process's raw timings into the result document"""
+    merged = {key: [] for key in LATENCIES}
+    sent_at, received_at = {'move': {}, 'chat': {}}, {'move': {}, 'chat': {}}
+    for out in outs:
+        for key in ('connect', 'pairing', 'move_ack', 'db_save'):
+            merged[key].extend(out[key])
+        for kind in ('move', 'chat'):
+            sent_at[kind].update(out[f'{kind}_sent'])
+            received_at[kind].update(out[f'{kind}_received'])
+    for kind in ('move', 'chat'):
+        merged[f'{kind}_delivery'] = deliveries(sent_at[kind], received_at[kind])
+
+    play_seconds = max(out['play_finished'] for out in outs) - min(out['play_started'] for out in outs)
+    messages = sum(out['sent'] + out['received'] for out in outs)
+    return {
+        'games': sum(out['games'] for out in outs),
+        'errors': sum(out['errors'] for out in outs),
+        'stalled': sum(out['stalled'] for out in outs),
+        'play_seconds': round(play_seconds, 3),
+        'messages_per_second': round(messages / play_seconds, 1),
+        'moves_per_second': round(len(merged['move_ack']) / play_seconds, 1),
+        'latency_ms': {key: distribution(merged[key]) for key in LATENCIES}
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER.parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_load(args, url, http_url):
+    per_proc = args.clients // args.client_procs // 2 * 2  # even, so every player gets paired
+    barrier = multiprocessing.Barrier(args.client_procs)
+    results = multiprocessing.Queue()
+    db_every = max(1, per_proc * args.client_procs // 2 // max(1, args.db_samples))
+    processes = []
+    for proc in range(args.client_procs):
+        names = [f'Load{proc * per_proc + i}' for i in range(per_proc)]
+        process = multiprocessing.Process(target=run_client_process, args=(
+            (url, http_url, names, args.game_type, args.moves, args.chats, db_every), barrier, results))
+        process.start()
+        processes.append(process)
+    outs = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    failed = [out['failed'] for out in outs if 'failed' in out]
+    if failed:
+        raise RuntimeError(f'client process failed: {failed[0]}')
+    return per_proc * args.client_procs, merge(outs)
+
+
+def run_with_server(args):
+    """Start a throwaway server (fresh database) for the run"""
+    with tempfile.TemporaryDirectory() as workdir:
+        server = subprocess.Popen(
+            [sys.executable, str(SERVER), '--workers', str(args.workers),
+             '--port', str(args.port), '--http-port', str(args.port + 1)],
+            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for_port(args.port)
+            wait_for_port(args.port + 1)
+            time.sleep(1.0 + 0.25 * args.workers)  # let every worker bind the shared port
+            return run_load(args, f'ws://127.0.0.1:{args.port}', f'http://127.0.0.1:{args.port + 1}')
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+
+def print_report(document, log):
+    results = document['results']
+    print(file=log)
+    print(f"{'latency (ms)':<16}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}", file=log)
+    for key, dist in results['latency_ms'].items():
+        if dist['count']:
+            print(f"{key:<16}{dist['count']:>8}{dist['p50']:>10.2f}{dist['p90']:>10.2f}"
+                  f"{dist['p99']:>10.2f}{dist['max']:>10.2f}", file=log)
+        else:
+            print(f"{key:<16}{0:>8}{'-':>10}{'-':>10}{'-':>10}{'-':>10}", file=log)
+    print(file=log)
+    print(f"📨 {results['messages_per_second']:.0f} messages/s, {results['moves_per_second']:.0f} moves/s, "
+          f"{results['games']} games in {results['play_seconds']:.1f}s", file=log)
+    if results['errors'] or results['stalled']:
+        print(f"⚠️  {results['errors']} player(s) got errors, {results['stalled']} stalled", file=log)
+
+
+def print_comparison(baseline, document, log):
+    """Side by side with an earlier result; negative latency change is better"""
+    old, new = baseline['results'], document['results']
+    print(file=log)
+    print(f"📊 vs {baseline.get('commit') or 'baseline'} -> {document.get('commit') or 'this run'}", file=log)
+    rows = [(f"{key} {p}", old['latency_ms'][key].get(p), new['latency_ms'][key].get(p))
+            for key in LATENCIES for p in ('p50', 'p99')]
+    rows += [(key, old[key], new[key]) for key in ('messages_per_second', 'moves_per_second')]
+    for label, before, after in rows:
+        if before is None or after is None:
+            continue
+        change = f"{(after - before) / before * 100:+.1f}%" if before else ''
+        print(f"  {label:<22}{before:>10.2f}{after:>10.2f}{change:>9}", file=log)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test multiplayer-server.py with simulated players')
+    parser.add_argument('--clients', type=int, default=1000, help='concurrent players (even)')
+    parser.add_argument('--moves', type=int, default=20, help='moves per player')
+    parser.add_argument('--chats', type=int, default=2, help='chat messages per player')
+    parser.add_argument('--game-type', default='chess', help="'chess' moves are validated by the server")
+    parser.add_argument('--db-samples', type=int, default=50,
+                        help='finished games to follow until they are in the database')
+    parser.add_argument('--client-procs', type=int, default=os.cpu_count() or 1,
+                        help='load-generating processes')
+    parser.add_argument('--workers', type=int, default=1, help='server workers (when starting one)')
+    parser.add_argument('--port', type=int, default=19877, help='port for the server started here')
+    parser.add_argument('--url', help='load an already running server instead, e.g. ws://127.0.0.1:9877')
+    parser.add_argument('--http-url', help='its statistics API (default: WebSocket port + 1)')
+    parser.add_argument('--output', help='write the JSON result to this file')
+    parser.add_argument('--compare', help='earlier JSON result to compare against')
+    parser.add_argument('--json', action='store_true', help='print the JSON result')
+    args = parser.parse_args()
+
+    if args.client_procs * 2 > args.clients:
+        args.client_procs = max(1, args.clients // 2)
+    log = sys.stderr if args.json else sys.stdout
+    target = args.url or f'{args.workers} worker(s)'
+    print(f"🚀 {args.clients} players x {args.moves} moves, {args.chats} chats -> {target}...", file=log)
+    if args.url:
+        parts = urlsplit(args.url)
+        http_url = args.http_url or f'http://{parts.hostname}:{(parts.port or 80) + 1}'
+        clients, results = run_load(args, args.url, http_url)
+    else:
+        clients, results = run_with_server(args)
+
+    document = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cpus': os.cpu_count(),
+        'config': {
+            'clients': clients, 'moves': args.moves, 'chats': args.chats, 'game_type': args.game_type,
+            'client_procs': args.client_procs, 'workers': None if args.url else args.workers,
+            'url': args.url
+        },
+        'results': results
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2) + '\n')
+    if args.json:
+        print(json.dumps(document, indent=2))
+    else:
+        print_report(document, log)
+    if args.compare:
+        print_comparison(json.loads(Path(args.compare).read_text()), document, log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Multiplayer Server Benchmark - throughput by worker count
+Starts multiplayer-server.py with --workers N for each N and drives it
+from several client processes. Measures the connection rate (connect +
+register) and the message rate (matched pairs trading moves; every move
+is one message in and two out).
+**Timestamp**: 2026-10-18
+
+Usage: python bench-multiplayer-server.py [--workers 1 2 4] [--clients 400] [--moves 100] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import websockets
+
+SERVER = Path(__file__).resolve().parent / 'multiplayer-server.py'
+CONNECT_CONCURRENCY = 50  # per client process, keeps SYN bursts under the listen backlog
+
+
+async def connect(url, name, limit):
+    async with limit:
+        ws = await websockets.connect(url, max_queue=None)
+        await ws.send(json.dumps({'type': 'register', 'name': name}))
+        await ws.recv()
+        return ws
+
+
+async def play(ws, moves):
+    """Join, then alternate moves with the opponent until both made `moves`"""
+    await ws.send(json.dumps({'type': 'join', 'game_type': 'bench'}))
+    game_id = None
+    made = received = messages = 0
+    while made < moves or received < moves:
+        message = json.loads(await ws.recv())
+        messages += 1
+        kind = message['type']
+        if kind == 'game_started':
+            game_id = message['game_id']
+            my_turn = message['your_turn']
+        elif kind == 'opponent_move':
+            received += 1
+            my_turn = True
+        else:
+            continue
+        if my_turn and made < moves:
+            await ws.send(json.dumps({'type': 'move', 'game_id': game_id, 'move': made}))
+            made += 1
+    return made, messages
+
+
+async def client_load(port, clients, moves, offset):
+    url = f'ws://127.0.0.1:{port}'
+    limit = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    result = {'connect_started': time.time()}
+    sockets = await asyncio.gather(*(connect(url, f'Bench{offset + i}', limit) for i in range(clients)))
+    result['connect_finished'] = time.time()
+    outcomes = await asyncio.gather(*(play(ws, moves) for ws in sockets))
+    result['play_finished'] = time.time()
+    result['moves'] = sum(made for made, _ in outcomes)
+    result['messages'] = sum(messages for _, messages in outcomes)
+    await asyncio.gather(*(ws.close() for ws in sockets))
+    return result
+
+
+def run_client_process(args):
+    return asyncio.run(client_load(*args))
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not open port {port}')
+
+
+def bench_workers(workers, clients, moves, procs, port):
+    """One server run; returns throughput figures"""
+    with tempfile.TemporaryDirectory() as workdir:
+        server = subprocess.Popen(
+            [sys.executable, str(SERVER), '--workers', str(workers),
+             '--port', str(port), '--http-port', str(port + 1)],
+            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for_port(port)
+            time.sleep(1.0 + 0.25 * workers)  # let every worker bind the shared port
+            per_proc = clients // procs // 2 * 2  # even, so every player gets paired
+            with multiprocessing.Pool(procs) as pool:
+                results = pool.map(run_client_process,
+                                   [(port, per_proc, moves, i * per_proc) for i in range(procs)])
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    total = per_proc * procs
+    connect_seconds = max(r['connect_finished'] for r in results) - min(r['connect_started'] for r in results)
+    play_seconds = max(r['play_finished'] for r in results) - max(r['connect_finished'] for r in results)
+    moves_made = sum(r['moves'] for r in results)
+    messages = sum(r['messages'] for r in results)
+    return {
+        'workers': workers,
+        'clients': total,
+        'connections_per_second': round(total / connect_seconds, 1),
+        'moves_per_second': round(moves_made / play_seconds, 1),
+        'messages_per_second': round((moves_made + messages) / play_seconds, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark multiplayer-server.py throughput by worker count')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=400, help='concurrent players (even)')
+    parser.add_argument('--moves', type=int, default=100, help='moves per player')
+    parser.add_argument('--client-procs', type=int, default=os.cpu_count() or 1,
+                        help='load-generating processes')
+    parser.add_argument('--port', type=int, default=19877)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    if max(args.workers) > 1 and (sys.platform == 'win32' or not hasattr(socket, 'SO_REUSEPORT')):
+        print("❌ Worker mode needs SO_REUSEPORT and Unix sockets", file=sys.stderr)
+        sys.exit(1)
+
+    log = sys.stderr if args.json else sys.stdout
+    results = []
+    for workers in args.workers:
+        print(f"🚀 {workers} worker(s): {args.clients} players x {args.moves} moves...", file=log)
+        results.append(bench_workers(workers, args.clients, args.moves, args.client_procs, args.port))
+
+    if args.json:
+        print(json.dumps({'cpus': os.cpu_count(), 'runs': results}, indent=2))
+        return
+
+    base = results[0]
+    print()
+    print(f"{'workers':>8}{'conn/s':>10}{'moves/s':>11}{'msgs/s':>11}{'scaling':>9}")
+    for run in results:
+        print(f"{run['workers']:>8}{run['connections_per_second']:>10.0f}{run['moves_per_second']:>11.0f}"
+              f"{run['messages_per_second']:>11.0f}{run['messages_per_second'] / base['messages_per_second']:>8.2f}x")
+    print()
+    print(f"ℹ️  {os.cpu_count()} CPU(s); clients and server share them, so scaling stops at the core count")
+
+
+if __name__ == '__main__':
+    main()
@@ -387,6 +387,9 @@ function handleBoardClick(squareMesh) {
 }
 
 function movePiece(piece, toRow, toCol) {
+    const fromRow = piece.row;
+    const fromCol = piece.col;
+    
     // Check multiplayer mode
     const urlParams = new URLSearchParams(window.location.search);
     const isMultiplayer = urlParams.get('multiplayer') === 'true';
@@ -424,7 +427,7 @@ function movePiece(piece, toRow, toCol) {
     if (isMultiplayer && window.sendMove && window.currentGame) {
         const game = window.currentGame();
         if (game && game.game_id) {
-            window.sendMove(game.game_id, JSON.stringify({fromRow: piece.row, fromCol: piece.col, toRow, toCol}));
+            window.sendMove(game.game_id, JSON.stringify({fromRow, fromCol, toRow, toCol}));
         }
     }
     
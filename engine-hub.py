@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Engine Hub - Stockfish, YaneuraOu and KataGo in one process
+All three backends share one event loop and keep their usual ports
+(9543 chess, 9544 shogi, 9545 go), so the front-ends need no changes.
+**Timestamp**: 2026-10-18
+
+Usage: python engine-hub.py [stockfish] [shogi] [go]   (default: all)
+"""
+
+import sys
+
+from engine_bridge import KataGoBridge, StockfishBridge, YaneuraOuBridge, run_hub
+
+BRIDGES = {
+    'stockfish': StockfishBridge,
+    'chess': StockfishBridge,
+    'shogi': YaneuraOuBridge,
+    'yaneuraou': YaneuraOuBridge,
+    'go': KataGoBridge,
+    'katago': KataGoBridge,
+}
+
+def main():
+    names = [name.lower() for name in sys.argv[1:]] or ['stockfish', 'shogi', 'go']
+    unknown = [name for name in names if name not in BRIDGES]
+    if unknown:
+        print(f"❌ Unknown engine(s): {', '.join(unknown)}", file=sys.stderr)
+        print("   Choose from: stockfish, shogi, go", file=sys.stderr)
+        sys.exit(1)
+
+    selected = []
+    for name in names:
+        if BRIDGES[name] not in selected:
+            selected.append(BRIDGES[name])
+    run_hub([bridge() for bridge in selected])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""
+Engine Bridge - shared async backend for the chess, shogi and go engines
+**Timestamp**: 2026-10-18
+
+One core (process management, pooling, timeouts, result caching, metrics)
+with protocol adapters for UCI (Stockfish), USI (YaneuraOu) and GTP (KataGo).
+Each backend can run on its own (stockfish-server.py, shogi-server.py,
+go-server.py) or all of them on one event loop (engine-hub.py).
+"""
+
+from .core import EngineMetrics, EnginePool, EngineProcess, ResultCache
+from .protocols import GTPEngine, GTPError, UCIEngine, USIEngine, parse_bestmove, parse_info
+from .server import EngineBridge, PooledSearchBridge, create_app, run_bridge, run_hub
+from .stockfish import StockfishBridge
+from .shogi import YaneuraOuBridge
+from .go import KataGoBridge
+
+__all__ = [
+    'EngineMetrics', 'EnginePool', 'EngineProcess', 'ResultCache',
+    'GTPEngine', 'GTPError', 'UCIEngine', 'USIEngine', 'parse_bestmove', 'parse_info',
+    'EngineBridge', 'PooledSearchBridge', 'create_app', 'run_bridge', 'run_hub',
+    'StockfishBridge', 'YaneuraOuBridge', 'KataGoBridge',
+]
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Engine Bridge Core - processes, pooling, caching and metrics
+Shared by the Stockfish, YaneuraOu and KataGo backends
+**Timestamp**: 2026-10-18
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import subprocess
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from server_metrics import counter, histogram
+
+log = logging.getLogger(__name__)
+
+REQUEST_SECONDS = histogram('engine_request_duration_seconds',
+                            'Engine backend request latency by operation', ('engine', 'operation'))
+REQUEST_ERRORS = counter('engine_request_errors_total',
+                         'Engine backend requests that failed or timed out', ('engine', 'operation'))
+STOPPED_SEARCHES = counter('engine_searches_stopped_total',
+                           'Searches cut short (deadline passed or client gone), by how the engine wound down',
+                           ('engine', 'outcome'))
+
+STOP_GRACE = 2.0  # Seconds a stopped search may take to wind down before the process is killed
+
+
+class EngineProcess:
+    """
+    One engine subprocess speaking a line-based protocol.
+
+    Protocol adapters (UCI, USI, GTP) subclass this and implement start();
+    everything about spawning, writing, reading and shutting down the
+    process lives here.
+    """
+    quit_command = 'quit'
+    stop_grace = STOP_GRACE
+
+    def __init__(self, exe_path, args=(), name='Engine'):
+        self.exe_path = exe_path
+        self.args = list(args)
+        self.name = name
+        self.process = None
+        self.stopped = 0  # Searches cut short that wound down cleanly
+        self.killed = 0  # ...and ones that didn't, so the process was killed
+        # Everything the engine prints, at DEBUG (SERVER_LOG_LEVEL=debug, thinned by SERVER_LOG_SAMPLE)
+        self.output_log = logging.getLogger(f'engine_bridge.output.{name.lower()}')
+
+    def is_alive(self):
+        """Check whether the process is still running"""
+        return self.process is not None and self.process.returncode is None
+
+    def needs_restart(self):
+        """True when the process can't safely serve another request"""
+        return not self.is_alive()
+
+    async def spawn(self, stderr=subprocess.DEVNULL):
+        """Start the process (stderr is discarded unless a subclass reads it)"""
+        self.process = await asyncio.create_subprocess_exec(
+            self.exe_path,
+            *self.args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=stderr
+        )
+
+    async def start(self):
+        """Start the process and complete the protocol handshake"""
+        await self.spawn()
+
+    async def send_command(self, command):
+        """Send one command line"""
+        if self.process and self.process.stdin:
+            self.process.stdin.write(f"{command}\n".encode())
+            await self.process.stdin.drain()
+
+    async def readline(self):
+        """Next output line without the newline, or None at EOF"""
+        line = await self.process.stdout.readline()
+        if not line:
+            return None
+        decoded = line.decode(errors='replace').strip()
+        if self.output_log.isEnabledFor(logging.DEBUG):
+            self.output_log.debug('%s: %s', self.name, decoded)
+        return decoded
+
+    async def wait_for(self, expected):
+        """Wait for a line containing `expected`; None if the process exits"""
+        while True:
+            decoded = await self.readline()
+            if decoded is None:
+                return None
+            if expected in decoded:
+                return decoded
+
+    async def kill(self):
+        """Kill the process now; it is started again before its next request"""
+        if self.is_alive():
+            self.killed += 1
+            STOPPED_SEARCHES.labels(self.name, 'killed').inc()
+            self.process.kill()
+            await self.process.wait()
+
+    async def stop(self):
+        """Ask the process to quit, killing it if it doesn't"""
+        if self.is_alive():
+            try:
+                await self.send_command(self.quit_command)
+                await asyncio.wait_for(self.process.wait(), timeout=2)
+            except (asyncio.TimeoutError, ConnectionResetError, BrokenPipeError):
+                self.process.kill()
+                await self.process.wait()
+
+
+class PooledEngine:
+    """Pool slot: one engine process plus its health record"""
+    def __init__(self, slot, engine):
+        self.slot = slot
+        self.engine = engine
+        self.requests = 0
+        self.failures = 0
+        self.restarts = 0
+        self.busy = False
+        self.healthy = False
+        self.last_error = None
+        self.last_used = None
+
+    def stats(self):
+        """Health summary for /api/status"""
+        return {
+            'slot': self.slot,
+            'pid': self.engine.process.pid if self.engine.process else None,
+            'alive': self.engine.is_alive(),
+            'healthy': self.healthy,
+            'busy': self.busy,
+            'requests': self.requests,
+            'failures': self.failures,
+            'restarts': self.restarts,
+            'stopped': self.engine.stopped,
+            'killed': self.engine.killed,
+            'last_error': self.last_error
+        }
+
+
+class EnginePool:
+    """
+    Fixed-size pool of engine processes.
+
+    Each request checks out one whole process, so command sequences never
+    interleave on a shared pipe. Requests that arrive while every process
+    is busy wait in FIFO order on the idle queue. A process that comes
+    back dead or dirty is restarted in the background before it rejoins
+    the queue, so the next request doesn't wait for the restart.
+    """
+    def __init__(self, factory, size, name='Engine'):
+        self.name = name
+        self.size = size
+        self.slots = [PooledEngine(i, factory()) for i in range(size)]
+        self.idle = asyncio.Queue()
+        self.waiting = 0
+        self.recovering = set()  # Background restart tasks
+
+    async def start(self):
+        """Start every engine in the pool concurrently"""
+        results = await asyncio.gather(
+            *(self._start_slot(slot) for slot in self.slots),
+            return_exceptions=True
+        )
+        started = 0
+        for slot, result in zip(self.slots, results):
+            if isinstance(result, Exception):
+                slot.last_error = str(result)
+                log.error("⚠️  %s pool slot %d failed to start: %s", self.name, slot.slot, result)
+            else:
+                started += 1
+            # Failed slots are still queued; checkout retries them
+            self.idle.put_nowait(slot)
+        if not started:
+            raise RuntimeError(f'No {self.name} process could be started')
+        log.info("✅ %s pool ready: %d/%d processes", self.name, started, self.size)
+
+    async def _start_slot(self, slot):
+        """(Re)start the process behind one slot"""
+        await slot.engine.stop()
+        await slot.engine.start()
+        slot.healthy = True
+
+    async def _restart(self, slot):
+        """Replace a dead or misbehaving process"""
+        slot.restarts += 1
+        log.warning("⚠️  Restarting %s pool slot %d", self.name, slot.slot)
+        await self._start_slot(slot)
+
+    async def checkout(self):
+        """Take an idle engine, waiting in line if all are busy"""
+        self.waiting += 1
+        try:
+            slot = await self.idle.get()
+        finally:
+            self.waiting -= 1
+        if not slot.healthy or slot.engine.needs_restart():
+            try:
+                await self._restart(slot)
+            except BaseException as e:  # Including a request cancelled mid-restart
+                slot.healthy = False
+                slot.last_error = str(e) or type(e).__name__
+                self.idle.put_nowait(slot)
+                raise
+        slot.busy = True
+        return slot
+
+    def checkin(self, slot, error=None):
+        """Return an engine to the pool, restarting it first on error"""
+        slot.busy = False
+        slot.last_used = time.time()
+        if error is not None:
+            slot.failures += 1
+            slot.healthy = False
+            slot.last_error = str(error) or type(error).__name__
+        if slot.healthy and not slot.engine.needs_restart():
+            self.idle.put_nowait(slot)
+            return
+        task = asyncio.create_task(self._recover(slot))
+        self.recovering.add(task)
+        task.add_done_callback(self.recovering.discard)
+
+    async def _recover(self, slot):
+        """Background restart; a slot that still fails is queued anyway and checkout retries it"""
+        try:
+            await self._restart(slot)
+        except Exception as e:
+            slot.healthy = False
+            slot.last_error = str(e)
+            log.error("⚠️  %s pool slot %d failed to restart: %s", self.name, slot.slot, e)
+        finally:
+            self.idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """`async with pool.acquire() as engine:` checkout/checkin helper"""
+        slot = await self.checkout()
+        try:
+            yield slot.engine
+        except BaseException as e:
+            # A consumer that stopped early (closed stream, cancelled
+            # request, deadline) is fine as long as the engine drained its
+            # output; anything else may leave junk on the pipe, so recycle it
+            interrupted = isinstance(e, (GeneratorExit, asyncio.CancelledError, asyncio.TimeoutError))
+            if interrupted and not slot.engine.needs_restart():
+                slot.requests += 1
+                self.checkin(slot)
+            else:
+                self.checkin(slot, error=e)
+            raise
+        else:
+            slot.requests += 1
+            self.checkin(slot)
+
+    async def stop(self):
+        """Terminate every engine in the pool"""
+        for task in list(self.recovering):
+            task.cancel()
+        await asyncio.gather(*(slot.engine.stop() for slot in self.slots),
+                             return_exceptions=True)
+
+    def stats(self):
+        """Pool occupancy and per-process health"""
+        return {
+            'size': self.size,
+            'idle': self.idle.qsize(),
+            'busy': sum(1 for slot in self.slots if slot.busy),
+            'waiting': self.waiting,
+            'engines': [slot.stats() for slot in self.slots]
+        }
+
+
+class SharedSearch:
+    """A search in flight and how many requests are still waiting for it"""
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class ResultCache:
+    """
+    Engine result cache keyed on a tuple built by the bridge (position plus
+    whatever search settings change the answer).
+
+    In-memory LRU with optional TTL, optionally backed by a SQLite file so
+    common positions survive restarts. Concurrent requests for the same key
+    share one engine search instead of each running their own; the search
+    is cancelled once every request waiting for it has gone.
+    """
+    def __init__(self, namespace, max_size=10000, ttl=None, db_path=None):
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (value, stored_at)
+        self.pending = {}  # key -> SharedSearch for searches in flight
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.db = None
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path):
+        """Open (and create) the persistent backing store"""
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(db_path))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS engine_results (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        ''')
+        self.db.commit()
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def get(self, key):
+        """Look up a result, refreshing its LRU position"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            if not self._expired(stored_at):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+            self.expirations += 1
+
+        if self.db is not None:
+            row = self.db.execute(
+                'SELECT value, stored_at FROM engine_results WHERE namespace = ? AND key = ?',
+                (self.namespace, json.dumps(key))
+            ).fetchone()
+            if row and not self._expired(row[1]):
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def _remember(self, key, value, stored_at):
+        """Insert into the in-memory LRU, evicting the oldest entries"""
+        self.entries[key] = (value, stored_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, key, value):
+        """Store a freshly computed result"""
+        now = time.time()
+        self._remember(key, value, now)
+        if self.db is not None:
+            self.db.execute(
+                'INSERT OR REPLACE INTO engine_results (namespace, key, value, stored_at) '
+                'VALUES (?, ?, ?, ?)',
+                (self.namespace, json.dumps(key), json.dumps(value), now)
+            )
+            self.db.commit()
+
+    async def get_or_compute(self, key, compute):
+        """
+        Return (value, cached). On a miss, `compute()` runs once per key even
+        if several requests for the same key arrive while it is in flight.
+        It runs as its own task: a request that is cancelled (client gone)
+        leaves it running for the others, and the last one to leave
+        cancels it.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+
+        search = self.pending.get(key)
+        cached = search is not None
+        if cached:
+            self.coalesced += 1
+        else:
+            search = self.pending[key] = SharedSearch(asyncio.create_task(self._compute(key, compute)))
+        search.waiters += 1
+        try:
+            return await asyncio.shield(search.task), cached
+        finally:
+            search.waiters -= 1
+            if not search.waiters and not search.task.done():
+                # Nobody wants the answer any more; a new request starts afresh
+                self.abandoned += 1
+                search.task.cancel()
+                if self.pending.get(key) is search:
+                    del self.pending[key]
+
+    async def _compute(self, key, compute):
+        try:
+            value = await compute()
+            if value is not None:
+                self.put(key, value)
+            return value
+        finally:
+            if key in self.pending and self.pending[key].task is asyncio.current_task():
+                del self.pending[key]
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def stats(self):
+        """Hit/miss counters for /api/status"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'persistent': self.db is not None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'disk_hits': self.disk_hits,
+            'coalesced': self.coalesced,
+            'abandoned': self.abandoned,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class EngineMetrics:
+    """
+    Per-operation request counts, errors and latency for /api/status,
+    also fed to the engine_request_* histograms on /metrics
+    """
+    def __init__(self, engine='Engine'):
+        self.engine = engine
+        self.operations = {}  # name -> {count, errors, total, max}
+        self.series = {}  # name -> (latency histogram, error counter)
+
+    def observe(self, operation, seconds, error=False):
+        stats = self.operations.setdefault(
+            operation, {'count': 0, 'errors': 0, 'total': 0.0, 'max': 0.0}
+        )
+        stats['count'] += 1
+        stats['total'] += seconds
+        stats['max'] = max(stats['max'], seconds)
+        series = self.series.get(operation)
+        if series is None:
+            series = self.series[operation] = (REQUEST_SECONDS.labels(self.engine, operation),
+                                               REQUEST_ERRORS.labels(self.engine, operation))
+        series[0].observe(seconds)
+        if error:
+            stats['errors'] += 1
+            series[1].inc()
+
+    @asynccontextmanager
+    async def time(self, operation):
+        """`async with metrics.time('move'):` records duration and failures"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(operation, time.perf_counter() - started, error=True)
+            raise
+        else:
+            self.observe(operation, time.perf_counter() - started)
+
+    def stats(self):
+        return {
+            name: {
+                'count': s['count'],
+                'errors': s['errors'],
+                'avg_ms': round(s['total'] / s['count'] * 1000, 2) if s['count'] else 0.0,
+                'max_ms': round(s['max'] * 1000, 2)
+            }
+            for name, s in self.operations.items()
+        }
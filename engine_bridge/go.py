@@ -0,0 +1,623 @@
+#!/usr/bin/env python3
+"""
+Real KataGo Backend
+Runs actual KataGo engine (AlphaGo-level AI!)
+**Timestamp**: 2026-10-18
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import subprocess
+import time
+from pathlib import Path
+from aiohttp import web
+
+from .core import STOP_GRACE, EngineProcess
+from .protocols import GTPEngine, GTPError
+from .server import EngineBridge, env_int
+
+log = logging.getLogger(__name__)
+
+
+def normalize_gtp_move(move):
+    """'b d4' / 'B D4' -> 'B D4' so client and engine move lists compare equal"""
+    parts = move.split()
+    if len(parts) != 2:
+        raise ValueError(f'Invalid move: {move!r} (expected "<color> <vertex>")')
+    color, vertex = parts
+    return f"{color[0].upper()} {vertex.upper()}"
+
+
+class KataGoEngine(GTPEngine):
+    """
+    KataGo over pipelined GTP that remembers what is on its board.
+
+    Each request is diffed against the engine's move list so only the new
+    moves are sent, together with genmove, in a single pipe flush. A
+    process that died is restarted by the next request that needs it.
+    """
+    def __init__(self, exe_path):
+        super().__init__(exe_path, ('gtp',), name='KataGo')
+        self.lock = asyncio.Lock()
+        # What is currently on the engine's board
+        self.board_size = None
+        self.komi = None
+        self.moves = []
+        self.last_used = 0.0
+        self.restarts = 0
+
+    async def start(self):
+        self.board_size = None
+        self.komi = None
+        self.moves = []
+        await super().start()
+
+    def reset_commands(self, board_size, komi):
+        """Commands that start over from an empty board"""
+        commands = []
+        if board_size != self.board_size:
+            commands.append(f'boardsize {board_size}')
+        commands.append('clear_board')
+        if komi != self.komi:
+            commands.append(f'komi {komi}')
+        return commands
+
+    def plan_sync(self, board_size, moves, komi):
+        """
+        Commands that bring the engine's board to `moves`.
+
+        The longest common prefix with what is already on the board is kept;
+        anything after it is taken back with `undo` (or the board is cleared
+        when that is cheaper), then only the new suffix is played.
+        Returns (commands, number of leading undo commands).
+        """
+        if board_size != self.board_size:
+            return self.reset_commands(board_size, komi) + [f'play {m}' for m in moves], 0
+
+        commands = []
+        if komi != self.komi:
+            commands.append(f'komi {komi}')
+
+        common = 0
+        limit = min(len(self.moves), len(moves))
+        while common < limit and self.moves[common] == moves[common]:
+            common += 1
+
+        to_undo = len(self.moves) - common
+        if to_undo and to_undo >= common:
+            return self.reset_commands(board_size, komi) + [f'play {m}' for m in moves], 0
+
+        commands += ['undo'] * to_undo
+        commands += [f'play {m}' for m in moves[common:]]
+        return commands, to_undo
+
+    async def get_best_move(self, board_size=19, moves=[], komi=7.5):
+        """Get best move from position"""
+        moves = [normalize_gtp_move(m) for m in moves]
+        color = 'B' if len(moves) % 2 == 0 else 'W'
+
+        async with self.lock:
+            self.last_used = time.monotonic()
+            await self.settle()  # Let an abandoned genmove finish (or kill the engine)
+            if not self.is_alive():
+                self.restarts += 1
+                log.warning("⚠️  Restarting KataGo (pid %s exited)", self.process.pid if self.process else None)
+                await self.stop()
+                await self.start()
+
+            # Position setup and genmove go out together in one flush
+            commands, undos = self.plan_sync(board_size, moves, komi)
+            try:
+                results = await self.run_batch(commands + [f'genmove {color}'])
+            except BaseException:
+                # Cancelled or engine gone: what ended up on its board is unknown
+                self.board_size = None
+                raise
+
+            if any(isinstance(r, GTPError) for r in results[:undos]):
+                # Engine history was shorter than we thought, replay from scratch
+                self.board_size = None
+                commands = self.reset_commands(board_size, komi) + [f'play {m}' for m in moves]
+                results = await self.run_batch(commands + [f'genmove {color}'])
+
+            errors = [r for r in results if isinstance(r, GTPError)]
+            if errors:
+                # Board no longer matches anything we know, start over next time
+                self.board_size = None
+                raise errors[0]
+
+            self.board_size = board_size
+            self.komi = komi
+            self.moves = list(moves)
+
+            # genmove plays the move on the engine's board as well
+            move = results[-1]
+            if move.lower() != 'resign':
+                self.moves.append(f"{color} {move.upper()}")
+            return move
+
+
+class KataGoSessionManager:
+    """
+    Per-game KataGo sessions.
+
+    Up to `max_sessions` engine processes each keep one game's board. A
+    request goes to the engine already bound to its game_id; without a
+    game_id it goes to the engine whose board shares the longest prefix
+    with the request, so a single front-end game still only sends new moves.
+    When all engines are bound, the least recently used one is reassigned.
+    """
+    def __init__(self, exe_path, max_sessions=1, stop_grace=STOP_GRACE):
+        self.exe_path = exe_path
+        self.max_sessions = max_sessions
+        self.stop_grace = stop_grace  # How long an abandoned genmove may run on
+        self.engines = []
+        self.sessions = {}  # game_id -> KataGoEngine
+        self.lock = asyncio.Lock()  # One engine pick (and spawn) at a time, so max_sessions holds
+
+    async def start(self):
+        """Start the first engine; the rest start on demand"""
+        await self._spawn()
+
+    async def _spawn(self):
+        engine = KataGoEngine(self.exe_path)
+        engine.stop_grace = self.stop_grace
+        await engine.start()
+        self.engines.append(engine)
+        return engine
+
+    @staticmethod
+    def _shared_prefix(engine, board_size, moves):
+        if engine.board_size != board_size:
+            return -1
+        common = 0
+        for ours, theirs in zip(engine.moves, moves):
+            if ours != theirs:
+                break
+            common += 1
+        return common
+
+    async def engine_for(self, game_id, board_size, moves):
+        """Pick the engine that will need the fewest commands"""
+        if game_id and game_id in self.sessions:
+            return self.sessions[game_id]
+
+        async with self.lock:
+            if game_id and game_id in self.sessions:  # Bound while we waited
+                return self.sessions[game_id]
+
+            bound = set(map(id, self.sessions.values()))
+            free = [e for e in self.engines if id(e) not in bound and not e.lock.locked()]
+            if free or len(self.engines) >= self.max_sessions:
+                candidates = free or self.engines
+                normalized = [normalize_gtp_move(m) for m in moves]
+                engine = max(candidates, key=lambda e: (
+                    self._shared_prefix(e, board_size, normalized), -e.last_used
+                ))
+            else:
+                engine = await self._spawn()
+
+            if game_id:
+                for other, bound_engine in list(self.sessions.items()):
+                    if bound_engine is engine:
+                        del self.sessions[other]
+                self.sessions[game_id] = engine
+            return engine
+
+    async def get_best_move(self, board_size=19, moves=[], komi=7.5, game_id=None):
+        engine = await self.engine_for(game_id, board_size, moves)
+        return await engine.get_best_move(board_size, moves, komi)
+
+    def end_session(self, game_id):
+        """Release a game's engine binding"""
+        self.sessions.pop(game_id, None)
+
+    async def stop(self):
+        await asyncio.gather(*(e.stop() for e in self.engines), return_exceptions=True)
+
+    def stats(self):
+        return {
+            'mode': 'gtp',
+            'engines': len(self.engines),
+            'max_sessions': self.max_sessions,
+            'sessions': len(self.sessions),
+            'round_trips': sum(e.round_trips for e in self.engines),
+            'commands': sum(e.commands_sent for e in self.engines),
+            'restarts': sum(e.restarts for e in self.engines),
+            'stopped': sum(e.stopped for e in self.engines),
+            'killed': sum(e.killed for e in self.engines),
+            'boards': [
+                {'board_size': e.board_size, 'moves': len(e.moves), 'busy': e.lock.locked()}
+                for e in self.engines
+            ]
+        }
+
+
+class KataGoAnalysisEngine(EngineProcess):
+    """
+    KataGo JSON analysis engine (`katago analysis`).
+
+    Every query carries an id and goes straight to stdin; one reader task
+    routes responses back to the waiting request by id. Many boards can be
+    in flight at once on one process, so KataGo can batch their neural-net
+    evaluations across its search threads. A cancelled query is terminated
+    on the engine; a process that died is restarted by the next query.
+    """
+    def __init__(self, exe_path, config_path, model_path=None, max_visits=None):
+        args = ['analysis', '-config', config_path]
+        if model_path:
+            args += ['-model', model_path]
+        super().__init__(exe_path, args, name='KataGo')
+        self.max_visits = max_visits
+        self.reader = None
+        self.stderr_reader = None
+        self.pending = {}  # query id -> (Future, expected responses, collected)
+        self.ids = itertools.count(1)
+        self.queries = 0
+        self.restarts = 0
+        self.restart_lock = asyncio.Lock()
+        self.stderr_tail = []
+
+    async def start(self):
+        """Start the analysis engine and its response reader"""
+        await self.spawn(stderr=subprocess.PIPE)
+        self.reader = asyncio.create_task(self._read_responses())
+        self.stderr_reader = asyncio.create_task(self._read_stderr())
+
+        # Round trip one trivial query so start() only returns once the net is loaded
+        await self.query_version()
+        log.info("✅ KataGo analysis engine initialized!")
+
+    async def query_version(self):
+        """Ask the engine for its version (also a readiness check)"""
+        return await self._submit({'action': 'query_version'}, expected=1)
+
+    async def ensure_running(self):
+        """Restart the engine if it exited (once, however many queries notice)"""
+        if self.is_alive():
+            return
+        async with self.restart_lock:
+            if not self.is_alive():
+                self.restarts += 1
+                log.warning("⚠️  Restarting KataGo analysis engine")
+                await self.stop()
+                await self.start()
+
+    async def _read_stderr(self):
+        """Keep stderr drained; KataGo logs there and would block on a full pipe"""
+        while True:
+            line = await self.process.stderr.readline()
+            if not line:
+                return
+            decoded = line.decode(errors='replace').strip()
+            self.stderr_tail = (self.stderr_tail + [decoded])[-20:]
+            if self.output_log.isEnabledFor(logging.DEBUG):
+                self.output_log.debug('%s: %s', self.name, decoded)
+
+    async def _read_responses(self):
+        """Route each JSON response line to the query that asked for it"""
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    response = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entry = self.pending.get(response.get('id'))
+                if entry is None:
+                    if 'warning' in response:
+                        log.warning("⚠️  KataGo warning: %s", response['warning'])
+                    continue
+                future, expected, collected = entry
+                if 'error' in response:
+                    del self.pending[response['id']]
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"KataGo: {response['error']}"))
+                    continue
+                if 'warning' in response and 'turnNumber' not in response:
+                    log.warning("⚠️  KataGo warning: %s", response['warning'])
+                    continue
+                collected.append(response)
+                if len(collected) >= expected:
+                    del self.pending[response['id']]
+                    if not future.done():
+                        future.set_result(collected)
+        finally:
+            tail = '; '.join(self.stderr_tail[-3:])
+            error = RuntimeError(f'KataGo analysis engine exited{": " + tail if tail else ""}')
+            for future, _, _ in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending.clear()
+
+    async def _submit(self, query, expected):
+        """Write one query and wait for `expected` responses carrying its id"""
+        if not self.is_alive():
+            raise RuntimeError('KataGo analysis engine is not running')
+        query_id = str(next(self.ids))
+        query = {'id': query_id, **query}
+        future = asyncio.get_running_loop().create_future()
+        self.pending[query_id] = (future, expected, [])
+        self.process.stdin.write((json.dumps(query) + '\n').encode())
+        try:
+            await self.process.stdin.drain()
+            return await future
+        except asyncio.CancelledError:
+            # Tell KataGo to drop the search instead of finishing it for nobody
+            self.pending.pop(query_id, None)
+            terminate = {'id': f'{query_id}-terminate', 'action': 'terminate', 'terminateId': query_id}
+            self.process.stdin.write((json.dumps(terminate) + '\n').encode())
+            raise
+
+    async def analyze(self, board_size=19, moves=[], komi=7.5, max_visits=None, rules='tromp-taylor'):
+        """Analyze the final position of a move list"""
+        moves = [normalize_gtp_move(m).split() for m in moves]
+        query = {
+            'moves': moves,
+            'rules': rules,
+            'komi': komi,
+            'boardXSize': board_size,
+            'boardYSize': board_size,
+            'analyzeTurns': [len(moves)]
+        }
+        visits = max_visits or self.max_visits
+        if visits:
+            query['maxVisits'] = int(visits)
+        await self.ensure_running()
+        self.queries += 1
+        responses = await self._submit(query, expected=1)
+        return responses[0]
+
+    async def get_best_move(self, board_size=19, moves=[], komi=7.5, game_id=None):
+        """Same interface as the GTP session manager"""
+        result = await self.analyze(board_size, moves, komi)
+        move_infos = result.get('moveInfos') or []
+        if not move_infos:
+            return 'pass'
+        return min(move_infos, key=lambda info: info.get('order', 0))['move']
+
+    def end_session(self, game_id):
+        """Analysis queries are stateless, nothing to release"""
+
+    async def stop(self):
+        # The analysis engine quits when stdin closes
+        if self.is_alive():
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        for task in (self.reader, self.stderr_reader):
+            if task:
+                task.cancel()
+
+    def stats(self):
+        return {
+            'mode': 'analysis',
+            'queries': self.queries,
+            'restarts': self.restarts,
+            'in_flight': len(self.pending)
+        }
+
+
+def summarize_analysis(result, top_moves=5):
+    """Trim a KataGo analysis response to what the front-ends use"""
+    move_infos = sorted(result.get('moveInfos') or [], key=lambda info: info.get('order', 0))
+    root = result.get('rootInfo') or {}
+    return {
+        'move': move_infos[0]['move'] if move_infos else 'pass',
+        'winrate': root.get('winrate'),
+        'score_lead': root.get('scoreLead'),
+        'visits': root.get('visits'),
+        'candidates': [
+            {
+                'move': info['move'],
+                'winrate': info.get('winrate'),
+                'score_lead': info.get('scoreLead'),
+                'visits': info.get('visits'),
+                'pv': info.get('pv', [])
+            }
+            for info in move_infos[:top_moves]
+        ]
+    }
+
+
+def find_katago_model():
+    """KATAGO_MODEL, else the first network file shipped in katago/"""
+    configured = os.environ.get('KATAGO_MODEL')
+    if configured:
+        return configured
+    for pattern in ('*.bin.gz', '*.txt.gz'):
+        found = sorted(Path('katago').glob(pattern))
+        if found:
+            return str(found[0].absolute())
+    return None
+
+
+class KataGoBridge(EngineBridge):
+    name = 'KataGo'
+    title = 'REAL KATAGO BACKEND SERVER'
+    icon = '🏆'
+    port = 9545
+    env_prefix = 'KATAGO'
+    feature = 'Go'
+    status_fields = {
+        'engine': 'KataGo',
+        'version': 'v1.15.3',
+        'strength': 'AlphaGo Level (~5000 ELO)'
+    }
+    move_fields = {
+        'engine': 'KataGo',
+        'strength': 'AlphaGo Level'
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.engine = None
+        self.mode = os.environ.get('KATAGO_MODE', 'gtp').lower()
+
+    def executable_candidates(self):
+        return [
+            'katago/katago.exe',
+            'katago/KataGo.exe'
+        ]
+
+    async def start_engine(self, exe):
+        if self.mode == 'analysis':
+            config = os.environ.get('KATAGO_ANALYSIS_CONFIG', str(Path('katago/analysis_example.cfg').absolute()))
+            self.engine = KataGoAnalysisEngine(exe, config, find_katago_model(),
+                                               env_int('KATAGO_MAX_VISITS', None))
+        else:
+            self.engine = KataGoSessionManager(exe, max(1, env_int('KATAGO_SESSIONS', 1)), self.stop_grace())
+        log.info("🔧 KataGo backend mode: %s", self.mode)
+        await self.engine.start()
+
+    async def stop_engine(self):
+        if self.engine:
+            await self.engine.stop()
+
+    def engine_status(self):
+        return {'sessions': self.engine.stats() if self.engine else None}
+
+    def occupancy(self):
+        if isinstance(self.engine, KataGoSessionManager):
+            return {'size': len(self.engine.engines),
+                    'busy': sum(1 for engine in self.engine.engines if engine.lock.locked())}
+        if isinstance(self.engine, KataGoAnalysisEngine):
+            return {'size': 1, 'busy': int(bool(self.engine.pending))}  # One process runs every query
+        return {}
+
+    async def best_move(self, board_size, moves, komi, game_id=None):
+        async def compute():
+            async with self.metrics.time('search'):  # Engine time only, not cache hits
+                return await asyncio.wait_for(self.engine.get_best_move(board_size, moves, komi, game_id),
+                                              timeout=self.request_timeout())
+        key = (board_size, float(komi), tuple(normalize_gtp_move(m) for m in moves))
+        return await self.cached(key, compute)
+
+    async def handle_get_move(self, request):
+        """Handle move requests from frontend"""
+        try:
+            data = await request.json()
+            board_size = data.get('board_size', 19)
+            moves = data.get('moves', [])
+            komi = data.get('komi', 7.5)
+            game_id = data.get('game_id')
+
+            log.info("📩 Go move request: Size=%s, Moves=%d", board_size, len(moves),
+                     extra={'engine': self.name, 'game_id': game_id})
+            log.debug("Moves: %s", moves)
+
+            self.require_ready()
+            async with self.metrics.time('move'):
+                move, cached = await self.best_move(board_size, moves, komi, game_id)
+
+            log.info("✅ Best move: %s%s", move, ' (cached)' if cached else '',
+                     extra={'engine': self.name, 'move': move, 'cached': cached})
+
+            return web.json_response({
+                'success': True,
+                'move': move,
+                'cached': cached,
+                **self.move_fields
+            })
+
+        except asyncio.TimeoutError:
+            log.error("❌ Error: %s search timed out", self.name, extra={'engine': self.name})
+            return web.json_response({
+                'success': False,
+                'error': f'{self.name} search timed out'
+            }, status=504)
+        except asyncio.CancelledError:
+            log.warning("⚠️  %s client disconnected, search cancelled", self.name, extra={'engine': self.name})
+            raise
+        except Exception as e:
+            log.error("❌ Error: %s", e, extra={'engine': self.name})
+            return web.json_response({
+                'success': False,
+                'error': str(e)
+            }, status=500)
+
+    async def handle_analyze(self, request):
+        """
+        Batch analysis: POST {positions: [{board_size, moves, komi}, ...],
+        max_visits?}. In analysis mode every position is queried at once and
+        KataGo batches them; in GTP mode they are answered one genmove at a time.
+        """
+        try:
+            data = await request.json()
+            positions = data.get('positions')
+            if not isinstance(positions, list) or not positions:
+                return web.json_response({
+                    'success': False,
+                    'error': 'positions must be a non-empty list'
+                }, status=400)
+            self.require_ready()
+
+            max_visits = data.get('max_visits')
+            log.info("📩 Go batch analysis: %d position(s)", len(positions), extra={'engine': self.name})
+
+            async def analyze_one(position):
+                board_size = position.get('board_size', 19)
+                moves = position.get('moves', [])
+                komi = position.get('komi', 7.5)
+                if isinstance(self.engine, KataGoAnalysisEngine):
+                    result = await asyncio.wait_for(self.engine.analyze(board_size, moves, komi, max_visits),
+                                                    timeout=self.request_timeout())
+                    return summarize_analysis(result)
+                move, _ = await self.best_move(board_size, moves, komi, position.get('game_id'))
+                return {'move': move}
+
+            async with self.metrics.time('analyze'):
+                results = await asyncio.gather(*(analyze_one(p) for p in positions),
+                                               return_exceptions=True)
+
+            return web.json_response({
+                'success': True,
+                'results': [
+                    # BaseException: a position's search can come back cancelled
+                    {'success': False, 'error': str(r) or type(r).__name__} if isinstance(r, BaseException)
+                    else {'success': True, **r}
+                    for r in results
+                ],
+                'engine': 'KataGo'
+            })
+
+        except Exception as e:
+            log.error("❌ Error: %s", e, extra={'engine': self.name})
+            return web.json_response({
+                'success': False,
+                'error': str(e)
+            }, status=500)
+
+    async def handle_end_session(self, request):
+        """Release the engine bound to a finished game"""
+        try:
+            data = await request.json()
+            game_id = data.get('game_id')
+        except (ValueError, AttributeError):
+            return web.json_response({
+                'success': False,
+                'error': 'Expected a JSON object with game_id'
+            }, status=400)
+        if self.engine is not None and game_id:
+            self.engine.end_session(game_id)
+        return web.json_response({'success': True})
+
+    def add_routes(self, app):
+        super().add_routes(app)
+        app.router.add_post('/api/move', self.handle_get_move)
+        app.router.add_post('/api/session/end', self.handle_end_session)
+        app.router.add_post('/api/analyze', self.handle_analyze)
+
+    def banner_lines(self):
+        return [
+            f"Port: {self.port} (Go backend)",
+            f"Mode: {self.mode} (set KATAGO_MODE=analysis for the JSON analysis engine)"
+        ]
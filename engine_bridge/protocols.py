@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Engine Bridge Protocol Adapters - UCI (chess), USI (shogi), GTP (go)
+**Timestamp**: 2026-10-18
+"""
+
+import asyncio
+import itertools
+import logging
+
+from .core import STOPPED_SEARCHES, EngineProcess
+
+log = logging.getLogger(__name__)
+
+INFO_INT_FIELDS = ('depth', 'seldepth', 'multipv', 'nodes', 'nps', 'time', 'hashfull', 'tbhits')
+
+
+def parse_info(line):
+    """
+    Parse a UCI/USI `info` line into a dict, e.g.
+    'info depth 12 multipv 1 score cp 31 nodes 9120 nps 456000 pv e2e4 e7e5'
+    Returns None for lines without search data (`info string`, `currmove`).
+    """
+    tokens = line.split()
+    if not tokens or tokens[0] != 'info' or 'depth' not in tokens or 'string' in tokens:
+        return None
+    info = {}
+    i = 1
+    while i < len(tokens):
+        token = tokens[i]
+        if token in INFO_INT_FIELDS and i + 1 < len(tokens):
+            try:
+                info[token] = int(tokens[i + 1])
+            except ValueError:
+                pass
+            i += 2
+        elif token == 'score' and i + 2 < len(tokens):
+            try:
+                info['score'] = {'type': tokens[i + 1], 'value': int(tokens[i + 2])}
+            except ValueError:
+                # USI allows 'score mate +' / 'score mate -' without a distance
+                info['score'] = {'type': tokens[i + 1], 'value': tokens[i + 2]}
+            i += 3
+            if i < len(tokens) and tokens[i] in ('lowerbound', 'upperbound'):
+                info['score']['bound'] = tokens[i]
+                i += 1
+        elif token == 'pv':
+            info['pv'] = tokens[i + 1:]
+            break
+        else:
+            i += 1
+    info.setdefault('multipv', 1)
+    return info
+
+
+def parse_bestmove(line):
+    """'bestmove e2e4 ponder e7e5' -> {'move': 'e2e4', 'ponder': 'e7e5'}"""
+    parts = line.split() if line else []
+    return {
+        'move': parts[1] if len(parts) > 1 else None,
+        'ponder': parts[3] if len(parts) > 3 and parts[2] == 'ponder' else None
+    }
+
+
+class UCIEngine(EngineProcess):
+    """Engine speaking UCI (Stockfish and friends)"""
+    handshake = 'uci'
+    handshake_ok = 'uciok'
+    position_format = 'fen'
+
+    def __init__(self, exe_path, args=(), name='Engine'):
+        super().__init__(exe_path, args, name)
+        self.searching = False
+        self.options = {}  # setoption values sent to this process
+
+    def needs_restart(self):
+        # A search we never saw `bestmove` for would answer the next request
+        return super().needs_restart() or self.searching
+
+    async def start(self):
+        """Start the process and run the protocol handshake"""
+        self.searching = False
+        self.options = {}
+        await self.spawn()
+        await self.send_command(self.handshake)
+        if await self.wait_for(self.handshake_ok) is None:
+            raise RuntimeError(f'{self.name} exited during {self.handshake} handshake')
+        log.info("✅ Real %s engine initialized!", self.name)
+
+    async def set_option(self, name, value):
+        await self.send_command(f'setoption name {name} value {value}')
+        self.options[name] = value
+
+    async def set_position(self, position):
+        await self.send_command(f'position {self.position_format} {position}')
+
+    async def stop_search(self):
+        """
+        Send `stop` and read up to the `bestmove` it produces, so the pipe
+        is clean for the next request. An engine that doesn't answer
+        within stop_grace seconds is killed (and restarted by its pool).
+        """
+        try:
+            await self.send_command('stop')
+            if await asyncio.wait_for(self.wait_for('bestmove'), self.stop_grace):
+                self.searching = False
+                self.stopped += 1
+                STOPPED_SEARCHES.labels(self.name, 'drained').inc()
+                return
+        except (asyncio.TimeoutError, ConnectionResetError, BrokenPipeError):
+            pass
+        log.warning("⚠️  %s didn't stop within %.1fs, killing it", self.name, self.stop_grace)
+        await self.kill()
+
+    async def search(self, position, go_args):
+        """
+        Run `go <go_args>` on a position and return the best move. If the
+        caller is cancelled (deadline passed, client disconnected) the
+        search is stopped before the cancellation goes on.
+        """
+        await self.set_position(position)
+        self.searching = True  # Before `go`: a cancelled write may still have reached the engine
+        try:
+            await self.send_command(f'go {go_args}')
+            bestmove_line = await self.wait_for('bestmove')
+        except asyncio.CancelledError:
+            if self.is_alive():
+                await self.stop_search()
+            raise
+        if bestmove_line is None:
+            raise RuntimeError(f'{self.name} process exited before returning a move')
+        self.searching = False
+        return parse_bestmove(bestmove_line)['move']
+
+    async def analyze(self, position, depth=20, movetime=None, multipv=1, options=None):
+        """
+        Stream analysis of a position.
+
+        Yields {'type': 'info', ...} for every search update and finally
+        {'type': 'bestmove', ...}. Closing the generator early sends `stop`
+        and drains the pipe up to `bestmove`, so the engine is clean for the
+        next request. `options` ({name: value}) are set for this search
+        only; earlier values come back afterwards, like MultiPV.
+        """
+        options = options or {}
+        previous = {name: self.options[name] for name in options
+                    if name in self.options and self.options[name] != options[name]}
+        for name, value in options.items():
+            await self.set_option(name, value)
+        await self.set_option('MultiPV', multipv)
+        await self.set_position(position)
+        go = f'go depth {depth}'
+        if movetime:
+            go += f' movetime {movetime}'
+        self.searching = True
+
+        try:
+            await self.send_command(go)
+            while True:
+                decoded = await self.readline()
+                if decoded is None:
+                    raise RuntimeError(f'{self.name} process exited during analysis')
+                if decoded.startswith('bestmove'):
+                    self.searching = False
+                    yield {'type': 'bestmove', **parse_bestmove(decoded)}
+                    return
+                info = parse_info(decoded)
+                if info is not None:
+                    yield {'type': 'info', **info}
+        finally:
+            if self.searching and self.is_alive():
+                await self.stop_search()
+            if self.is_alive():
+                if multipv != 1:
+                    await self.set_option('MultiPV', 1)
+                for name, value in previous.items():
+                    await self.set_option(name, value)
+
+
+class USIEngine(UCIEngine):
+    """Engine speaking USI, the shogi dialect of UCI (YaneuraOu)"""
+    handshake = 'usi'
+    handshake_ok = 'usiok'
+    position_format = 'sfen'
+
+
+class GTPError(Exception):
+    """The engine answered a GTP command with '?'"""
+
+
+class GTPEngine(EngineProcess):
+    """
+    Engine speaking GTP with pipelined, numbered commands.
+
+    Every command is sent as `<id> <command>`; a single reader task parses
+    `=<id>` / `?<id>` responses and resolves the future waiting on that id.
+    A batch of commands is written back to back with one pipe flush.
+    Answers to commands whose caller gave up are read and dropped.
+    """
+    def __init__(self, exe_path, args=('gtp',), name='Engine'):
+        super().__init__(exe_path, args, name)
+        self.reader = None
+        self.ids = itertools.count(1)
+        self.pending = {}  # command id -> Future
+        self.caught_up = asyncio.Event()  # Set when every command sent has been answered
+        self.caught_up.set()
+        self.abandoned = False  # A cancelled caller left commands the engine is still answering
+        self.round_trips = 0
+        self.commands_sent = 0
+
+    async def start(self):
+        """Start the process and its response reader"""
+        if self.reader:
+            self.reader.cancel()
+        self.abandoned = False
+        await self.spawn()
+        self.reader = asyncio.create_task(self._read_responses())
+        response = await self.command('name')
+        log.info("✅ %s engine initialized: %s", self.name, response)
+
+    async def _read_responses(self):
+        """
+        Parse GTP responses and hand each to the future registered for its
+        id. A response is '=<id> text' or '?<id> text', possibly followed by
+        more lines, and always ends with an empty line.
+        """
+        current_id = None
+        ok = True
+        lines = []
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                decoded = line.decode(errors='replace').rstrip('\r\n')
+                if current_id is None:
+                    if not decoded or decoded[0] not in '=?':
+                        continue
+                    ok = decoded[0] == '='
+                    head, _, text = decoded[1:].partition(' ')
+                    current_id = head
+                    lines = [text.strip()]
+                    continue
+                if decoded.strip() == '':
+                    future = self.pending.pop(current_id, None)
+                    if future is not None and not future.done():
+                        response = '\n'.join(lines).strip()
+                        future.set_result(response if ok else GTPError(response))
+                    if not self.pending:
+                        self.caught_up.set()
+                    current_id = None
+                    continue
+                lines.append(decoded.strip())
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError(f'{self.name} process exited'))
+            self.pending.clear()
+            self.caught_up.set()
+
+    def _write(self, command):
+        """Queue one numbered command on stdin and return its future"""
+        if not self.is_alive():
+            raise RuntimeError(f'{self.name} process is not running')
+        command_id = str(next(self.ids))
+        future = asyncio.get_running_loop().create_future()
+        self.pending[command_id] = future
+        self.caught_up.clear()
+        self.process.stdin.write(f"{command_id} {command}\n".encode())
+        self.commands_sent += 1
+        return future
+
+    async def settle(self):
+        """
+        Wait for the answers to commands a cancelled caller left behind
+        (GTP can't interrupt genmove, so the engine finishes it first).
+        Past stop_grace seconds the process is killed instead.
+        """
+        if not self.abandoned:
+            return
+        try:
+            await asyncio.wait_for(self.caught_up.wait(), self.stop_grace)
+        except asyncio.TimeoutError:
+            log.warning("⚠️  %s still busy after %.1fs, killing it", self.name, self.stop_grace)
+            await self.kill()
+        else:
+            self.stopped += 1
+            STOPPED_SEARCHES.labels(self.name, 'drained').inc()
+        self.abandoned = False
+
+    async def run_batch(self, commands):
+        """
+        Send commands back to back and wait for all responses.
+
+        Returns one entry per command, in order: the response text, or a
+        GTPError for commands the engine rejected.
+        """
+        if not commands:
+            return []
+        futures = [self._write(command) for command in commands]
+        try:
+            await self.process.stdin.drain()
+            self.round_trips += 1
+            results = await asyncio.gather(*futures)
+        except asyncio.CancelledError:
+            self.abandoned = True  # See settle()
+            raise
+        return [
+            GTPError(f'{command}: {result}') if isinstance(result, GTPError) else result
+            for command, result in zip(commands, results)
+        ]
+
+    async def command(self, command):
+        """Send one command and return its response, raising on '?'"""
+        result = (await self.run_batch([command]))[0]
+        if isinstance(result, GTPError):
+            raise result
+        return result
+
+    async def stop(self):
+        await super().stop()
+        if self.reader:
+            self.reader.cancel()
+            self.reader = None
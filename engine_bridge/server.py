@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""
+Engine Bridge Server - shared HTTP plumbing for the engine backends
+Port checks, CORS, status, startup/shutdown and the multi-engine hub
+**Timestamp**: 2026-10-18
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import aclosing
+from pathlib import Path
+from aiohttp import web, WSMsgType
+import aiohttp_cors
+
+from server_logging import dropped_records, setup_logging
+from server_metrics import counter, gauge, handle_metrics, request_timer
+
+from .core import STOP_GRACE, EngineMetrics, EnginePool, ResultCache
+
+POOL_GAUGES = {
+    'size': gauge('engine_pool_processes', 'Engine processes in the pool', ('engine',)),
+    'busy': gauge('engine_pool_busy', 'Engine processes running a request', ('engine',)),
+    'waiting': gauge('engine_pool_waiting', 'Requests queued for a free engine process', ('engine',)),
+}
+counter('log_records_dropped_total', 'Log records dropped because the log queue was full').set_function(
+    dropped_records)
+CACHE_LOOKUPS = counter('engine_cache_lookups_total', 'Result cache lookups by outcome',
+                        ('engine', 'result'))
+
+log = logging.getLogger(__name__)
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def env_float(name, default=None):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def find_executable(candidates):
+    """First existing path from a list of candidates (absolute), or None"""
+    for path in candidates:
+        path = Path(path)
+        if path.exists():
+            return str(path.absolute())
+    return None
+
+
+def is_port_in_use(port, host='127.0.0.1'):
+    """Check if port is already in use"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind((host, port))
+            return False
+        except OSError:
+            return True
+
+
+def kill_process_on_port(port):
+    """Kill process using the specified port (Windows)"""
+    try:
+        # Find process using the port
+        result = subprocess.run(
+            ['netstat', '-ano'],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+
+        for line in result.stdout.split('\n'):
+            if f':{port}' in line and 'LISTENING' in line:
+                parts = line.split()
+                if len(parts) >= 5:
+                    pid = parts[-1]
+                    # Kill the process
+                    subprocess.run(['taskkill', '/F', '/PID', pid],
+                                   capture_output=True, check=False)
+                    print(f"⚠️  Killed process {pid} using port {port}")
+                    return True
+        return False
+    except Exception as e:
+        print(f"⚠️  Could not kill process on port {port}: {e}")
+        return False
+
+
+def ensure_port_free(port):
+    """Free the port if something holds it, exit if that fails"""
+    if not is_port_in_use(port):
+        return
+    print(f"⚠️  Port {port} is already in use!")
+    print(f"Attempting to free port {port}...")
+    if kill_process_on_port(port):
+        time.sleep(1)  # Wait a moment for port to be freed
+        if is_port_in_use(port):
+            print(f"❌ Port {port} is still in use. Please close the process manually.")
+            print(f"   Run: netstat -ano | findstr :{port}")
+            sys.exit(1)
+    else:
+        print(f"❌ Could not free port {port}. Please close the process manually.")
+        print(f"   Run: netstat -ano | findstr :{port}")
+        sys.exit(1)
+
+
+class EngineBridge:
+    """
+    One engine backend: its engine process(es), its routes and its status.
+
+    Subclasses set the class attributes, implement start_engine() and
+    add their routes in add_routes(). Caching and metrics come for free:
+    wrap engine calls in `self.cached(key, compute)` and
+    `self.metrics.time(operation)`. Engine occupancy() feeds the pool
+    gauges on /metrics.
+    """
+    name = 'Engine'            # Short engine name for logs
+    title = 'ENGINE BACKEND'   # Banner title
+    icon = '🏆'
+    port = 0
+    env_prefix = 'ENGINE'      # Prefix for <PREFIX>_CACHE_SIZE etc.
+    cache_default_size = 10000
+    feature = 'Engine'         # "Server will start but <feature> features will not work!"
+    status_fields = {}         # Static fields for /api/status
+    move_fields = {}           # Static fields for /api/move responses
+
+    def __init__(self):
+        self.metrics = EngineMetrics(self.name)
+        self.cache = None
+        self.ready = False
+        # Read when /metrics is scraped, so they cost nothing in between
+        for field, metric in POOL_GAUGES.items():
+            metric.labels(self.name).set_function(lambda field=field: self.occupancy().get(field))
+        for result in ('hits', 'misses', 'coalesced'):
+            CACHE_LOOKUPS.labels(self.name, result).set_function(
+                lambda result=result: getattr(self.cache, result) if self.cache else None)
+
+    def executable_candidates(self):
+        return []
+
+    def request_timeout(self):
+        """Seconds a move request may take, waiting for an engine included, from <PREFIX>_TIMEOUT"""
+        return env_float(f'{self.env_prefix}_TIMEOUT', 60.0)
+
+    def stop_grace(self):
+        """Seconds a stopped search may take to wind down before the engine is killed, from <PREFIX>_STOP_GRACE"""
+        return env_float(f'{self.env_prefix}_STOP_GRACE', STOP_GRACE)
+
+    def create_cache(self):
+        """
+        Build the result cache from environment settings:
+        <PREFIX>_CACHE_SIZE (0 disables), <PREFIX>_CACHE_TTL (seconds),
+        <PREFIX>_CACHE_DB (SQLite path for persistence)
+        """
+        size = env_int(f'{self.env_prefix}_CACHE_SIZE', self.cache_default_size)
+        if size <= 0:
+            return None
+        return ResultCache(
+            self.env_prefix.lower(),
+            max_size=size,
+            ttl=env_float(f'{self.env_prefix}_CACHE_TTL'),
+            db_path=os.environ.get(f'{self.env_prefix}_CACHE_DB') or None
+        )
+
+    async def cached(self, key, compute):
+        """Return (value, cached) through the cache when one is configured"""
+        if self.cache is None:
+            return await compute(), False
+        return await self.cache.get_or_compute(key, compute)
+
+    async def start(self, app=None):
+        """Find the executable and start the engine (startup hook)"""
+        try:
+            self.cache = self.create_cache()
+        except Exception as e:
+            log.error("⚠️  %s result cache disabled: %s", self.name, e)
+            self.cache = None
+
+        try:
+            candidates = self.executable_candidates()
+            exe = find_executable(candidates)
+            if not exe:
+                log.error("❌ ERROR: %s executable not found!\nExpected paths:\n%s\n"
+                          "⚠️  Server will start but %s features will not work!",
+                          self.name, '\n'.join(f"  - {p}" for p in candidates), self.feature)
+                return
+
+            log.info("✅ Found %s: %s", self.name, exe)
+            await self.start_engine(exe)
+            self.ready = True
+            log.info("🚀 %s backend ready!", self.name)
+        except Exception as e:
+            log.exception("❌ CRITICAL ERROR starting %s engine: %s", self.name, e)
+            log.error("⚠️  Server will start but %s features will not work!", self.feature)
+
+    async def start_engine(self, exe):
+        raise NotImplementedError
+
+    async def stop(self, app=None):
+        """Shut down engine processes (cleanup hook)"""
+        await self.stop_engine()
+        if self.cache:
+            self.cache.close()
+
+    async def stop_engine(self):
+        pass
+
+    def require_ready(self):
+        if not self.ready:
+            raise RuntimeError(f'{self.name} engine not available')
+
+    def engine_status(self):
+        """Engine-specific status (pool, sessions...)"""
+        return {}
+
+    def occupancy(self):
+        """Engine processes: {size, busy, waiting}, any of them may be missing"""
+        return {}
+
+    async def handle_status(self, request):
+        """Status endpoint"""
+        return web.json_response({
+            'status': 'online',
+            **self.status_fields,
+            'ready': self.ready,
+            **self.engine_status(),
+            'cache': self.cache.stats() if self.cache else None,
+            'metrics': self.metrics.stats()
+        })
+
+    def add_routes(self, app):
+        app.router.add_get('/api/status', self.handle_status)
+        app.router.add_get('/metrics', handle_metrics)
+
+    def banner_lines(self):
+        return [f"Port: {self.port}"]
+
+
+class PooledSearchBridge(EngineBridge):
+    """
+    Bridge for UCI-style engines (UCI, USI): a pool of processes, cached
+    best-move requests and streaming analysis over SSE and WebSocket.
+    """
+    engine_class = None
+    position_field = 'fen'
+    default_pool_size = 1
+    analysis_options = {}  # setoption values for analysis streams (move requests may have changed them)
+
+    def __init__(self):
+        super().__init__()
+        self.pool = None
+
+    def pool_size(self):
+        """Pool size from <PREFIX>_POOL_SIZE"""
+        return max(1, env_int(f'{self.env_prefix}_POOL_SIZE', self.default_pool_size))
+
+    def create_engine(self, exe):
+        engine = self.engine_class(exe, name=self.name)
+        engine.stop_grace = self.stop_grace()
+        return engine
+
+    async def start_engine(self, exe):
+        size = self.pool_size()
+        log.info("🔧 Starting %d %s process(es)...", size, self.name)
+        self.pool = EnginePool(lambda: self.create_engine(exe), size, self.name)
+        await self.pool.start()
+
+    async def stop_engine(self):
+        if self.pool:
+            await self.pool.stop()
+
+    def engine_status(self):
+        return {'pool': self.pool.stats() if self.pool else None}
+
+    def occupancy(self):
+        if not self.pool:
+            return {}
+        return {'size': self.pool.size, 'busy': sum(1 for slot in self.pool.slots if slot.busy),
+                'waiting': self.pool.waiting}
+
+    def parse_move_request(self, data):
+        """Request JSON -> (position, options)"""
+        raise NotImplementedError
+
+    def cache_key(self, position, options):
+        raise NotImplementedError
+
+    def describe_request(self, position, options):
+        return ''
+
+    async def search(self, engine, position, options):
+        """Run one best-move search on a checked-out engine"""
+        raise NotImplementedError
+
+    async def best_move(self, position, options):
+        async def run():
+            async with self.pool.acquire() as engine:
+                return await self.search(engine, position, options)
+
+        async def compute():
+            # The deadline covers the wait for a free engine; when it passes
+            # (or every client asking has gone) the search gets `stop`
+            async with self.metrics.time('search'):  # Engine time only, not cache hits
+                return await asyncio.wait_for(run(), timeout=self.request_timeout())
+        return await self.cached(self.cache_key(position, options), compute)
+
+    async def handle_get_move(self, request):
+        """Handle move requests from frontend"""
+        try:
+            data = await request.json()
+            position, options = self.parse_move_request(data)
+
+            log.info("📩 %s move request: %s", self.name, self.describe_request(position, options),
+                     extra={'engine': self.name})
+            log.debug("Position: %s", position, extra={'engine': self.name})
+
+            self.require_ready()
+            async with self.metrics.time('move'):
+                move, cached = await self.best_move(position, options)
+
+            log.info("✅ Best move: %s%s", move, ' (cached)' if cached else '',
+                     extra={'engine': self.name, 'move': move, 'cached': cached})
+
+            return web.json_response({
+                'success': True,
+                'move': move,
+                'cached': cached,
+                **self.move_fields
+            })
+
+        except asyncio.TimeoutError:
+            log.error("❌ Error: %s search timed out", self.name, extra={'engine': self.name})
+            return web.json_response({
+                'success': False,
+                'error': f'{self.name} search timed out'
+            }, status=504)
+        except asyncio.CancelledError:
+            log.warning("⚠️  %s client disconnected, search cancelled", self.name, extra={'engine': self.name})
+            raise
+        except Exception as e:
+            log.error("❌ Error: %s", e, extra={'engine': self.name})
+            return web.json_response({
+                'success': False,
+                'error': str(e)
+            }, status=500)
+
+    def read_analysis_params(self, data):
+        """Validate analysis request fields shared by the SSE and WebSocket endpoints"""
+        position = data.get(self.position_field)
+        if not position:
+            raise ValueError(f'{self.position_field} is required')
+        depth = max(1, min(int(data.get('depth', 20)), 99))
+        movetime = data.get('movetime')
+        movetime = int(movetime) if movetime else None
+        multipv = max(1, min(int(data.get('multipv', 1)), 10))
+        return position, depth, movetime, multipv
+
+    async def analyze(self, position, depth, movetime, multipv):
+        """Stream analysis events from a checked-out engine"""
+        async with self.pool.acquire() as engine:
+            async with aclosing(engine.analyze(position, depth, movetime, multipv,
+                                               self.analysis_options)) as events:
+                async for event in events:
+                    yield event
+
+    async def handle_analyze_stream(self, request):
+        """
+        Server-Sent Events analysis stream.
+
+        POST {fen|sfen, depth, movetime?, multipv?} and read `info` events
+        as the search deepens, then one `bestmove` event. Closing the
+        connection stops the search.
+        """
+        try:
+            data = await request.json()
+            params = self.read_analysis_params(data)
+        except (ValueError, TypeError) as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        if not self.ready:
+            return web.json_response({
+                'success': False,
+                'error': f'{self.name} engine not available'
+            }, status=503)
+
+        log.info("📩 %s analysis stream: Depth=%d, MultiPV=%d", self.name, params[1], params[3],
+                 extra={'engine': self.name})
+
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache'
+        })
+        await response.prepare(request)
+
+        try:
+            async with self.metrics.time('analyze'):
+                async with aclosing(self.analyze(*params)) as events:
+                    async for event in events:
+                        payload = json.dumps(event)
+                        await response.write(f"event: {event['type']}\ndata: {payload}\n\n".encode())
+        except ConnectionResetError:
+            log.warning("⚠️  Analysis client disconnected, search stopped", extra={'engine': self.name})
+        except asyncio.CancelledError:
+            log.warning("⚠️  Analysis client disconnected, search stopped", extra={'engine': self.name})
+            raise
+        except Exception as e:
+            log.error("❌ Analysis error: %s", e, extra={'engine': self.name})
+            payload = json.dumps({'type': 'error', 'error': str(e)})
+            try:
+                await response.write(f"event: error\ndata: {payload}\n\n".encode())
+            except ConnectionResetError:
+                pass
+        return response
+
+    async def handle_analyze_ws(self, request):
+        """
+        WebSocket analysis stream.
+
+        Send {fen|sfen, depth, movetime?, multipv?} to start a search and
+        receive info/bestmove messages. Send {"type": "stop"} to end the
+        current search early; the socket stays open for further positions.
+        """
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        search = None
+
+        async def run_search(params):
+            try:
+                async with self.metrics.time('analyze'):
+                    async with aclosing(self.analyze(*params)) as events:
+                        async for event in events:
+                            await ws.send_json(event)
+            except asyncio.CancelledError:
+                await ws.send_json({'type': 'stopped'})
+                raise
+            except Exception as e:
+                if not ws.closed:
+                    await ws.send_json({'type': 'error', 'error': str(e)})
+
+        async def cancel_search():
+            if search and not search.done():
+                search.cancel()
+                try:
+                    await search
+                except (asyncio.CancelledError, ConnectionResetError):
+                    pass
+
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    data = json.loads(msg.data)
+                except json.JSONDecodeError:
+                    await ws.send_json({'type': 'error', 'error': 'Invalid JSON'})
+                    continue
+
+                await cancel_search()
+                if data.get('type') == 'stop':
+                    continue
+                if not self.ready:
+                    await ws.send_json({'type': 'error', 'error': f'{self.name} engine not available'})
+                    continue
+                try:
+                    params = self.read_analysis_params(data)
+                except (ValueError, TypeError) as e:
+                    await ws.send_json({'type': 'error', 'error': str(e)})
+                    continue
+                search = asyncio.create_task(run_search(params))
+        finally:
+            await cancel_search()
+        return ws
+
+    def add_routes(self, app):
+        super().add_routes(app)
+        app.router.add_post('/api/move', self.handle_get_move)
+        app.router.add_post('/api/analyze', self.handle_analyze_stream)
+        app.router.add_get('/ws/analyze', self.handle_analyze_ws)
+
+    def banner_lines(self):
+        return super().banner_lines() + [
+            f"Engine pool: {self.pool_size()} process(es) (set {self.env_prefix}_POOL_SIZE to change)"
+        ]
+
+
+def create_app(bridge):
+    """aiohttp application for one bridge, with CORS on every route"""
+    app = web.Application(middlewares=[request_timer(bridge.name.lower())])
+
+    # CORS configuration
+    cors = aiohttp_cors.setup(app, defaults={
+        "*": aiohttp_cors.ResourceOptions(
+            allow_credentials=True,
+            expose_headers="*",
+            allow_headers="*",
+            allow_methods="*"
+        )
+    })
+
+    bridge.add_routes(app)
+
+    # Add CORS to all routes
+    for route in list(app.router.routes()):
+        cors.add(route)
+
+    app.on_startup.append(bridge.start)
+    app.on_cleanup.append(bridge.stop)
+    return app
+
+
+def print_banner(title, icon, lines):
+    print("")
+    print("═══════════════════════════════════════════════════")
+    print(f"  {icon} {title}")
+    print("═══════════════════════════════════════════════════")
+    print("")
+    for line in lines:
+        print(line)
+    print("Frontend: http://localhost:9876")
+    print("")
+    print("Press Ctrl+C to stop")
+    print("")
+
+
+def run_until_stopped(port, serve):
+    """Shared error handling around the blocking server call"""
+    try:
+        serve()
+    except OSError as e:
+        if e.errno == 10048:
+            print(f"❌ ERROR: Port {port} conflict: {e}", file=sys.stderr)
+            print(f"   Another process is using port {port}", file=sys.stderr)
+            print(f"   Run: netstat -ano | findstr :{port}", file=sys.stderr)
+        else:
+            print(f"❌ ERROR: Server failed to start: {e}", file=sys.stderr)
+            import traceback
+            traceback.print_exc(file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n⚠️  Server stopped by user")
+        sys.exit(0)
+    except Exception as e:
+        print(f"❌ CRITICAL ERROR: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc(file=sys.stderr)
+        sys.exit(1)
+
+
+def run_bridge(bridge, host='127.0.0.1'):
+    """Run a single engine backend on its own port (blocking)"""
+    setup_logging()
+    ensure_port_free(bridge.port)
+    app = create_app(bridge)
+    print_banner(bridge.title, bridge.icon, bridge.banner_lines())
+
+    def serve():
+        print(f"🌐 Starting web server on port {bridge.port}...")
+        # Cancel handlers whose client disconnected, so their searches stop
+        web.run_app(app, host=host, port=bridge.port, handler_cancellation=True)
+
+    run_until_stopped(bridge.port, serve)
+
+
+async def serve_hub(bridges, host='127.0.0.1'):
+    """Serve several bridges from one process and one event loop"""
+    runners = []
+    try:
+        for bridge in bridges:
+            runner = web.AppRunner(create_app(bridge), handler_cancellation=True)
+            await runner.setup()
+            await web.TCPSite(runner, host, bridge.port).start()
+            runners.append(runner)
+            log.info("🌐 %s listening on port %d", bridge.name, bridge.port)
+        await asyncio.Future()  # Run forever
+    finally:
+        for runner in reversed(runners):
+            await runner.cleanup()
+
+
+def run_hub(bridges, host='127.0.0.1'):
+    """Run several engine backends in one process (blocking)"""
+    setup_logging()
+    for bridge in bridges:
+        ensure_port_free(bridge.port)
+    lines = []
+    for bridge in bridges:
+        lines += [f"{bridge.icon} {bridge.name}"] + [f"   {line}" for line in bridge.banner_lines()]
+    print_banner('ENGINE HUB', '🎛️', lines)
+    run_until_stopped(
+        ', '.join(str(b.port) for b in bridges),
+        lambda: asyncio.run(serve_hub(bridges, host))
+    )
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Real YaneuraOu Backend
+Runs actual YaneuraOu Shogi engine (World Champion 2019!)
+**Timestamp**: 2026-10-18
+"""
+
+from .protocols import USIEngine
+from .server import PooledSearchBridge
+
+
+class YaneuraOuBridge(PooledSearchBridge):
+    name = 'YaneuraOu'
+    title = 'REAL YANEURAOU BACKEND SERVER'
+    icon = '🎌'
+    port = 9544
+    env_prefix = 'YANEURAOU'
+    feature = 'Shogi'
+    engine_class = USIEngine
+    position_field = 'sfen'
+    # The deep-learning build is memory hungry, one process unless asked
+    default_pool_size = 1
+    status_fields = {
+        'engine': 'YaneuraOu',
+        'version': 'v9.10 (ふかうら王)',
+        'strength': 'World Champion Level'
+    }
+    move_fields = {
+        'engine': 'YaneuraOu v9.10',
+        'strength': 'World Champion Level'
+    }
+
+    def executable_candidates(self):
+        return [
+            'yaneuraou/YaneuraOu-Deep-ORT-CPU.exe',
+            'yaneuraou/YaneuraOu.exe',
+            'yaneuraou/YaneuraOu-by-gcc.exe'
+        ]
+
+    def parse_move_request(self, data):
+        sfen = data.get('sfen')
+        if not sfen:
+            raise ValueError('sfen is required')
+        return sfen, {
+            'skill': data.get('skill', 5),
+            'btime': int(data.get('btime', 1000)),
+            'wtime': int(data.get('wtime', 1000))
+        }
+
+    def cache_key(self, sfen, options):
+        return (' '.join(sfen.split()), options['btime'], options['wtime'])
+
+    def describe_request(self, sfen, options):
+        return f"Skill={options['skill']}, Time={options['btime']}ms"
+
+    async def search(self, engine, sfen, options):
+        return await engine.search(sfen, f"btime {options['btime']} wtime {options['wtime']}")
+
+    def banner_lines(self):
+        return [f"Port: {self.port} (Shogi backend)"] + super().banner_lines()[1:]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Real Stockfish Backend
+Runs actual Stockfish C++ engine (not JavaScript version!)
+**Timestamp**: 2026-10-18
+"""
+
+import os
+
+from .protocols import UCIEngine
+from .server import PooledSearchBridge
+
+
+def normalize_fen(fen):
+    """
+    Canonical cache form of a FEN: collapsed whitespace, fullmove counter
+    dropped (it never changes the best move, the halfmove clock can)
+    """
+    fields = fen.split()
+    if len(fields) >= 6:
+        fields = fields[:5]
+    return ' '.join(fields)
+
+
+class StockfishBridge(PooledSearchBridge):
+    name = 'Stockfish'
+    title = 'REAL STOCKFISH BACKEND SERVER'
+    icon = '🏆'
+    port = 9543
+    env_prefix = 'STOCKFISH'
+    feature = 'Stockfish'
+    engine_class = UCIEngine
+    position_field = 'fen'
+    status_fields = {
+        'engine': 'Stockfish 16',
+        'version': 'Full C++ Version (not JavaScript!)',
+        'elo': '~3500'
+    }
+    move_fields = {
+        'engine': 'Stockfish 16 (Full C++ Version)',
+        'elo': '~3500'
+    }
+
+    # Move requests weaken the engine with Skill Level; analysis is always full strength
+    analysis_options = {'Skill Level': 20}
+
+    # Half the cores (min 1, max 8) unless STOCKFISH_POOL_SIZE says otherwise
+    default_pool_size = max(1, min(8, (os.cpu_count() or 2) // 2))
+
+    def executable_candidates(self):
+        return [
+            'stockfish/stockfish/stockfish-windows-x86-64-avx2.exe',
+            'stockfish/stockfish-windows-x86-64-avx2.exe',
+            'stockfish/stockfish.exe'
+        ]
+
+    def parse_move_request(self, data):
+        fen = data.get('fen')
+        if not fen:
+            raise ValueError('fen is required')
+        return fen, {
+            'skill': int(data.get('skill', 20)),
+            'depth': int(data.get('depth', 15)),
+            'movetime': int(data.get('movetime', 1000))
+        }
+
+    def cache_key(self, fen, options):
+        return (normalize_fen(fen), options['skill'], options['depth'], options['movetime'])
+
+    def describe_request(self, fen, options):
+        return f"Skill={options['skill']}, Depth={options['depth']}, Time={options['movetime']}ms"
+
+    async def search(self, engine, fen, options):
+        await engine.set_option('Skill Level', options['skill'])
+        return await engine.search(fen, f"depth {options['depth']} movetime {options['movetime']}")
+
+    def banner_lines(self):
+        return [f"Port: {self.port} (backend)"] + super().banner_lines()[1:]
@@ -10,8 +10,9 @@ Enables correspondence play via Claude/Cursor:
 """
 
 import asyncio
+import json
 import aiohttp
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any
 from pydantic import BaseModel, Field
 from fastmcp import FastMCP
 
@@ -217,6 +218,7 @@ async def get_ai_move(
                         'elo': result.get('elo', 'Unknown'),
                         'depth': depth,
                         'skill_level': skill_level,
+                        'cached': result.get('cached', False),
                         'message': f'AI suggests: {move}'
                     }
                 else:
@@ -226,7 +228,7 @@ async def get_ai_move(
                         'error': f'Engine error: {error_text}'
                     }
     
-    except aiohttp.ClientError as e:
+    except aiohttp.ClientError:
         return {
             'success': False,
             'error': f'Cannot connect to {game_type} engine. Is it running? (python {game_type}-server.py)'
@@ -238,12 +240,65 @@ async def get_ai_move(
         }
 
 
+async def stream_chess_analysis(
+    fen: str,
+    depth: int,
+    multipv: int = 1,
+    movetime: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Read Stockfish's SSE analysis stream until the requested depth is reached.
+    
+    Closing the stream early makes the server send `stop` to the engine, so
+    we never wait for more search than we actually use.
+    """
+    lines: Dict[int, Dict[str, Any]] = {}
+    best_move = None
+    request = {'fen': fen, 'depth': depth, 'multipv': multipv}
+    if movetime:
+        request['movetime'] = movetime
+    
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{STOCKFISH_URL}/api/analyze", json=request) as response:
+            if response.status != 200:
+                raise RuntimeError(f'Engine error: {await response.text()}')
+            async for raw in response.content:
+                line = raw.decode().strip()
+                if not line.startswith('data:'):
+                    continue
+                event = json.loads(line[5:])
+                if event['type'] == 'error':
+                    raise RuntimeError(event.get('error', 'Analysis failed'))
+                if event['type'] == 'bestmove':
+                    best_move = event.get('move')
+                    break
+                lines[event['multipv']] = event
+                top = lines.get(1)
+                if top and top['depth'] >= depth and len(lines) >= multipv:
+                    break
+    
+    ranked = [lines[k] for k in sorted(lines)]
+    if best_move is None and ranked and ranked[0].get('pv'):
+        best_move = ranked[0]['pv'][0]
+    return {'best_move': best_move, 'lines': ranked}
+
+
+def format_score(score: Optional[Dict[str, Any]]) -> str:
+    """Render a UCI score as '+0.31' or 'M3'"""
+    if not score:
+        return 'unknown'
+    if score['type'] == 'mate':
+        return f"M{score['value']}"
+    return f"{score['value'] / 100:+.2f}"
+
+
 @mcp.tool()
 async def analyze_position(
     game_type: str = "chess",
     position: Optional[str] = None,
     game_id: Optional[str] = None,
-    depth: int = 20
+    depth: int = 20,
+    multipv: int = 1
 ) -> Dict[str, Any]:
     """
     Analyze a position and get evaluation.
@@ -255,12 +310,52 @@ async def analyze_position(
         position: Position in FEN/SGF notation
         game_id: Game identifier (uses stored position)
         depth: Analysis depth
+        multipv: Number of candidate lines to return (chess only)
     
     Returns:
         Dict with position evaluation and analysis
     """
-    # For now, use get_ai_move for analysis
-    # Can be extended with dedicated analysis endpoint later
+    if game_type == "chess":
+        fen = position
+        if not fen and game_id and game_id in active_games:
+            fen = active_games[game_id].get('fen')
+        if not fen:
+            return {
+                'success': False,
+                'error': 'Must provide either position or game_id'
+            }
+        try:
+            analysis = await stream_chess_analysis(fen, depth, multipv)
+        except aiohttp.ClientError:
+            return {
+                'success': False,
+                'error': 'Cannot connect to chess engine. Is it running? (python stockfish-server.py)'
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
+        lines = analysis['lines']
+        top = lines[0] if lines else {}
+        return {
+            'success': True,
+            'best_move': analysis['best_move'],
+            'evaluation': format_score(top.get('score')),
+            'depth': top.get('depth', 0),
+            'lines': [
+                {
+                    'rank': line['multipv'],
+                    'evaluation': format_score(line.get('score')),
+                    'pv': line.get('pv', [])
+                }
+                for line in lines
+            ],
+            'message': f"Best move: {analysis['best_move']} ({format_score(top.get('score'))} at depth {top.get('depth', 0)})"
+        }
+    
+    # Other engines have no analysis stream yet, use get_ai_move
     result = await get_ai_move(
         game_type=game_type,
         position=position,
@@ -5,21 +5,50 @@ No external services required - self-contained!
 **Timestamp**: 2025-12-04
 """
 
+import argparse
 import asyncio
+import hashlib
+import heapq
+import logging
 import websockets
-import json
+import os
+import queue
+import secrets
+import signal
+import tempfile
+import time
 import uuid
 import sys
 import socket
+import zlib
 from datetime import datetime
 from collections import defaultdict
 from aiohttp import web
 import aiohttp_cors
 
+from multiplayer_broker import BrokerClient, BrokerServer
+from multiplayer_chess import ChessBoard, IllegalMove
+from multiplayer_codecs import (JSON, DecodeError, Payload, choose_codec, codec_for_subprotocol,
+                                decode, deflate_options, encode, select_subprotocol)
+from multiplayer_fanout import buffered_bytes, fan_out
+from multiplayer_heartbeat import HEARTBEAT_INTERVAL, HeartbeatWheel, process_rss_bytes
+from multiplayer_journal import GameJournal
+from multiplayer_matchmaking import Matchmaker
+from multiplayer_spectators import DELTA, END, SNAPSHOT, SpectatorFeed
+from server_logging import dropped_records, setup_logging
+from server_metrics import (REGISTRY, counter, gauge, histogram, metrics_response, request_timer,
+                            with_labels)
+
 # Import database module
+db_writer = None
+leaderboards = None
 try:
-    from multiplayer_db import MultiplayerDB
-    db = MultiplayerDB()
+    from multiplayer_db import MultiplayerDB, PersistenceWriter
+    from multiplayer_leaderboard import Leaderboards
+    # MULTIPLAYER_RATING_SYSTEM: 'elo' (default) or 'glicko2'
+    db = MultiplayerDB(rating_system=os.environ.get('MULTIPLAYER_RATING_SYSTEM', 'elo'))
+    # Game results are written by a background thread, never on the event loop
+    db_writer = PersistenceWriter(db)
     print("✅ Database module loaded successfully")
 except ImportError:
     # Fallback if module not found
@@ -32,115 +61,415 @@ except Exception as e:
     db = None
     print(f"⚠️  Warning: Database initialization failed: {e}. Database features disabled.")
 
+# Runtime logging goes through server_logging's queue (SERVER_LOG_LEVEL/FORMAT/SAMPLE);
+# the banner and startup messages stay plain prints
+log = logging.getLogger('multiplayer')
+connection_log = logging.getLogger('multiplayer.connections')  # One line per connect/disconnect
+
 # Game state storage (in-memory for active games)
 games = {}  # game_id -> game_state
 players = {}  # player_id -> {name, websocket, game_id}
-waiting_players = []  # List of player_ids waiting for a match
+matchmaker = Matchmaker()  # Players waiting for an opponent, by game type and rating
+match_requests = {}  # player_id -> (name, rating, account_id) for everyone in the matchmaker
+spectator_feeds = {}  # player_id -> SpectatorFeed, for spectators connected to this worker
+MATCHMAKING_TICK = 1.0  # Seconds between widened-window pairing passes
+
+# Crash recovery: games in progress are journaled (MULTIPLAYER_JOURNAL=off
+# disables it) and rebuilt on restart; players then have RESUME_GRACE
+# seconds (MULTIPLAYER_RESUME_GRACE) to reconnect and send {type: 'resume', game_id, resume_token}
+journal = None  # GameJournal for the games this worker owns
+RESUME_GRACE = float(os.environ.get('MULTIPLAYER_RESUME_GRACE', 120))
+shutting_down = False  # Connections closing because we are stopping: keep their games
+
+# Keep-alive: one timer wheel pings idle sockets and reaps dead ones (see
+# multiplayer_heartbeat); the websockets per-connection keepalive is off
+heartbeat = None  # HeartbeatWheel, started in main()
+PING_FRAME = '{"type":"ping"}'  # What clients send; answered without decoding
+PONG_FRAME = '{"type":"pong"}'
+LISTEN_BACKLOG = 1024  # Pending connections the kernel queues during connect bursts
+STATS_INTERVAL = 5.0  # Seconds between connection stats reports to worker 0
+worker_stats = {}  # worker index -> latest connection_stats() (worker 0 only)
+worker_metrics = {}  # worker index -> latest REGISTRY.collect() (worker 0 only)
+
+# Metrics for /metrics (see server_metrics; SERVER_METRICS=off makes these no-ops)
+CLIENT_MESSAGE_TYPES = {'join', 'move', 'chat', 'game_end', 'resume', 'watch', 'unwatch', 'ping'}
+MESSAGE_SECONDS = histogram('multiplayer_message_duration_seconds',
+                            'Client messages handled, by type', ('type',))
+SEND_SECONDS = histogram('multiplayer_ws_send_duration_seconds',
+                         'Encoding and sending one message to local sockets, by codec', ('codec',))
+MESSAGES_SENT = counter('multiplayer_messages_sent_total', 'Messages sent to WebSocket clients')
+SEND_DROPS = counter('multiplayer_send_drops_total', 'Clients dropped because a send failed or backed up')
+DB_SECONDS = histogram('multiplayer_db_duration_seconds', 'Database calls by operation', ('operation',))
+CONNECTIONS = counter('multiplayer_connections_total', 'WebSocket connections accepted')
+GAMES_STARTED = counter('multiplayer_games_started_total', 'Games started')
+GAMES_ENDED = counter('multiplayer_games_ended_total', 'Games finished or abandoned', ('status',))
+ILLEGAL_MOVES = counter('multiplayer_illegal_moves_total', 'Chess moves rejected by the server')
+baseline_rss = None  # Process memory before any connections, for the per-connection figure
+
+PORT = 9877
+HTTP_PORT = 9878  # HTTP API for statistics
+HOST = "0.0.0.0"  # Bind to all interfaces (localhost + Tailscale)
+
+# Sharding (--workers N): every worker accepts connections on PORT via
+# SO_REUSEPORT. A player lives on the worker holding their socket, a game
+# on worker_for(game_id); matchmaking and the HTTP API run on worker 0.
+# Anything addressed to another worker goes through the message broker.
+WORKER_INDEX = 0
+WORKER_COUNT = 1
+broker = None  # BrokerClient when WORKER_COUNT > 1
 
 class GameState:
-    def __init__(self, game_id, player1_id, player2_id, game_type='chess'):
+    def __init__(self, game_id, player1_id, player2_id, game_type='chess', player_names=None, accounts=None):
         self.game_id = game_id
         self.player1_id = player1_id
         self.player2_id = player2_id
+        self.player_names = player_names or {}  # player_id -> name (either may be on another worker)
+        self.accounts = accounts or {}  # player_id -> account id, the player's database identity
+        self.spectators = set()  # player_ids watching, on any worker
         self.game_type = game_type
         self.current_turn = player1_id
-        self.board_state = None
+        self.board_state = ChessBoard() if game_type == 'chess' else None  # Server-side rules, chess only
         self.move_history = []
+        self.resume_tokens = {}  # player_id -> secret for resuming after a restart
+        self.awaiting = set()  # Recovered from the journal, not yet resumed by these players
         self.created_at = datetime.now().isoformat()
         self.status = 'active'  # active, finished, abandoned
+    
+    def rebind(self, old_id, new_id):
+        """Hand a player's seat to their new connection's player id"""
+        if self.player1_id == old_id:
+            self.player1_id = new_id
+        if self.player2_id == old_id:
+            self.player2_id = new_id
+        if self.current_turn == old_id:
+            self.current_turn = new_id
+        self.player_names[new_id] = self.player_names.pop(old_id)
+        self.accounts[new_id] = self.accounts.pop(old_id, old_id)
+        self.resume_tokens[new_id] = self.resume_tokens.pop(old_id)
+        for entry in self.move_history:
+            if entry['player_id'] == old_id:
+                entry['player_id'] = new_id
+    
+    def account(self, player_id):
+        """Database id for a seat (None stays None, for draws)"""
+        return self.accounts.get(player_id, player_id)
+
+def seating(seats):
+    """
+    [[player_id, name, account_id], x2] -> (player ids, {player_id: name},
+    {player_id: account_id}); journals from before account ids have pairs
+    """
+    player_ids = [seat[0] for seat in seats]
+    names = {seat[0]: seat[1] for seat in seats}
+    accounts = {seat[0]: seat[2] if len(seat) > 2 else seat[0] for seat in seats}
+    return player_ids, names, accounts
+
+async def persist_game(**game):
+    """
+    Hand a finished game to the background writer.
+    
+    Only waits (off the event loop) if the writer's queue is full, so a
+    burst of game ends applies backpressure instead of stalling every
+    other connection on disk I/O.
+    """
+    GAMES_ENDED.labels(game['status']).inc()
+    if not db_writer:
+        return
+    try:
+        db_writer.submit(block=False, **game)
+    except queue.Full:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: db_writer.submit(**game))
+    except Exception as e:
+        log.error("⚠️  Could not queue game %s for saving: %s", game.get('game_id'), e)
+
+def journal_record(op, **fields):
+    """Append to the game journal (written and fsynced in the background)"""
+    if journal:
+        journal.record(op, **fields)
+
+def worker_for(entity_id):
+    """Index of the worker that owns a player or game id"""
+    return zlib.crc32(str(entity_id).encode('utf-8')) % WORKER_COUNT
+
+def new_id(worker=None):
+    """A fresh 8-character id owned by `worker` (default: this one)"""
+    worker = WORKER_INDEX if worker is None else worker
+    while True:
+        entity_id = str(uuid.uuid4())[:8]
+        if worker_for(entity_id) == worker:
+            return entity_id
+
+def worker_topic(worker):
+    return f'worker.{worker}'
+
+async def route(worker, envelope):
+    """Carry out an envelope on `worker`: right here if that's us, else via the broker"""
+    if worker == WORKER_INDEX:
+        await handle_envelope(envelope)
+    else:
+        await broker.publish(worker_topic(worker), envelope)
+
+async def handle_envelope(envelope):
+    """Perform one operation addressed to this worker (see route())"""
+    op = envelope['op']
+    player_id = envelope.get('player_id')
+    
+    if op == 'deliver':
+        # Already-serialized message for players connected here
+        await deliver([pid for pid in envelope['player_ids'] if pid in players],
+                      Payload(json_text=envelope['payload']))
+    
+    elif op == 'set_game':
+        game_id = envelope['game_id']
+        if player_id in players:
+            players[player_id]['game_id'] = game_id
+            players[player_id]['game_started_at'] = envelope['started_at']
+        elif game_id:
+            # Disconnected before the game reached them
+            await route(worker_for(game_id), {'op': 'abandon', 'game_id': game_id, 'player_id': player_id})
+    
+    elif op == 'game_message':
+        await handle_game_message(player_id, envelope['data'])
+    
+    elif op == 'join':
+        await find_or_create_game(player_id, envelope['name'], envelope['rating'], envelope['game_type'],
+                                  envelope.get('account_id'))
+    
+    elif op == 'cancel_match':
+        cancel_match(player_id)
+    
+    elif op == 'create_game':
+        await create_game(envelope['game_id'], envelope['game_type'], envelope['players'])
+    
+    elif op == 'notify_started':
+        await notify_game_started(envelope['game_id'])
+    
+    elif op == 'abandon':
+        await abandon_game(envelope['game_id'], player_id)
+    
+    elif op == 'spectate':
+        push_to_feeds(envelope['player_ids'], envelope['game_id'], Payload(json_text=envelope['payload']),
+                      envelope['kind'])
+    
+    elif op == 'snapshot':
+        await send_snapshot(envelope['game_id'], player_id)
+    
+    elif op == 'standings':
+        if leaderboards:
+            leaderboards.apply(envelope['league_rows'], envelope['game_type_rows'])
+    
+    elif op == 'connection_stats':
+        worker_stats[envelope['stats']['worker']] = envelope['stats']
+        if envelope.get('metrics') is not None:
+            worker_metrics[envelope['stats']['worker']] = envelope['metrics']
 
-async def register_player(websocket, player_name):
-    """Register a new player"""
-    player_id = str(uuid.uuid4())[:8]
+def account_for(token):
+    """
+    Stable database id for a client's secret token (kept in its
+    localStorage), so ratings and stats follow the player across
+    connections. None without a usable token.
+    """
+    if not isinstance(token, str) or not 16 <= len(token) <= 128:
+        return None
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+async def register_player(websocket, player_name, codec=JSON, account_id=None):
+    """
+    Register a new connection. The player id is per connection (it picks
+    this worker); the account id (default: the player id) is who they are
+    in the database.
+    """
+    player_id = new_id()
+    account_id = account_id or player_id
     
-    # Get or create player in database
+    # Get or create player in database (on a thread, off the event loop)
+    rating = 1000
     if db:
         try:
-            player_data = db.get_or_create_player(player_id, player_name)
-        except:
-            pass  # Continue without database
+            loop = asyncio.get_running_loop()
+            async with DB_SECONDS.labels('get_or_create_player').time():
+                player_data = await loop.run_in_executor(None, db.get_or_create_player, account_id, player_name)
+            rating = player_data.get('elo_rating') or rating
+        except Exception as e:
+            log.warning("⚠️  Player lookup failed for %s: %s", account_id, e)  # Continue without database
     
     players[player_id] = {
         'id': player_id,
+        'account_id': account_id,
         'name': player_name,
         'websocket': websocket,
+        'codec': codec,  # Wire encoding for binary frames (see multiplayer_codecs)
         'game_id': None,
+        'rating': rating,  # Used for matchmaking
         'connected_at': datetime.now().isoformat(),
+        'messages_in': 0,
+        'bytes_in': 0,
         'game_started_at': None  # Track when current game started
     }
     return player_id
 
-async def find_or_create_game(player_id, game_type='chess'):
-    """Find an available game or create a new one"""
+async def request_match(player_id, game_type='chess'):
+    """Ask the matchmaker (on worker 0) for an opponent"""
+    player = players[player_id]
     # Check if player is already in a game
-    if players[player_id]['game_id']:
-        return players[player_id]['game_id']
-    
-    # Look for waiting players
-    for waiting_id in waiting_players:
-        if waiting_id != player_id and waiting_id in players:
-            # Found a match!
-            waiting_players.remove(waiting_id)
-            game_id = str(uuid.uuid4())[:8]
-            started_at = datetime.now().isoformat()
-            game = GameState(game_id, waiting_id, player_id, game_type)
-            game.started_at = started_at
-            games[game_id] = game
-            players[waiting_id]['game_id'] = game_id
-            players[waiting_id]['game_started_at'] = started_at
-            players[player_id]['game_id'] = game_id
-            players[player_id]['game_started_at'] = started_at
-            return game_id
-    
-    # No match found, add to waiting list
-    waiting_players.append(player_id)
-    return None
+    if player['game_id']:
+        await route(worker_for(player['game_id']), {'op': 'notify_started', 'game_id': player['game_id']})
+        return
+    await route(0, {
+        'op': 'join',
+        'player_id': player_id,
+        'name': player['name'],
+        'rating': player['rating'],
+        'account_id': player['account_id'],
+        'game_type': game_type
+    })
+
+async def find_or_create_game(player_id, player_name, rating, game_type='chess', account_id=None):
+    """Find an available game or create a new one (worker 0 only)"""
+    # Pair with someone of similar rating already waiting for this game type,
+    # otherwise queue up (the matchmaking tick widens the search over time)
+    match_requests[player_id] = (player_name, rating, account_id or player_id)
+    waiting_id = matchmaker.enqueue(player_id, game_type, rating)
+    if waiting_id is None:
+        await send_to_player(player_id, {
+            'type': 'waiting',
+            'message': 'Waiting for opponent...'
+        })
+        return None
+    return await start_game(waiting_id, player_id, game_type)
+
+def cancel_match(player_id):
+    """Remove a player from matchmaking if queued"""
+    matchmaker.cancel(player_id)
+    match_requests.pop(player_id, None)
+
+async def start_game(player1_id, player2_id, game_type):
+    """Create a game between two matched players (player 1 moves first)"""
+    # Give the game to player 1's worker, so at least their moves skip the broker
+    game_id = new_id(worker_for(player1_id))
+    seats = []
+    for player_id in (player1_id, player2_id):
+        name, _, account_id = match_requests.pop(player_id, ('Player', None, player_id))
+        seats.append([player_id, name, account_id])
+    await route(worker_for(game_id), {
+        'op': 'create_game',
+        'game_id': game_id,
+        'game_type': game_type,
+        'players': seats
+    })
+    return game_id
+
+async def create_game(game_id, game_type, seats):
+    """Set up a game on the worker that owns it and tell both players"""
+    (player1_id, player2_id), names, accounts = seating(seats)
+    game = GameState(game_id, player1_id, player2_id, game_type, names, accounts)
+    game.started_at = datetime.now().isoformat()
+    game.resume_tokens = {player_id: secrets.token_hex(8) for player_id in (player1_id, player2_id)}
+    games[game_id] = game
+    GAMES_STARTED.inc()
+    journal_record('start', game_id=game_id, game_type=game_type,
+                   players=[list(seat) for seat in seats],
+                   tokens=dict(game.resume_tokens), started_at=game.started_at)
+    for player_id in (player1_id, player2_id):
+        await set_player_game(player_id, game_id, game.started_at)
+    await notify_game_started(game_id)
+
+async def set_player_game(player_id, game_id, started_at=None):
+    """Record (or clear, with None) a player's current game on their worker"""
+    await route(worker_for(player_id), {
+        'op': 'set_game',
+        'player_id': player_id,
+        'game_id': game_id,
+        'started_at': started_at
+    })
+
+async def notify_game_started(game_id):
+    """Tell both players their game has begun"""
+    game = games.get(game_id)
+    if not game:
+        return
+    await asyncio.gather(*(send_to_player(player_id, {
+        'type': 'game_started',
+        'game_id': game_id,
+        'game_type': game.game_type,
+        'opponent': game.player_names[opponent_id],
+        'opponent_id': opponent_id,
+        'your_color': color,
+        'your_turn': game.current_turn == player_id,
+        'resume_token': game.resume_tokens.get(player_id)
+    }) for player_id, opponent_id, color in ((game.player1_id, game.player2_id, 'white'),
+                                             (game.player2_id, game.player1_id, 'black'))))
+
+async def matchmaking_loop():
+    """Periodically pair players whose rating window has widened"""
+    while True:
+        await asyncio.sleep(MATCHMAKING_TICK)
+        for player1_id, player2_id, game_type in matchmaker.tick():
+            await start_game(player1_id, player2_id, game_type)
+        # Backstop for disconnects that never reached us: local players who are gone
+        for player_id in [pid for pid in match_requests if pid not in players and worker_for(pid) == WORKER_INDEX]:
+            cancel_match(player_id)
 
 async def handle_message(websocket, message, player_id):
     """Handle incoming messages from clients"""
+    msg_type = None
+    started = time.perf_counter()
     try:
-        data = json.loads(message)
+        data = decode(players[player_id]['codec'], message)
         msg_type = data.get('type')
         
         if msg_type == 'join':
             # Player wants to join/create a game
-            game_type = data.get('game_type', 'chess')
-            game_id = await find_or_create_game(player_id, game_type)
-            
-            if game_id:
-                # Game found or created
-                game = games[game_id]
-                opponent_id = game.player2_id if game.player1_id == player_id else game.player1_id
-                opponent = players[opponent_id]
-                
-                # Notify both players
+            await request_match(player_id, data.get('game_type', 'chess'))
+        
+        elif msg_type in ('move', 'chat', 'game_end', 'resume'):
+            # Handled by whichever worker owns the game
+            game_id = data.get('game_id')
+            owner = worker_for(game_id) if game_id else WORKER_INDEX
+            await route(owner, {'op': 'game_message', 'player_id': player_id, 'data': data})
+        
+        elif msg_type in ('watch', 'unwatch'):
+            # Spectating: the feed lives here, the subscription with the game's owner
+            game_id = data.get('game_id')
+            if not isinstance(game_id, str):
                 await send_to_player(player_id, {
-                    'type': 'game_started',
-                    'game_id': game_id,
-                    'game_type': game_type,
-                    'opponent': opponent['name'],
-                    'opponent_id': opponent_id,
-                    'your_color': 'white' if game.player1_id == player_id else 'black',
-                    'your_turn': game.current_turn == player_id
-                })
-                
-                await send_to_player(opponent_id, {
-                    'type': 'game_started',
-                    'game_id': game_id,
-                    'game_type': game_type,
-                    'opponent': players[player_id]['name'],
-                    'opponent_id': player_id,
-                    'your_color': 'black' if game.player1_id == player_id else 'white',
-                    'your_turn': game.current_turn == opponent_id
+                    'type': 'error',
+                    'message': 'Invalid game ID'
                 })
+                return
+            feed = spectator_feed(player_id)
+            if msg_type == 'watch':
+                feed.watch(game_id)
             else:
-                # Waiting for opponent
-                await send_to_player(player_id, {
-                    'type': 'waiting',
-                    'message': 'Waiting for opponent...'
-                })
+                feed.unwatch(game_id)
+            await route(worker_for(game_id), {'op': 'game_message', 'player_id': player_id, 'data': data})
         
-        elif msg_type == 'move':
+        elif msg_type == 'ping':
+            # Keep-alive ping (binary codecs; JSON pings are answered in handle_client)
+            await send_to_player(player_id, {'type': 'pong'})
+            
+    except DecodeError as e:
+        await send_to_player(player_id, {
+            'type': 'error',
+            'message': str(e)
+        })
+    except Exception as e:
+        log.exception("Error handling message: %s", e, extra={'player_id': player_id})
+        await send_to_player(player_id, {
+            'type': 'error',
+            'message': str(e)
+        })
+    finally:
+        MESSAGE_SECONDS.labels(msg_type if msg_type in CLIENT_MESSAGE_TYPES else 'other').observe(
+            time.perf_counter() - started)
+
+async def handle_game_message(player_id, data):
+    """Apply a move, chat, game end or (un)watch to a game owned by this worker"""
+    try:
+        msg_type = data.get('type')
+        
+        if msg_type == 'move':
             # Player made a move
             game_id = data.get('game_id')
             move = data.get('move')
@@ -162,12 +491,28 @@ async def handle_message(websocket, message, player_id):
                 })
                 return
             
+            # Chess moves are checked against the server's board before anyone sees them
+            if game.board_state is not None:
+                try:
+                    game.board_state.play(move)
+                except IllegalMove as e:
+                    ILLEGAL_MOVES.inc()
+                    await send_to_player(player_id, {
+                        'type': 'error',
+                        'message': f'Illegal move: {e}',
+                        'game_id': game_id,
+                        'move': move
+                    })
+                    return
+            
             # Add move to history
-            game.move_history.append({
+            entry = {
                 'player_id': player_id,
                 'move': move,
                 'timestamp': datetime.now().isoformat()
-            })
+            }
+            game.move_history.append(entry)
+            journal_record('move', game_id=game_id, **entry)
             
             # Switch turn
             game.current_turn = game.player2_id if game.current_turn == game.player1_id else game.player1_id
@@ -175,20 +520,46 @@ async def handle_message(websocket, message, player_id):
             # Notify both players
             opponent_id = game.player2_id if game.player1_id == player_id else game.player1_id
             
-            await send_to_player(player_id, {
-                'type': 'move_applied',
-                'game_id': game_id,
-                'move': move,
-                'your_turn': False
-            })
+            await asyncio.gather(
+                send_to_player(player_id, {
+                    'type': 'move_applied',
+                    'game_id': game_id,
+                    'move': move,
+                    'your_turn': False
+                }),
+                send_to_player(opponent_id, {
+                    'type': 'opponent_move',
+                    'game_id': game_id,
+                    'move': move,
+                    'your_turn': True
+                })
+            )
             
-            await send_to_player(opponent_id, {
-                'type': 'opponent_move',
+            # Spectators get the move as a delta on their snapshot
+            await spectate(game_id, game.spectators, {
+                'type': 'spectate_move',
                 'game_id': game_id,
-                'move': move,
-                'your_turn': True
+                'seq': len(game.move_history),
+                'player_id': player_id,
+                'move': move
             })
         
+        elif msg_type == 'resume':
+            # Reconnecting after a restart
+            await resume_game(player_id, data.get('game_id'), data.get('resume_token'))
+        
+        elif msg_type == 'watch':
+            # New spectator: snapshot now, deltas from then on
+            game_id = data.get('game_id')
+            if game_id in games:
+                games[game_id].spectators.add(player_id)
+            await send_snapshot(game_id, player_id)
+        
+        elif msg_type == 'unwatch':
+            game_id = data.get('game_id')
+            if game_id in games:
+                games[game_id].spectators.discard(player_id)
+        
         elif msg_type == 'chat':
             # Chat message
             game_id = data.get('game_id')
@@ -196,27 +567,35 @@ async def handle_message(websocket, message, player_id):
             
             if game_id and game_id in games:
                 game = games[game_id]
+                if player_id not in (game.player1_id, game.player2_id):
+                    # Spectators can see any game id; only the two players may chat or end it
+                    await send_to_player(player_id, {
+                        'type': 'error',
+                        'message': 'You are not playing in this game'
+                    })
+                    return
                 opponent_id = game.player2_id if game.player1_id == player_id else game.player1_id
                 
                 await send_to_player(opponent_id, {
                     'type': 'chat',
                     'game_id': game_id,
-                    'from': players[player_id]['name'],
+                    'from': game.player_names.get(player_id, 'Player'),
                     'message': message_text
                 })
         
-        elif msg_type == 'ping':
-            # Keep-alive ping
-            await send_to_player(player_id, {'type': 'pong'})
-        
         elif msg_type == 'game_end':
             # Game finished - save to database
             game_id = data.get('game_id')
-            winner_id = data.get('winner_id')  # None for draw
-            result = data.get('result')  # 'win', 'loss', 'draw'
+            result = data.get('result')  # 'win', 'loss', 'draw', from the sender's side
             
             if game_id and game_id in games:
                 game = games[game_id]
+                if player_id not in (game.player1_id, game.player2_id):
+                    await send_to_player(player_id, {
+                        'type': 'error',
+                        'message': 'You are not playing in this game'
+                    })
+                    return
                 game.status = 'finished'
                 finished_at = datetime.now().isoformat()
                 started_at = game.started_at or game.created_at
@@ -229,57 +608,54 @@ async def handle_message(websocket, message, player_id):
                 else:
                     winner = None  # Draw
                 
-                # Save to database
-                if db:
-                    try:
-                        db.save_game(
-                            game_id=game_id,
-                            game_type=game.game_type,
-                            player1_id=game.player1_id,
-                            player2_id=game.player2_id,
-                            player1_name=players[game.player1_id]['name'],
-                            player2_name=players[game.player2_id]['name'],
-                            move_history=game.move_history,
-                            winner_id=winner,
-                            status='finished',
-                            started_at=started_at,
-                            finished_at=finished_at
-                        )
-                    except:
-                        pass  # Continue without database
+                # Save to database (in the background)
+                await persist_game(
+                    game_id=game_id,
+                    game_type=game.game_type,
+                    player1_id=game.account(game.player1_id),
+                    player2_id=game.account(game.player2_id),
+                    player1_name=game.player_names[game.player1_id],
+                    player2_name=game.player_names[game.player2_id],
+                    move_history=game.move_history,
+                    winner_id=game.account(winner) if winner else None,
+                    status='finished',
+                    started_at=started_at,
+                    finished_at=finished_at
+                )
                 
                 # Notify both players
                 opponent_id = game.player2_id if game.player1_id == player_id else game.player1_id
-                await send_to_player(player_id, {
-                    'type': 'game_saved',
-                    'game_id': game_id,
-                    'result': result
-                })
-                if opponent_id in players:
-                    await send_to_player(opponent_id, {
+                await asyncio.gather(
+                    send_to_player(player_id, {
+                        'type': 'game_saved',
+                        'game_id': game_id,
+                        'result': result
+                    }),
+                    send_to_player(opponent_id, {
                         'type': 'game_saved',
                         'game_id': game_id,
                         'result': 'win' if result == 'loss' else ('loss' if result == 'win' else 'draw')
                     })
+                )
+                
+                await spectate(game_id, game.spectators, {
+                    'type': 'spectate_end',
+                    'game_id': game_id,
+                    'status': 'finished',
+                    'winner_id': winner
+                }, END)
                 
                 # Clean up
                 del games[game_id]
-                if player_id in players:
-                    players[player_id]['game_id'] = None
-                    players[player_id]['game_started_at'] = None
-                if opponent_id in players:
-                    players[opponent_id]['game_id'] = None
-                    players[opponent_id]['game_started_at'] = None
+                journal_record('end', game_id=game_id)
+                await set_player_game(player_id, None)
+                await set_player_game(opponent_id, None)
                 
-                print(f"✅ Game {game_id} saved to database (winner: {winner})")
+                log.info("✅ Game %s queued for saving (winner: %s)", game_id, winner,
+                         extra={'game_id': game_id, 'winner_id': winner})
             
-    except json.JSONDecodeError:
-        await send_to_player(player_id, {
-            'type': 'error',
-            'message': 'Invalid JSON'
-        })
     except Exception as e:
-        print(f"Error handling message: {e}")
+        log.exception("Error handling message: %s", e, extra={'player_id': player_id})
         await send_to_player(player_id, {
             'type': 'error',
             'message': str(e)
@@ -287,68 +663,256 @@ async def handle_message(websocket, message, player_id):
 
 async def send_to_player(player_id, message):
     """Send a message to a specific player"""
-    if player_id in players and players[player_id]['websocket']:
-        try:
-            await players[player_id]['websocket'].send(json.dumps(message))
-        except websockets.exceptions.ConnectionClosed:
-            # Player disconnected
-            await handle_disconnect(player_id)
+    await deliver([player_id], Payload(message))
+
+async def broadcast(player_ids, message):
+    """Send the same message to several players (encoded once per codec, sent concurrently)"""
+    await deliver(player_ids, Payload(message))
+
+async def deliver(player_ids, payload):
+    """
+    Send a Payload to players here, grouped by wire codec, and forward it
+    as JSON text to the workers holding the rest. A socket that is closed
+    or can't keep up is dropped like a disconnect.
+    """
+    local = defaultdict(list)  # codec -> player_ids
+    remote = defaultdict(list)
+    for player_id in player_ids:
+        if player_id in players:
+            if players[player_id]['websocket']:
+                local[players[player_id]['codec']].append(player_id)
+        elif worker_for(player_id) != WORKER_INDEX:
+            remote[worker_for(player_id)].append(player_id)
+    
+    for worker, worker_player_ids in remote.items():
+        await route(worker, {'op': 'deliver', 'player_ids': worker_player_ids, 'payload': payload.json})
+    
+    for codec, codec_player_ids in local.items():
+        sockets = [players[player_id]['websocket'] for player_id in codec_player_ids]
+        with SEND_SECONDS.labels(codec).time():
+            sent = await fan_out(sockets, payload.encode(codec))
+        MESSAGES_SENT.inc(len(sockets))
+        for player_id, websocket, ok in zip(codec_player_ids, sockets, sent):
+            if not ok and player_id in players:
+                # Player disconnected, or stopped reading
+                SEND_DROPS.inc()
+                asyncio.ensure_future(websocket.close(code=1013, reason='Too slow'))
+                await handle_disconnect(player_id)
 
 async def handle_disconnect(player_id):
     """Handle player disconnection"""
     if player_id not in players:
         return
     
-    # Remove from waiting list if present
-    if player_id in waiting_players:
-        waiting_players.remove(player_id)
+    # Stop spectating
+    feed = spectator_feeds.pop(player_id, None)
+    if feed:
+        feed.close()
+        for game_id in feed.watching:
+            await route(worker_for(game_id), {
+                'op': 'game_message',
+                'player_id': player_id,
+                'data': {'type': 'unwatch', 'game_id': game_id}
+            })
+    
+    # Remove from matchmaking if queued
+    await route(0, {'op': 'cancel_match', 'player_id': player_id})
     
-    # Handle game disconnection
+    # Handle game disconnection (on shutdown the journal keeps the game for the restart)
     game_id = players[player_id].get('game_id')
-    if game_id and game_id in games:
-        game = games[game_id]
-        opponent_id = game.player2_id if game.player1_id == player_id else game.player1_id
-        
-        # Notify opponent
-        if opponent_id in players:
-            await send_to_player(opponent_id, {
-                'type': 'opponent_disconnected',
-                'game_id': game_id,
-                'message': 'Your opponent disconnected'
-            })
-        
-        # Mark game as abandoned and save to database
-        game.status = 'abandoned'
-        finished_at = datetime.now().isoformat()
-        started_at = game.started_at or game.created_at
-        
-        # Save abandoned game to database
-        if db:
-            try:
-                db.save_game(
-                    game_id=game_id,
-                    game_type=game.game_type,
-                    player1_id=game.player1_id,
-                    player2_id=game.player2_id,
-                    player1_name=players[game.player1_id]['name'],
-                    player2_name=players[game.player2_id]['name'],
-                    move_history=game.move_history,
-                    winner_id=None,  # No winner for abandoned games
-                    status='abandoned',
-                    started_at=started_at,
-                    finished_at=finished_at
-                )
-            except:
-                pass  # Continue without database
-        
-        # Clean up
-        del games[game_id]
-        if opponent_id in players:
-            players[opponent_id]['game_id'] = None
-            players[opponent_id]['game_started_at'] = None
+    if game_id and not (shutting_down and journal):
+        await route(worker_for(game_id), {'op': 'abandon', 'game_id': game_id, 'player_id': player_id})
     
     # Remove player
-    del players[player_id]
+    players.pop(player_id, None)
+
+async def abandon_game(game_id, player_id):
+    """A player left mid-game: tell the opponent and save the game as abandoned"""
+    game = games.get(game_id)
+    if not game or player_id not in (game.player1_id, game.player2_id):
+        return
+    del games[game_id]
+    journal_record('end', game_id=game_id)
+    opponent_id = game.player2_id if game.player1_id == player_id else game.player1_id
+    
+    # Notify opponent
+    await send_to_player(opponent_id, {
+        'type': 'opponent_disconnected',
+        'game_id': game_id,
+        'message': 'Your opponent disconnected'
+    })
+    
+    # Mark game as abandoned and save to database
+    game.status = 'abandoned'
+    finished_at = datetime.now().isoformat()
+    started_at = game.started_at or game.created_at
+    
+    # Save abandoned game to database (in the background)
+    await persist_game(
+        game_id=game_id,
+        game_type=game.game_type,
+        player1_id=game.account(game.player1_id),
+        player2_id=game.account(game.player2_id),
+        player1_name=game.player_names[game.player1_id],
+        player2_name=game.player_names[game.player2_id],
+        move_history=game.move_history,
+        winner_id=None,  # No winner for abandoned games
+        status='abandoned',
+        started_at=started_at,
+        finished_at=finished_at
+    )
+
+    await spectate(game_id, game.spectators, {
+        'type': 'spectate_end',
+        'game_id': game_id,
+        'status': 'abandoned',
+        'winner_id': None
+    }, END)
+
+    # Clean up
+    await set_player_game(opponent_id, None)
+
+async def resume_game(player_id, game_id, resume_token):
+    """Give a seat back to its player, connected again (typically after a restart)"""
+    game = games.get(game_id)
+    seat = None
+    if game and isinstance(resume_token, str):
+        seat = next((seat_id for seat_id, token in game.resume_tokens.items()
+                     if secrets.compare_digest(token, resume_token)), None)
+    if seat is None:
+        await send_to_player(player_id, {
+            'type': 'error',
+            'message': 'Cannot resume game',
+            'game_id': game_id
+        })
+        return
+    if seat != player_id:
+        game.rebind(seat, player_id)
+        journal_record('rebind', game_id=game_id, old_player_id=seat, player_id=player_id)
+    game.awaiting.discard(seat)
+    await set_player_game(player_id, game_id, game.started_at)
+    
+    opponent_id = game.player2_id if game.player1_id == player_id else game.player1_id
+    await asyncio.gather(
+        send_to_player(player_id, {
+            'type': 'game_resumed',
+            'game_id': game_id,
+            'game_type': game.game_type,
+            'opponent': game.player_names[opponent_id],
+            'opponent_id': opponent_id,
+            'your_color': 'white' if game.player1_id == player_id else 'black',
+            'your_turn': game.current_turn == player_id,
+            'moves': [{'player_id': entry['player_id'], 'move': entry['move']} for entry in game.move_history],
+            'fen': game.board_state.fen() if game.board_state is not None else None
+        }),
+        send_to_player(opponent_id, {
+            'type': 'opponent_reconnected',
+            'game_id': game_id,
+            'opponent_id': player_id
+        })
+    )
+
+def restore_games():
+    """Rebuild this worker's games in progress from the journal; returns their ids"""
+    for game_id, saved in list(journal.recover().items()):
+        if worker_for(game_id) != WORKER_INDEX:
+            # Journaled with a different --workers count: its messages would go elsewhere
+            log.warning("⚠️  Dropping recovered game %s: it now belongs to worker %d", game_id, worker_for(game_id))
+            journal_record('end', game_id=game_id)
+            continue
+        (player1_id, player2_id), names, accounts = seating(saved['players'])
+        game = GameState(game_id, player1_id, player2_id, saved['game_type'], names, accounts)
+        game.started_at = saved['started_at']
+        game.resume_tokens = dict(saved['tokens'])
+        game.current_turn = saved['current_turn']
+        try:
+            for entry in saved['moves']:
+                if game.board_state is not None:
+                    game.board_state.play(entry['move'], validate=False)  # Checked when first played
+                game.move_history.append(dict(entry))
+        except IllegalMove as e:
+            log.warning("⚠️  Dropping recovered game %s: %s", game_id, e)
+            journal_record('end', game_id=game_id)
+            continue
+        game.awaiting = {player1_id, player2_id}
+        games[game_id] = game
+    if games:
+        log.info("♻️  Recovered %d game(s) from the journal; players have %.0fs to resume", len(games), RESUME_GRACE)
+    return list(games)
+
+async def expire_unresumed(game_ids):
+    """Abandon recovered games that a player never came back to"""
+    await asyncio.sleep(RESUME_GRACE)
+    for game_id in game_ids:
+        game = games.get(game_id)
+        if game and game.awaiting:
+            await abandon_game(game_id, next(iter(game.awaiting)))
+
+def spectator_feed(player_id):
+    """This connection's SpectatorFeed, created on its first watch"""
+    feed = spectator_feeds.get(player_id)
+    if feed is None:
+        feed = SpectatorFeed(players[player_id]['websocket'],
+                             lambda game_id: route(worker_for(game_id), {
+                                 'op': 'snapshot', 'game_id': game_id, 'player_id': player_id
+                             }),
+                             codec=players[player_id]['codec'])
+        spectator_feeds[player_id] = feed
+    return feed
+
+async def send_snapshot(game_id, player_id):
+    """Full state of a game for one spectator, or its end if the game is gone"""
+    game = games.get(game_id)
+    if not game or player_id not in game.spectators:
+        await spectate(game_id, [player_id], {
+            'type': 'spectate_end',
+            'game_id': game_id,
+            'status': 'not_found',
+            'winner_id': None
+        }, END)
+        return
+    await spectate(game_id, [player_id], {
+        'type': 'spectate_snapshot',
+        'game_id': game_id,
+        'game_type': game.game_type,
+        'white': {'id': game.player1_id, 'name': game.player_names[game.player1_id]},
+        'black': {'id': game.player2_id, 'name': game.player_names[game.player2_id]},
+        'current_turn': game.current_turn,
+        'seq': len(game.move_history),
+        'moves': [{'player_id': entry['player_id'], 'move': entry['move']} for entry in game.move_history],
+        'fen': game.board_state.fen() if game.board_state is not None else None,
+        'spectators': len(game.spectators)
+    }, SNAPSHOT)
+
+async def spectate(game_id, spectator_ids, message, kind=DELTA):
+    """Queue one update, encoded once per codec, on the feeds of the given spectators"""
+    if not spectator_ids:
+        return
+    payload = Payload(message)
+    local = []
+    remote = defaultdict(list)
+    for spectator_id in spectator_ids:
+        worker = worker_for(spectator_id)
+        if worker == WORKER_INDEX:
+            local.append(spectator_id)
+        else:
+            remote[worker].append(spectator_id)
+    push_to_feeds(local, game_id, payload, kind)
+    for worker, worker_spectator_ids in remote.items():
+        await route(worker, {
+            'op': 'spectate',
+            'game_id': game_id,
+            'player_ids': worker_spectator_ids,
+            'payload': payload.json,
+            'kind': kind
+        })
+
+def push_to_feeds(spectator_ids, game_id, payload, kind):
+    """Queue an update on the feeds of spectators connected here"""
+    for spectator_id in spectator_ids:
+        feed = spectator_feeds.get(spectator_id)
+        if feed:
+            feed.push(game_id, payload, kind)
 
 # HTTP API for statistics
 async def get_player_stats(request):
@@ -364,16 +928,33 @@ async def get_player_stats(request):
     except:
         return web.json_response({'error': 'Database error'}, status=500)
 
+def etag_response(request, etag, payload, status=200):
+    """JSON response with an ETag; 304 if the client already has this version"""
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in (tag.strip() for tag in if_none_match.split(',')):
+        return web.Response(status=304, headers={'ETag': etag})
+    response = web.json_response(payload, status=status)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 async def get_league_table(request):
     """Get league table/leaderboard"""
     if not db:
         return web.json_response({'error': 'Database not available'}, status=503)
     limit = int(request.query.get('limit', 50))
-    try:
-        standings = db.get_league_table(limit)
-        return web.json_response({'standings': standings})
-    except:
-        return web.json_response({'error': 'Database error'}, status=500)
+    standings, etag = leaderboards.league_top(limit)
+    return etag_response(request, etag, {'standings': standings})
+
+async def get_league_rank(request):
+    """Get one player's league position"""
+    if not db:
+        return web.json_response({'error': 'Database not available'}, status=503)
+    player_id = request.match_info.get('player_id')
+    rank, etag = leaderboards.league_rank(player_id)
+    if rank is None:
+        return etag_response(request, etag, {'error': 'Player not ranked'}, status=404)
+    return etag_response(request, etag, rank)
 
 async def get_game_type_leaderboard(request):
     """Get leaderboard for specific game type"""
@@ -381,15 +962,117 @@ async def get_game_type_leaderboard(request):
         return web.json_response({'error': 'Database not available'}, status=503)
     game_type = request.match_info.get('game_type')
     limit = int(request.query.get('limit', 20))
-    try:
-        leaderboard = db.get_game_type_leaderboard(game_type, limit)
-        return web.json_response({'leaderboard': leaderboard})
-    except:
-        return web.json_response({'error': 'Database error'}, status=500)
+    leaderboard, etag = leaderboards.game_type_top(game_type, limit)
+    return etag_response(request, etag, {'leaderboard': leaderboard})
+
+async def get_game_type_rank(request):
+    """Get one player's position on a game type leaderboard"""
+    if not db:
+        return web.json_response({'error': 'Database not available'}, status=503)
+    game_type = request.match_info.get('game_type')
+    player_id = request.match_info.get('player_id')
+    rank, etag = leaderboards.game_type_rank(game_type, player_id)
+    if rank is None:
+        return etag_response(request, etag, {'error': 'Player not ranked'}, status=404)
+    return etag_response(request, etag, rank)
+
+def connection_stats(top=10):
+    """This worker's connections: counts, unsent bytes, memory, and the most backed-up sockets"""
+    buffered = [(buffered_bytes(player['websocket']), player_id) for player_id, player in players.items()]
+    rss = process_rss_bytes()
+    connections = len(heartbeat) if heartbeat else len(players)
+    busiest = []
+    for bytes_queued, player_id in heapq.nlargest(top, buffered):
+        player = players[player_id]
+        idle = heartbeat.idle_seconds(player['websocket']) if heartbeat else None
+        busiest.append({
+            'player_id': player_id,
+            'name': player['name'],
+            'buffered_bytes': bytes_queued,
+            'idle_seconds': round(idle, 1) if idle is not None else None,
+            'messages_in': player['messages_in'],
+            'bytes_in': player['bytes_in'],
+            'codec': player['codec'],
+            'connected_at': player['connected_at']
+        })
+    return {
+        'worker': WORKER_INDEX,
+        'pid': os.getpid(),
+        'updated_at': datetime.now().isoformat(),
+        'connections': connections,
+        'players': len(players),
+        'spectators': len(spectator_feeds),
+        'games': len(games),
+        'buffered_bytes': sum(bytes_queued for bytes_queued, _ in buffered),
+        'rss_bytes': rss,
+        'rss_per_connection': (rss - baseline_rss) // connections if rss and baseline_rss and connections else None,
+        'heartbeat': heartbeat.stats() if heartbeat else None,
+        'top_buffered': busiest
+    }
+
+async def get_connections(request):
+    """Connection and memory stats for every worker (other workers' figures are up to STATS_INTERVAL old)"""
+    top = int(request.query.get('top', 10))
+    workers = [connection_stats(top)] + [worker_stats[index] for index in sorted(worker_stats)]
+    return web.json_response({
+        'connections': sum(worker['connections'] for worker in workers),
+        'players': sum(worker['players'] for worker in workers),
+        'buffered_bytes': sum(worker['buffered_bytes'] for worker in workers),
+        'rss_bytes': sum(worker['rss_bytes'] or 0 for worker in workers),
+        'workers': workers
+    })
+
+async def get_metrics(request):
+    """Prometheus metrics, labelled by worker when sharded (others' up to STATS_INTERVAL old)"""
+    if not REGISTRY.enabled:
+        raise web.HTTPNotFound(text='Metrics are disabled (SERVER_METRICS=off)')
+    families = REGISTRY.collect()
+    if WORKER_COUNT > 1:
+        families = with_labels(families, worker=WORKER_INDEX)
+        for index in sorted(worker_metrics):
+            families += with_labels(worker_metrics[index], worker=index)
+    return metrics_response(families)
+
+def register_gauges():
+    """Gauges read at scrape time from state the server keeps anyway"""
+    gauge('multiplayer_connections', 'Open WebSocket connections').set_function(
+        lambda: len(heartbeat) if heartbeat else None)
+    gauge('multiplayer_players', 'Registered players connected').set_function(lambda: len(players))
+    gauge('multiplayer_spectators', 'Connected spectators').set_function(lambda: len(spectator_feeds))
+    gauge('multiplayer_active_games', 'Games in progress').set_function(lambda: len(games))
+    gauge('multiplayer_waiting_players', 'Players waiting for an opponent').set_function(
+        lambda: len(match_requests) if WORKER_INDEX == 0 else None)
+    gauge('multiplayer_db_queue', 'Finished games waiting to be saved').set_function(
+        lambda: db_writer.queue.qsize() if db_writer else None)
+    gauge('multiplayer_journal_queue', 'Journal records waiting to be written').set_function(
+        lambda: journal.queue.qsize() if journal else None)
+    counter('log_records_dropped_total', 'Log records dropped because the log queue was full').set_function(
+        dropped_records)
+    counter('multiplayer_heartbeat_reaped_total', 'Connections dropped for missing heartbeats').set_function(
+        lambda: heartbeat.reaped if heartbeat else None)
+    gauge('process_resident_memory_bytes', 'Resident memory of this process').set_function(process_rss_bytes)
+
+async def stats_loop():
+    """Workers other than 0 report their connection stats and metrics for its HTTP API"""
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        await broker.publish(worker_topic(0), {
+            'op': 'connection_stats',
+            'stats': connection_stats(),
+            'metrics': REGISTRY.collect() if REGISTRY.enabled else None
+        })
+
+def reap_connection(websocket):
+    """Heartbeat timeout: drop the socket; handle_client cleans up as the connection closes"""
+    transport = getattr(websocket, 'transport', None)
+    if transport:
+        transport.abort()
+    else:
+        asyncio.ensure_future(websocket.close(code=1011, reason='Heartbeat timeout'))
 
 def setup_http_api():
     """Setup HTTP API server for statistics"""
-    app = web.Application()
+    app = web.Application(middlewares=[request_timer('multiplayer')])
     
     # Add CORS
     cors = aiohttp_cors.setup(app, defaults={
@@ -404,7 +1087,11 @@ def setup_http_api():
     # API routes
     app.router.add_get('/api/player/{player_id}/stats', get_player_stats)
     app.router.add_get('/api/league', get_league_table)
+    app.router.add_get('/api/league/rank/{player_id}', get_league_rank)
     app.router.add_get('/api/leaderboard/{game_type}', get_game_type_leaderboard)
+    app.router.add_get('/api/leaderboard/{game_type}/rank/{player_id}', get_game_type_rank)
+    app.router.add_get('/api/connections', get_connections)
+    app.router.add_get('/metrics', get_metrics)
     
     # Add CORS to all routes
     for route in list(app.router.routes()):
@@ -417,47 +1104,63 @@ async def handle_client(websocket, path=None):
     player_id = None
     player_name = "Player"
     
+    # Wire encoding: a "multiplayer.<codec>" subprotocol picked during the
+    # handshake, or an "encoding" preference in the register message.
+    # Text frames are always JSON; binary frames use the chosen codec.
+    codec = codec_for_subprotocol(getattr(websocket, 'subprotocol', None))
+    heartbeat.add(websocket)
+    CONNECTIONS.inc()
+    
     try:
         # Wait for initial registration
         message = await websocket.recv()
-        data = json.loads(message)
+        data = decode(codec, message)
         
         if data.get('type') == 'register':
             player_name = data.get('name', f'Player{len(players)}')
-            player_id = await register_player(websocket, player_name)
+            codec = choose_codec(data.get('encoding'), codec)
+            player_id = await register_player(websocket, player_name, codec, account_for(data.get('token')))
             
-            await websocket.send(json.dumps({
+            await websocket.send(encode(codec, {
                 'type': 'registered',
                 'player_id': player_id,
-                'name': player_name
+                'account_id': players[player_id]['account_id'],  # For /api/player/{id}/stats and ranks
+                'name': player_name,
+                'encoding': codec
             }))
             
-            print(f"✅ Player connected: {player_name} ({player_id})")
+            connection_log.info("✅ Player connected: %s (%s)", player_name, player_id,
+                                extra={'player_id': player_id})
         else:
-            await websocket.send(json.dumps({
+            await websocket.send(encode(codec, {
                 'type': 'error',
                 'message': 'Must register first'
             }))
             return
         
         # Handle messages
+        player = players[player_id]
         async for message in websocket:
+            heartbeat.seen(websocket)
+            player['messages_in'] += 1
+            player['bytes_in'] += len(message)
+            if message == PING_FRAME:
+                await websocket.send(PONG_FRAME)
+                continue
             await handle_message(websocket, message, player_id)
             
     except websockets.exceptions.ConnectionClosed:
-        print(f"⚠️  Player disconnected: {player_name} ({player_id})")
+        connection_log.info("⚠️  Player disconnected: %s (%s)", player_name, player_id,
+                            extra={'player_id': player_id})
     except Exception as e:
-        print(f"❌ Error with client: {e}")
+        log.exception("❌ Error with client: %s", e, extra={'player_id': player_id})
     finally:
+        heartbeat.remove(websocket)
         if player_id:
             await handle_disconnect(player_id)
 
-async def main():
-    PORT = 9877
-    HTTP_PORT = 9878  # HTTP API for statistics
-    HOST = "0.0.0.0"  # Bind to all interfaces (localhost + Tailscale)
-    
-    # Check if WebSocket port is already in use
+def check_websocket_port():
+    """Exit if the WebSocket port is already in use"""
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     try:
@@ -472,24 +1175,8 @@ async def main():
         else:
             print(f"❌ ERROR: Cannot bind to port {PORT}: {e}", file=sys.stderr)
             sys.exit(1)
-    
-    # Check if HTTP port is available (optional - don't fail if it's not)
-    http_port_available = False
-    http_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    http_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    try:
-        http_sock.bind((HOST, HTTP_PORT))
-        http_sock.close()
-        http_port_available = True
-    except OSError as e:
-        if e.errno == 10048:  # Port already in use
-            print(f"⚠️  Warning: HTTP API port {HTTP_PORT} is already in use. Statistics API will be disabled.")
-        elif e.errno == 10013:  # Windows: access forbidden (reserved port or permission issue)
-            print(f"⚠️  Warning: HTTP API port {HTTP_PORT} is blocked by Windows (reserved or permission issue). Statistics API will be disabled.")
-        else:
-            print(f"⚠️  Warning: Cannot bind to HTTP API port {HTTP_PORT}: {e}. Statistics API will be disabled.")
-        http_port_available = False
-    
+
+def print_banner():
     # Get Tailscale IP if available
     tailscale_ip = None
     try:
@@ -505,36 +1192,127 @@ async def main():
     print("  🎮 MULTIPLAYER WEBSOCKET SERVER")
     print("═══════════════════════════════════════════════════")
     print("")
-    print(f"WebSocket server running on:")
+    print("WebSocket server running on:")
     print(f"  Local:    ws://localhost:{PORT}")
     print(f"  Local:    ws://127.0.0.1:{PORT}")
     if tailscale_ip:
         print(f"  Tailscale: ws://{tailscale_ip}:{PORT}")
         print(f"  Tailscale: ws://goliath:{PORT}")
+    if WORKER_COUNT > 1:
+        print(f"  Workers:  {WORKER_COUNT} (SO_REUSEPORT)")
     print("")
     print("Press Ctrl+C to stop")
     print("")
+
+def load_leaderboards():
+    """Standings are served from memory and kept current by every save"""
+    global leaderboards
+    leaderboards = Leaderboards()
+    leaderboards.load(db)
+    db.add_listener(leaderboards.apply)
+
+def forward_standings(loop):
+    """Save listener for workers without leaderboards: pass the rows on to worker 0"""
+    def listener(league_rows, game_type_rows):
+        asyncio.run_coroutine_threadsafe(broker.publish(worker_topic(0), {
+            'op': 'standings',
+            'league_rows': league_rows,
+            'game_type_rows': game_type_rows
+        }), loop)
+    return listener
+
+async def main(broker_path=None):
+    """Run the server, or one worker of it when started by supervise()"""
+    global broker, journal, shutting_down, heartbeat, baseline_rss
+    loop = asyncio.get_running_loop()
+    raise_open_file_limit()
+    register_gauges()
+    
+    if broker_path:
+        # The supervisor already checked the port and printed the banner
+        broker = BrokerClient(broker_path)
+        broker.subscribe(worker_topic(WORKER_INDEX), handle_envelope)
+        await broker.connect()
+    else:
+        check_websocket_port()
+        print_banner()
+    
+    if db:
+        if WORKER_INDEX == 0:
+            load_leaderboards()
+        else:
+            db.add_listener(forward_standings(loop))
+    
+    # Games in progress before a restart (or crash) come back from the journal
+    recovered = []
+    if os.environ.get('MULTIPLAYER_JOURNAL', 'on') != 'off':
+        journal = GameJournal(name=f'games-{WORKER_INDEX}')
+        recovered = restore_games()
+        journal.start()
     
     # Start HTTP API server for statistics (optional - only if port is available)
     http_runner = None
-    if http_port_available:
+    if WORKER_INDEX == 0:
+        # Check if HTTP port is available (optional - don't fail if it's not)
+        http_port_available = False
+        http_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        http_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         try:
-            http_app = setup_http_api()
-            http_runner = web.AppRunner(http_app)
-            await http_runner.setup()
-            http_site = web.TCPSite(http_runner, HOST, HTTP_PORT)
-            await http_site.start()
-            print(f"📊 Statistics API: http://localhost:{HTTP_PORT}/api/league")
-        except Exception as e:
-            print(f"⚠️  Warning: HTTP API failed to start: {e}")
-            http_runner = None
-    else:
-        print("📊 Statistics API: Disabled (port unavailable)")
-    print("")
+            http_sock.bind((HOST, HTTP_PORT))
+            http_sock.close()
+            http_port_available = True
+        except OSError as e:
+            if e.errno == 10048:  # Port already in use
+                print(f"⚠️  Warning: HTTP API port {HTTP_PORT} is already in use. Statistics API will be disabled.")
+            elif e.errno == 10013:  # Windows: access forbidden (reserved port or permission issue)
+                print(f"⚠️  Warning: HTTP API port {HTTP_PORT} is blocked by Windows (reserved or permission issue). Statistics API will be disabled.")
+            else:
+                print(f"⚠️  Warning: Cannot bind to HTTP API port {HTTP_PORT}: {e}. Statistics API will be disabled.")
+            http_port_available = False
+        
+        if http_port_available:
+            try:
+                http_app = setup_http_api()
+                http_runner = web.AppRunner(http_app)
+                await http_runner.setup()
+                http_site = web.TCPSite(http_runner, HOST, HTTP_PORT)
+                await http_site.start()
+                print(f"📊 Statistics API: http://localhost:{HTTP_PORT}/api/league")
+            except Exception as e:
+                print(f"⚠️  Warning: HTTP API failed to start: {e}")
+                http_runner = None
+        else:
+            print("📊 Statistics API: Disabled (port unavailable)")
+        print("")
     
+    # SIGTERM (docker stop, the supervisor) shuts down like Ctrl+C, so queued games get saved
+    stop = loop.create_future()
+    if sys.platform != 'win32':
+        loop.add_signal_handler(signal.SIGTERM, stop.set_result, None)
+    
+    matchmaking_task = asyncio.create_task(matchmaking_loop()) if WORKER_INDEX == 0 else None
+    stats_task = asyncio.create_task(stats_loop()) if WORKER_INDEX != 0 else None
+    # MULTIPLAYER_HEARTBEAT: seconds of silence before a ping, and again before giving up
+    heartbeat_seconds = float(os.environ.get('MULTIPLAYER_HEARTBEAT', HEARTBEAT_INTERVAL))
+    heartbeat = HeartbeatWheel(reap_connection, interval=heartbeat_seconds, timeout=heartbeat_seconds)
+    heartbeat.start()
+    baseline_rss = process_rss_bytes()
+    resume_task = asyncio.create_task(expire_unresumed(recovered)) if recovered else None
     try:
-        async with websockets.serve(handle_client, HOST, PORT, reuse_address=True):
-            await asyncio.Future()  # Run forever
+        async with websockets.serve(handle_client, HOST, PORT, reuse_address=True,
+                                    reuse_port=WORKER_COUNT > 1, backlog=LISTEN_BACKLOG,
+                                    ping_interval=None, select_subprotocol=select_subprotocol,
+                                    **deflate_options(os.environ.get('MULTIPLAYER_DEFLATE', 'tuned'))):
+            try:
+                if broker_path:
+                    log.info("🧵 Worker %d/%d ready (pid %d)", WORKER_INDEX, WORKER_COUNT, os.getpid())
+                    # Losing the broker means the supervisor is gone; stop rather than run cut off
+                    await asyncio.wait([stop, broker.reader_task], return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    await stop  # Run until stopped
+            finally:
+                # Leaving this block disconnects everyone; that mustn't abandon their games
+                shutting_down = True
     except OSError as e:
         if e.errno == 10048:
             print(f"❌ ERROR: Port {PORT} is already in use!", file=sys.stderr)
@@ -542,14 +1320,109 @@ async def main():
             sys.exit(1)
         else:
             raise
+    finally:
+        if matchmaking_task:
+            matchmaking_task.cancel()
+        if resume_task:
+            resume_task.cancel()
+        if stats_task:
+            stats_task.cancel()
+        heartbeat.close()
+        if http_runner:
+            await http_runner.cleanup()
+        if broker:
+            await broker.close()
+        if journal:
+            journal.close()
+
+def raise_open_file_limit():
+    """Every connection is a file descriptor; allow as many as the hard limit permits"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = 1 << 20 if hard == resource.RLIM_INFINITY else hard
+        if soft < wanted:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+    except (ImportError, ValueError, OSError):
+        pass  # Windows, or not allowed; keep the default
+
+async def supervise():
+    """Run WORKER_COUNT worker processes sharing PORT, connected by a message broker"""
+    check_websocket_port()
+    print_banner()
+    
+    broker_dir = tempfile.mkdtemp(prefix='multiplayer-broker-')
+    broker_path = os.path.join(broker_dir, 'broker.sock')
+    broker_server = BrokerServer(broker_path)
+    await broker_server.start()
+    
+    stop = asyncio.get_running_loop().create_future()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set_result, None)
+    
+    workers = []
+    try:
+        for index in range(WORKER_COUNT):
+            workers.append(await asyncio.create_subprocess_exec(
+                sys.executable, os.path.abspath(__file__),
+                '--workers', str(WORKER_COUNT), '--port', str(PORT), '--http-port', str(HTTP_PORT),
+                '--worker-index', str(index), '--broker', broker_path
+            ))
+        # Run until SIGTERM; a worker that dies takes the others down with it
+        exits = [asyncio.create_task(worker.wait()) for worker in workers]
+        await asyncio.wait([stop] + exits, return_when=asyncio.FIRST_COMPLETED)
+        if not stop.done():
+            print("❌ A worker exited; stopping the others", file=sys.stderr)
+    finally:
+        for worker in workers:
+            if worker.returncode is None:
+                worker.terminate()
+        for worker in workers:
+            try:
+                await asyncio.wait_for(worker.wait(), timeout=15)
+            except asyncio.TimeoutError:
+                worker.kill()
+        await broker_server.close()
+        os.rmdir(broker_dir)
+
+def flush_database():
+    """Write out every queued game and close the database before the process exits"""
+    if db_writer:
+        pending = db_writer.queue.qsize()
+        if pending:
+            print(f"💾 Saving {pending} queued game(s)...")
+        db_writer.close()
+    if db:
+        db.close()
 
 if __name__ == '__main__':
-    import sys
+    parser = argparse.ArgumentParser(description='Multiplayer WebSocket server')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--http-port', type=int, default=HTTP_PORT)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('MULTIPLAYER_WORKERS', 1)),
+                        help='worker processes sharing the port (env MULTIPLAYER_WORKERS)')
+    parser.add_argument('--worker-index', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--broker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    PORT, HTTP_PORT = args.port, args.http_port
+    WORKER_COUNT = max(1, args.workers)
+    if WORKER_COUNT > 1 and (sys.platform == 'win32' or not hasattr(socket, 'SO_REUSEPORT')):
+        print("⚠️  --workers needs SO_REUSEPORT and Unix sockets; running a single process")
+        WORKER_COUNT = 1
+    setup_logging()
+    
     try:
-        asyncio.run(main())
+        if args.worker_index is not None:
+            WORKER_INDEX = args.worker_index
+            asyncio.run(main(broker_path=args.broker))
+        elif WORKER_COUNT > 1:
+            asyncio.run(supervise())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\n⚠️  Server stopped by user")
     except Exception as e:
         print(f"\n❌ ERROR: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        flush_database()
 
@@ -9,6 +9,18 @@ let currentGame = null;
 let reconnectAttempts = 0;
 const MAX_RECONNECTS = 5;
 
+// Secret kept across visits so the server keeps our rating and stats
+function playerToken() {
+    let token = localStorage.getItem('multiplayerToken');
+    if (!token) {
+        token = window.crypto && crypto.randomUUID
+            ? crypto.randomUUID()
+            : Array.from({length: 4}, () => Math.random().toString(36).slice(2, 10)).join('');
+        localStorage.setItem('multiplayerToken', token);
+    }
+    return token;
+}
+
 // Initialize connection
 function initMultiplayer() {
     const name = prompt("Enter your name:", `Player${Math.floor(Math.random() * 1000)}`);
@@ -38,7 +50,8 @@ function connect() {
             try {
                 ws.send(JSON.stringify({
                     type: 'register',
-                    name: playerName
+                    name: playerName,
+                    token: playerToken()
                 }));
             } catch (error) {
                 console.error('Error sending registration:', error);
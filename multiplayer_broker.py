@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Message Broker for the Multiplayer Server
+Topic pub/sub over a Unix socket, used by sharded server workers to hand
+each other game messages. The supervising process runs a BrokerServer;
+each worker connects a BrokerClient and subscribes to its own topic.
+**Timestamp**: 2026-10-18
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+from typing import Awaitable, Callable, Dict
+
+log = logging.getLogger(__name__)
+
+# Frame: op (1 byte), topic length (2), payload length (4), topic, payload
+_HEADER = struct.Struct('!BHI')
+_SUBSCRIBE = 1
+_PUBLISH = 2
+
+
+def _frame(op: int, topic: str, payload: bytes = b'') -> bytes:
+    topic_bytes = topic.encode('utf-8')
+    return _HEADER.pack(op, len(topic_bytes), len(payload)) + topic_bytes + payload
+
+
+async def _read_frame(reader: asyncio.StreamReader):
+    """(op, topic, payload, raw frame bytes); raises IncompleteReadError at EOF"""
+    header = await reader.readexactly(_HEADER.size)
+    op, topic_length, payload_length = _HEADER.unpack(header)
+    body = await reader.readexactly(topic_length + payload_length)
+    return op, body[:topic_length].decode('utf-8'), body[topic_length:], header + body
+
+
+class BrokerServer:
+    """
+    Routes published frames to every connection subscribed to the topic.
+
+    Payloads are forwarded as-is, never decoded. Writes to subscribers
+    don't wait for drain: a worker that is busy publishing must never be
+    blocked by its own unread inbox, and a local socket peer that stops
+    reading altogether has already crashed.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.server = None
+        self.subscribers = {}  # topic -> set of StreamWriters
+        self.routed = 0
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        topics = []
+        try:
+            while True:
+                op, topic, _, frame = await _read_frame(reader)
+                if op == _SUBSCRIBE:
+                    self.subscribers.setdefault(topic, set()).add(writer)
+                    topics.append(topic)
+                elif op == _PUBLISH:
+                    for subscriber in self.subscribers.get(topic, ()):
+                        subscriber.write(frame)
+                    self.routed += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for topic in topics:
+                self.subscribers.get(topic, set()).discard(writer)
+            writer.close()
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class BrokerClient:
+    """
+    One worker's connection to the broker. Messages are JSON-encoded dicts.
+
+    Handlers for a topic run one message at a time in arrival order, so
+    two messages from the same publisher are handled in the order sent.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.reader = None
+        self.writer = None
+        self.handlers = {}  # topic -> list of async handler(message)
+        self.reader_task = None
+        self.published = 0
+        self.received = 0
+
+    async def connect(self, attempts: int = 50, delay: float = 0.1):
+        """Connect, retrying while the supervisor is still starting the broker"""
+        for attempt in range(attempts):
+            try:
+                self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if attempt == attempts - 1:
+                    raise
+                await asyncio.sleep(delay)
+        for topic in self.handlers:
+            self.writer.write(_frame(_SUBSCRIBE, topic))
+        self.reader_task = asyncio.create_task(self._read_loop())
+
+    def subscribe(self, topic: str, handler: Callable[[Dict], Awaitable[None]]):
+        if topic not in self.handlers and self.writer:
+            self.writer.write(_frame(_SUBSCRIBE, topic))
+        self.handlers.setdefault(topic, []).append(handler)
+
+    async def publish(self, topic: str, message: Dict):
+        self.writer.write(_frame(_PUBLISH, topic, json.dumps(message, separators=(',', ':')).encode('utf-8')))
+        self.published += 1
+        await self.writer.drain()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                _, topic, payload, _ = await _read_frame(self.reader)
+                self.received += 1
+                message = json.loads(payload)
+                for handler in self.handlers.get(topic, ()):
+                    try:
+                        await handler(message)
+                    except Exception as e:
+                        log.exception("⚠️  Broker handler for %s failed: %s", topic, e)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            log.warning("⚠️  Lost connection to the message broker")
+
+    async def close(self):
+        if self.reader_task:
+            self.reader_task.cancel()
+        if self.writer:
+            self.writer.close()
+
+    def stats(self) -> Dict:
+        return {'published': self.published, 'received': self.received}
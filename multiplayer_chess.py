@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Chess Rules for the Multiplayer Server
+A bitboard move generator and validator, so the server keeps the real
+board for every chess game and rejects illegal moves itself instead of
+trusting the client (or asking Stockfish).
+**Timestamp**: 2026-10-18
+
+Squares are numbered a1=0 .. h8=63. Clients use the chess.html layout:
+row 0 is rank 8, col 0 is file a.
+"""
+
+import json
+import re
+from typing import List, Optional
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+EMPTY = -1  # Piece codes are color * 6 + type
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# A move is one int: from | to << 6 | promotion piece type << 12 | flag << 16
+NORMAL, DOUBLE_PUSH, EN_PASSANT, CASTLE = range(4)
+
+FULL = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_3 = 0xFF << 16
+RANK_6 = 0xFF << 40
+PROMOTION_RANKS = (0xFF << 56) | 0xFF
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+
+PIECE_LETTERS = 'pnbrqk'
+PROMOTION_LETTERS = {'n': KNIGHT, 'b': BISHOP, 'r': ROOK, 'q': QUEEN,
+                     'knight': KNIGHT, 'bishop': BISHOP, 'rook': ROOK, 'queen': QUEEN}
+UCI_MOVE = re.compile(r'^([a-h][1-8])([a-h][1-8])([nbrq]?)$')
+
+# Castling rights bits, and what a move from/to each square leaves of them
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_LETTERS = ((WHITE_KINGSIDE, 'K'), (WHITE_QUEENSIDE, 'Q'), (BLACK_KINGSIDE, 'k'), (BLACK_QUEENSIDE, 'q'))
+CASTLING_KEEP = [15] * 64
+CASTLING_KEEP[4] = 15 ^ (WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_KEEP[7] = 15 ^ WHITE_KINGSIDE
+CASTLING_KEEP[0] = 15 ^ WHITE_QUEENSIDE
+CASTLING_KEEP[60] = 15 ^ (BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_KEEP[63] = 15 ^ BLACK_KINGSIDE
+CASTLING_KEEP[56] = 15 ^ BLACK_QUEENSIDE
+# Rook hop for each castling king destination: king to -> (rook from, rook to)
+CASTLING_ROOK = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+
+def square_name(square: int) -> str:
+    return 'abcdefgh'[square & 7] + str((square >> 3) + 1)
+
+
+def parse_square(name: str) -> int:
+    return (int(name[1]) - 1) * 8 + 'abcdefgh'.index(name[0])
+
+
+def _step_table(steps) -> List[int]:
+    table = []
+    for square in range(64):
+        rank, file = divmod(square, 8)
+        bits = 0
+        for d_rank, d_file in steps:
+            r, f = rank + d_rank, file + d_file
+            if 0 <= r < 8 and 0 <= f < 8:
+                bits |= 1 << (r * 8 + f)
+        table.append(bits)
+    return table
+
+
+KNIGHT_ATTACKS = _step_table([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+KING_ATTACKS = _step_table([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+# Squares a pawn of each color on a square attacks
+PAWN_ATTACKS = (_step_table([(1, -1), (1, 1)]), _step_table([(-1, -1), (-1, 1)]))
+
+
+def _line_tables(directions):
+    """
+    For every square, each line through it (a rank, file or diagonal) as
+    (mask, {occupancy & mask: attacks}). Sliding attacks are then one
+    dict lookup per line instead of a walk along each ray.
+    """
+    tables = []
+    for square in range(64):
+        rank, file = divmod(square, 8)
+        lines = []
+        for line in directions:
+            mask = 0
+            for d_rank, d_file in line:
+                r, f = rank + d_rank, file + d_file
+                while 0 <= r < 8 and 0 <= f < 8:
+                    mask |= 1 << (r * 8 + f)
+                    r, f = r + d_rank, f + d_file
+            attacks = {}
+            occupied = 0
+            while True:  # every subset of the mask
+                bits = 0
+                for d_rank, d_file in line:
+                    r, f = rank + d_rank, file + d_file
+                    while 0 <= r < 8 and 0 <= f < 8:
+                        bit = 1 << (r * 8 + f)
+                        bits |= bit
+                        if occupied & bit:
+                            break
+                        r, f = r + d_rank, f + d_file
+                attacks[occupied] = bits
+                occupied = (occupied - mask) & mask
+                if not occupied:
+                    break
+            lines.extend((mask, attacks))
+        tables.append(tuple(lines))
+    return tables
+
+
+ROOK_LINES = _line_tables([((0, 1), (0, -1)), ((1, 0), (-1, 0))])
+BISHOP_LINES = _line_tables([((1, 1), (-1, -1)), ((1, -1), (-1, 1))])
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    rank_mask, rank_attacks, file_mask, file_attacks = ROOK_LINES[square]
+    return rank_attacks[occupied & rank_mask] | file_attacks[occupied & file_mask]
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    diag_mask, diag_attacks, anti_mask, anti_attacks = BISHOP_LINES[square]
+    return diag_attacks[occupied & diag_mask] | anti_attacks[occupied & anti_mask]
+
+
+class IllegalMove(ValueError):
+    """A move that can't be parsed or isn't legal in the position"""
+
+
+class ChessBoard:
+    """
+    A position with make/unmake. `pieces` holds one bitboard per piece
+    code, `occupied` one per color, and `squares` the piece code on each
+    square (EMPTY if none) for capture lookups.
+    """
+    def __init__(self, fen: str = START_FEN):
+        self.set_fen(fen)
+
+    def set_fen(self, fen: str):
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f'Bad FEN: {fen}')
+        self.pieces = [0] * 12
+        self.occupied = [0, 0]
+        self.squares = [EMPTY] * 64
+        for row, rank_text in enumerate(fields[0].split('/')):
+            file = 0
+            for char in rank_text:
+                if char.isdigit():
+                    file += int(char)
+                    continue
+                color = WHITE if char.isupper() else BLACK
+                piece = color * 6 + PIECE_LETTERS.index(char.lower())
+                square = (7 - row) * 8 + file
+                self.pieces[piece] |= 1 << square
+                self.occupied[color] |= 1 << square
+                self.squares[square] = piece
+                file += 1
+        self.side = WHITE if fields[1] == 'w' else BLACK
+        self.castling = 0
+        for bit, letter in CASTLING_LETTERS:
+            if letter in fields[2]:
+                self.castling |= bit
+        self.ep = EMPTY if fields[3] == '-' else parse_square(fields[3])
+        self.halfmove = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove = int(fields[5]) if len(fields) > 5 else 1
+        self.stack = []
+
+    def fen(self) -> str:
+        rows = []
+        for rank in range(7, -1, -1):
+            text = ''
+            empty = 0
+            for file in range(8):
+                piece = self.squares[rank * 8 + file]
+                if piece == EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                letter = PIECE_LETTERS[piece % 6]
+                text += letter.upper() if piece < 6 else letter
+            rows.append(text + (str(empty) if empty else ''))
+        castling = ''.join(letter for bit, letter in CASTLING_LETTERS if self.castling & bit) or '-'
+        ep = square_name(self.ep) if self.ep != EMPTY else '-'
+        return (f"{'/'.join(rows)} {'wb'[self.side]} {castling} {ep} "
+                f"{self.halfmove} {self.fullmove}")
+
+    # --- attacks -------------------------------------------------------
+
+    def attacked(self, square: int, by: int) -> bool:
+        """Is `square` attacked by any piece of color `by`?"""
+        pieces = self.pieces
+        base = by * 6
+        if PAWN_ATTACKS[by ^ 1][square] & pieces[base]:
+            return True
+        if KNIGHT_ATTACKS[square] & pieces[base + KNIGHT]:
+            return True
+        if KING_ATTACKS[square] & pieces[base + KING]:
+            return True
+        occupied = self.occupied[0] | self.occupied[1]
+        queens = pieces[base + QUEEN]
+        if bishop_attacks(square, occupied) & (pieces[base + BISHOP] | queens):
+            return True
+        return bool(rook_attacks(square, occupied) & (pieces[base + ROOK] | queens))
+
+    def in_check(self) -> bool:
+        king = self.pieces[self.side * 6 + KING]
+        return bool(king) and self.attacked(king.bit_length() - 1, self.side ^ 1)
+
+    # --- move generation ------------------------------------------------
+
+    def pseudo_legal_moves(self, from_mask: int = FULL) -> List[int]:
+        """Moves by the side to move from the squares in `from_mask`; may leave the king in check"""
+        moves = []
+        append = moves.append
+        us = self.side
+        base = us * 6
+        pieces = self.pieces
+        own = self.occupied[us]
+        enemy = self.occupied[us ^ 1]
+        occupied = own | enemy
+        empty = FULL ^ occupied
+        targets = FULL ^ own
+
+        # Pawns, set-wise: (destinations, from = to - offset, flag)
+        pawns = pieces[base] & from_mask
+        if pawns:
+            if us == WHITE:
+                single = (pawns << 8) & empty
+                groups = ((single, 8, NORMAL), (((single & RANK_3) << 8) & empty, 16, DOUBLE_PUSH),
+                          (((pawns & NOT_FILE_A) << 7) & enemy, 7, NORMAL),
+                          (((pawns & NOT_FILE_H) << 9) & enemy, 9, NORMAL))
+            else:
+                single = (pawns >> 8) & empty
+                groups = ((single, -8, NORMAL), (((single & RANK_6) >> 8) & empty, -16, DOUBLE_PUSH),
+                          (((pawns & NOT_FILE_A) >> 9) & enemy, -9, NORMAL),
+                          (((pawns & NOT_FILE_H) >> 7) & enemy, -7, NORMAL))
+            for destinations, offset, flag in groups:
+                while destinations:
+                    bit = destinations & -destinations
+                    destinations ^= bit
+                    to = bit.bit_length() - 1
+                    move = (to - offset) | to << 6 | flag << 16
+                    if bit & PROMOTION_RANKS:
+                        for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                            append(move | promotion << 12)
+                    else:
+                        append(move)
+            if self.ep != EMPTY:
+                capturers = PAWN_ATTACKS[us ^ 1][self.ep] & pawns
+                while capturers:
+                    bit = capturers & -capturers
+                    capturers ^= bit
+                    append((bit.bit_length() - 1) | self.ep << 6 | EN_PASSANT << 16)
+
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            movers = pieces[base + piece_type] & from_mask
+            while movers:
+                bit = movers & -movers
+                movers ^= bit
+                square = bit.bit_length() - 1
+                if piece_type == KNIGHT:
+                    attacks = KNIGHT_ATTACKS[square]
+                elif piece_type == BISHOP:
+                    attacks = bishop_attacks(square, occupied)
+                elif piece_type == ROOK:
+                    attacks = rook_attacks(square, occupied)
+                elif piece_type == QUEEN:
+                    attacks = bishop_attacks(square, occupied) | rook_attacks(square, occupied)
+                else:
+                    attacks = KING_ATTACKS[square]
+                    self._castling_moves(square, occupied, append)
+                attacks &= targets
+                while attacks:
+                    to_bit = attacks & -attacks
+                    attacks ^= to_bit
+                    append(square | (to_bit.bit_length() - 1) << 6)
+        return moves
+
+    def _castling_moves(self, king: int, occupied: int, append):
+        # The king may not castle out of or through check; into check is
+        # caught by the legality test like any other move
+        rights = self.castling >> (2 * self.side)
+        if not rights & 3 or king != (4 if self.side == WHITE else 60):
+            return
+        them = self.side ^ 1
+        if rights & 1 and not occupied & (0x60 << (king - 4)) and self.squares[king + 3] == self.side * 6 + ROOK:
+            if not self.attacked(king, them) and not self.attacked(king + 1, them):
+                append(king | (king + 2) << 6 | CASTLE << 16)
+        if rights & 2 and not occupied & (0x0E << (king - 4)) and self.squares[king - 4] == self.side * 6 + ROOK:
+            if not self.attacked(king, them) and not self.attacked(king - 1, them):
+                append(king | (king - 2) << 6 | CASTLE << 16)
+
+    def is_legal(self, move: int) -> bool:
+        """A pseudo-legal move is legal if it doesn't leave the mover's king attacked"""
+        self.push(move)
+        legal = not self.attacked(self.pieces[(self.side ^ 1) * 6 + KING].bit_length() - 1, self.side)
+        self.pop()
+        return legal
+
+    def legal_moves(self) -> List[int]:
+        return [move for move in self.pseudo_legal_moves() if self.is_legal(move)]
+
+    def has_legal_move(self) -> bool:
+        return any(self.is_legal(move) for move in self.pseudo_legal_moves())
+
+    # --- make / unmake --------------------------------------------------
+
+    def push(self, move: int):
+        """Play a pseudo-legal move (see `play` for untrusted input)"""
+        from_square = move & 63
+        to_square = (move >> 6) & 63
+        flag = move >> 16
+        squares = self.squares
+        pieces = self.pieces
+        occupied = self.occupied
+        us = self.side
+        piece = squares[from_square]
+        captured_square = to_square
+        if flag == EN_PASSANT:
+            captured_square = to_square - 8 if us == WHITE else to_square + 8
+        captured = squares[captured_square]
+        self.stack.append((move, captured, self.castling, self.ep, self.halfmove))
+
+        if captured != EMPTY:
+            bit = 1 << captured_square
+            pieces[captured] ^= bit
+            occupied[us ^ 1] ^= bit
+            squares[captured_square] = EMPTY
+        move_bits = (1 << from_square) | (1 << to_square)
+        occupied[us] ^= move_bits
+        squares[from_square] = EMPTY
+        promotion = (move >> 12) & 7
+        if promotion:
+            pieces[piece] ^= 1 << from_square
+            piece = us * 6 + promotion
+            pieces[piece] |= 1 << to_square
+        else:
+            pieces[piece] ^= move_bits
+        squares[to_square] = piece
+        if flag == CASTLE:
+            rook_from, rook_to = CASTLING_ROOK[to_square]
+            rook = squares[rook_from]
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            pieces[rook] ^= rook_bits
+            occupied[us] ^= rook_bits
+            squares[rook_from] = EMPTY
+            squares[rook_to] = rook
+
+        self.castling &= CASTLING_KEEP[from_square] & CASTLING_KEEP[to_square]
+        self.ep = (from_square + to_square) >> 1 if flag == DOUBLE_PUSH else EMPTY
+        self.halfmove = 0 if captured != EMPTY or piece % 6 == PAWN or promotion else self.halfmove + 1
+        if us == BLACK:
+            self.fullmove += 1
+        self.side = us ^ 1
+
+    def pop(self) -> int:
+        """Take back the last move; returns it"""
+        move, captured, self.castling, self.ep, self.halfmove = self.stack.pop()
+        self.side = us = self.side ^ 1
+        if us == BLACK:
+            self.fullmove -= 1
+        from_square = move & 63
+        to_square = (move >> 6) & 63
+        flag = move >> 16
+        squares = self.squares
+        pieces = self.pieces
+        occupied = self.occupied
+        piece = squares[to_square]
+        move_bits = (1 << from_square) | (1 << to_square)
+        occupied[us] ^= move_bits
+        squares[to_square] = EMPTY
+        if (move >> 12) & 7:
+            pieces[piece] ^= 1 << to_square
+            piece = us * 6 + PAWN
+            pieces[piece] |= 1 << from_square
+        else:
+            pieces[piece] ^= move_bits
+        squares[from_square] = piece
+        if flag == CASTLE:
+            rook_from, rook_to = CASTLING_ROOK[to_square]
+            rook = squares[rook_to]
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            pieces[rook] ^= rook_bits
+            occupied[us] ^= rook_bits
+            squares[rook_to] = EMPTY
+            squares[rook_from] = rook
+        if captured != EMPTY:
+            captured_square = to_square
+            if flag == EN_PASSANT:
+                captured_square = to_square - 8 if us == WHITE else to_square + 8
+            bit = 1 << captured_square
+            pieces[captured] |= bit
+            occupied[us ^ 1] |= bit
+            squares[captured_square] = captured
+        return move
+
+    # --- client moves ---------------------------------------------------
+
+    def parse_move(self, move, validate: bool = True) -> int:
+        """
+        The legal move a client means, from UCI text ('e2e4', 'e7e8q') or
+        a dict with fromRow/fromCol/toRow/toCol (optional `promotion`,
+        queen if left out), also as a JSON string, which is how
+        chess-3d.js sends it. Raises IllegalMove. validate=False skips the
+        king-safety test, for replaying moves that were checked before.
+        """
+        promotion = None
+        try:
+            if isinstance(move, str) and move.lstrip().startswith('{'):
+                move = json.loads(move)
+            if isinstance(move, str):
+                match = UCI_MOVE.match(move.strip().lower())
+                if not match:
+                    raise IllegalMove(f'Unreadable move: {move!r}')
+                from_square, to_square = parse_square(match.group(1)), parse_square(match.group(2))
+                promotion = match.group(3) or None
+            elif isinstance(move, dict):
+                from_square = (7 - int(move['fromRow'])) * 8 + int(move['fromCol'])
+                to_square = (7 - int(move['toRow'])) * 8 + int(move['toCol'])
+                if not all(0 <= int(move[key]) < 8 for key in ('fromRow', 'fromCol', 'toRow', 'toCol')):
+                    raise IllegalMove('Move is off the board')
+                promotion = move.get('promotion')
+            else:
+                raise IllegalMove(f'Unreadable move: {move!r}')
+        except IllegalMove:
+            raise
+        except (KeyError, TypeError, ValueError) as e:
+            raise IllegalMove(f'Unreadable move: {move!r}') from e
+        promotion_type = QUEEN
+        if promotion is not None:
+            promotion_type = PROMOTION_LETTERS.get(str(promotion).lower())
+            if promotion_type is None:
+                raise IllegalMove(f'Unknown promotion piece: {promotion!r}')
+
+        if self.squares[from_square] == EMPTY or self.squares[from_square] // 6 != self.side:
+            raise IllegalMove(f'No {"white" if self.side == WHITE else "black"} piece on {square_name(from_square)}')
+        for candidate in self.pseudo_legal_moves(1 << from_square):
+            if (candidate >> 6) & 63 != to_square:
+                continue
+            candidate_promotion = (candidate >> 12) & 7
+            if candidate_promotion and candidate_promotion != promotion_type:
+                continue
+            if validate and not self.is_legal(candidate):
+                raise IllegalMove(f'{square_name(from_square)}{square_name(to_square)} leaves the king in check')
+            return candidate
+        raise IllegalMove(f'{square_name(from_square)}{square_name(to_square)} is not a legal move')
+
+    def play(self, move, validate: bool = True) -> int:
+        """Validate and play a client move; raises IllegalMove and leaves the board unchanged"""
+        parsed = self.parse_move(move, validate)
+        self.push(parsed)
+        return parsed
+
+    def outcome(self) -> Optional[str]:
+        """checkmate, stalemate, fifty_moves or insufficient_material once the game is decided, else None"""
+        if not self.has_legal_move():
+            return 'checkmate' if self.in_check() else 'stalemate'
+        if self.halfmove >= 100:
+            return 'fifty_moves'
+        pieces = self.pieces
+        if not (pieces[PAWN] | pieces[ROOK] | pieces[QUEEN] | pieces[6 + PAWN] | pieces[6 + ROOK] | pieces[6 + QUEEN]):
+            minors = pieces[KNIGHT] | pieces[BISHOP] | pieces[6 + KNIGHT] | pieces[6 + BISHOP]
+            if minors & (minors - 1) == 0:  # at most one minor piece on the board
+                return 'insufficient_material'
+        return None
+
+    def perft(self, depth: int) -> int:
+        """Leaf nodes of the legal move tree to `depth` plies (move generator self-test)"""
+        if depth == 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.push(move)
+            nodes += self.perft(depth - 1)
+            self.pop()
+        return nodes
+
+    def uci(self, move: int) -> str:
+        promotion = (move >> 12) & 7
+        return (square_name(move & 63) + square_name((move >> 6) & 63) +
+                (PIECE_LETTERS[promotion] if promotion else ''))
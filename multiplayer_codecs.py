@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Wire Encodings for the Multiplayer Server
+JSON in text frames for every client, plus MessagePack or CBOR in binary
+frames for clients that negotiate them (needs the msgpack / cbor2
+package). Also the permessage-deflate settings the server offers.
+**Timestamp**: 2026-10-18
+"""
+
+import json
+import logging
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Union
+
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+
+log = logging.getLogger(__name__)
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+CBOR = 'cbor'
+
+try:
+    import orjson
+
+    def dumps(message) -> str:
+        return orjson.dumps(message).decode('utf-8')
+    loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    try:
+        import msgspec
+
+        _encoder = msgspec.json.Encoder()
+
+        def dumps(message) -> str:
+            return _encoder.encode(message).decode('utf-8')
+        loads = msgspec.json.Decoder().decode
+        JSON_BACKEND = 'msgspec'
+    except ImportError:
+        def dumps(message) -> str:
+            return json.dumps(message, separators=(',', ':'))
+        loads = json.loads
+        JSON_BACKEND = 'json'
+
+CODECS = {JSON: (dumps, loads)}  # name -> (encode, decode)
+try:
+    import msgpack
+    CODECS[MSGPACK] = (partial(msgpack.packb, use_bin_type=True), partial(msgpack.unpackb, raw=False))
+except ImportError:
+    pass
+try:
+    import cbor2
+    CODECS[CBOR] = (cbor2.dumps, cbor2.loads)
+except ImportError:
+    pass
+
+# Offered as WebSocket subprotocols, most compact first
+SUBPROTOCOL_PREFIX = 'multiplayer.'
+SUBPROTOCOLS = [SUBPROTOCOL_PREFIX + name for name in (MSGPACK, CBOR, JSON) if name in CODECS]
+
+
+def select_subprotocol(protocol, subprotocols: Sequence[str]) -> Optional[str]:
+    """
+    websockets.serve() hook: our most compact subprotocol the client
+    offers. Unlike the websockets default, a client that offers none of
+    ours is still accepted and gets JSON.
+    """
+    for subprotocol in SUBPROTOCOLS:
+        if subprotocol in subprotocols:
+            return subprotocol
+    return None
+
+
+class DecodeError(ValueError):
+    """A client frame that doesn't decode to a message"""
+
+
+def codec_for_subprotocol(subprotocol: Optional[str]) -> str:
+    if subprotocol and subprotocol.startswith(SUBPROTOCOL_PREFIX):
+        name = subprotocol[len(SUBPROTOCOL_PREFIX):]
+        if name in CODECS:
+            return name
+    return JSON
+
+
+def choose_codec(requested: Union[str, Sequence[str], None], current: str = JSON) -> str:
+    """First available codec from a client's preference (name or list), else `current`"""
+    if isinstance(requested, str):
+        requested = [requested]
+    for name in requested or ():
+        if name in CODECS:
+            return name
+    return current
+
+
+def encode(codec: str, message) -> Union[str, bytes]:
+    return CODECS[codec][0](message)
+
+
+def decode(codec: str, frame: Union[str, bytes]) -> Dict:
+    """Text frames are always JSON; binary frames use the connection's codec"""
+    if isinstance(frame, str):
+        codec = JSON
+    try:
+        message = CODECS[codec][1](frame)
+    except Exception as e:
+        raise DecodeError('Invalid JSON' if codec == JSON else f'Invalid {codec} message') from e
+    if not isinstance(message, dict):
+        raise DecodeError('Message must be an object')
+    return message
+
+
+class Payload:
+    """
+    One outgoing message, encoded at most once per codec no matter how
+    many recipients share it. Built from the message, or from JSON text
+    forwarded by another worker (decoded only if a binary client needs it).
+    """
+    __slots__ = ('message', 'encoded')
+
+    def __init__(self, message=None, json_text: Optional[str] = None):
+        self.message = message
+        self.encoded = {} if json_text is None else {JSON: json_text}
+
+    def encode(self, codec: str) -> Union[str, bytes]:
+        data = self.encoded.get(codec)
+        if data is None:
+            if self.message is None:
+                self.message = loads(self.encoded[JSON])
+            data = self.encoded[codec] = CODECS[codec][0](self.message)
+        return data
+
+    @property
+    def json(self) -> str:
+        return self.encode(JSON)
+
+
+# MULTIPLAYER_DEFLATE modes -> websockets.serve() keyword arguments
+DEFLATE_MODES = {
+    # Half the per-connection zlib memory of the websockets default and the
+    # fastest compression level: game messages are ~100 bytes, mostly
+    # repeated keys, so a 2 KiB window and level 1 compress them as well
+    'tuned': lambda: {'extensions': [ServerPerMessageDeflateFactory(
+        server_max_window_bits=11,
+        client_max_window_bits=11,
+        compress_settings={'memLevel': 4, 'level': 1}
+    )]},
+    # No context takeover: zlib state exists only while a message is being
+    # (de)compressed, so idle sockets hold none (~48 KB -> ~17 KB each). Every
+    # message is compressed on its own, so small ones shrink ~25% instead of ~90%
+    'lean': lambda: {'extensions': [ServerPerMessageDeflateFactory(
+        server_no_context_takeover=True,
+        client_no_context_takeover=True,
+        server_max_window_bits=11,
+        client_max_window_bits=11,
+        compress_settings={'memLevel': 4, 'level': 1}
+    )]},
+    'default': lambda: {},
+    'off': lambda: {'compression': None},
+}
+
+
+def deflate_options(mode: str = 'tuned') -> Dict:
+    if mode not in DEFLATE_MODES:
+        log.warning("⚠️  Unknown MULTIPLAYER_DEFLATE mode %r, using 'tuned'", mode)
+        mode = 'tuned'
+    return DEFLATE_MODES[mode]()
+
+
+def available_codecs() -> List[str]:
+    return list(CODECS)
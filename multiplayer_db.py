@@ -6,30 +6,296 @@ SQLite Database Module for Multiplayer Statistics
 
 import sqlite3
 import json
-from datetime import datetime
+import logging
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict, List, Tuple
 
+import multiplayer_ratings as ratings
+from server_metrics import histogram
+
+log = logging.getLogger(__name__)
+
 DB_PATH = Path('data/multiplayer.db')
 
+# Packed move history format (game_move_blobs.encoding)
+MOVE_ENCODING_V1 = 1
+
+# Per-move flag bits: who moved, whether a timestamp delta follows, and
+# whether the payload is a full dict rather than just the 'move' value
+_PLAYER_1, _PLAYER_2, _PLAYER_INLINE, _PLAYER_NONE = 0, 1, 2, 3
+_HAS_TIMESTAMP = 0x04
+_FULL_DICT = 0x08
+_MICROSECOND = timedelta(microseconds=1)
+
+# Schema migrations, applied in order by init_database. The database's
+# PRAGMA user_version records the last one applied; append new entries,
+# never edit shipped ones.
+MIGRATIONS = [
+    (1, 'indexes for player history and leaderboards', [
+        # get_player_stats: recent games per player, newest first
+        'CREATE INDEX IF NOT EXISTS idx_games_player1_finished ON games(player1_id, finished_at)',
+        'CREATE INDEX IF NOT EXISTS idx_games_player2_finished ON games(player2_id, finished_at)',
+        # get_league_table: ORDER BY points, win_rate, total_games
+        '''CREATE INDEX IF NOT EXISTS idx_league_rank
+           ON league_standings(points DESC, win_rate DESC, total_games DESC)''',
+        # get_game_type_leaderboard: WHERE game_type ORDER BY win_rate, games_played
+        '''CREATE INDEX IF NOT EXISTS idx_player_stats_rank
+           ON player_statistics(game_type, win_rate DESC, games_played DESC)''',
+        # get_game_moves fallback for games saved before moves were packed
+        'CREATE INDEX IF NOT EXISTS idx_game_moves_game ON game_moves(game_id, move_number)',
+    ]),
+    (2, 'exact ratings with Glicko-2 deviation and volatility', [
+        # elo_rating stays the rounded display value; these hold the exact state
+        'ALTER TABLE players ADD COLUMN rating REAL',
+        'ALTER TABLE players ADD COLUMN rating_deviation REAL',
+        'ALTER TABLE players ADD COLUMN rating_volatility REAL',
+        'ALTER TABLE players ADD COLUMN rated_games INTEGER DEFAULT 0',
+        f'''UPDATE players SET rating = elo_rating,
+                              rating_deviation = {ratings.DEFAULT_DEVIATION},
+                              rating_volatility = {ratings.DEFAULT_VOLATILITY}''',
+    ]),
+]
+
+
+def _write_varint(out: bytearray, value: int):
+    """Unsigned LEB128"""
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _write_bytes(out: bytearray, value: bytes):
+    _write_varint(out, len(value))
+    out += value
+
+
+def _read_bytes(data: bytes, pos: int) -> Tuple[bytes, int]:
+    length, pos = _read_varint(data, pos)
+    return data[pos:pos + length], pos + length
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    """datetime for an ISO timestamp that round-trips exactly, else None"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.isoformat() == value else None
+
+
+def encode_moves(move_history: List[Dict], player1_id: str, player2_id: str) -> bytes:
+    """
+    Pack a move history into one compressed blob.
+
+    Each move costs a flag byte (mover as player 1/2, timestamp present,
+    payload shape), the timestamp as a zigzag varint of microseconds since
+    the previous move, and the move itself as compact JSON. Player ids and
+    ISO timestamp strings are not repeated per move. Anything that doesn't
+    fit the compact form (unknown player, odd timestamp, extra keys) is
+    kept in the JSON payload, so decode_moves() always returns the input.
+    """
+    out = bytearray()
+    _write_varint(out, len(move_history))
+    previous = None
+    for move in move_history:
+        rest = dict(move)
+        player_id = rest.pop('player_id', None)
+        if 'player_id' not in move:
+            flags = _PLAYER_NONE
+        elif player_id == player1_id:
+            flags = _PLAYER_1
+        elif player_id == player2_id:
+            flags = _PLAYER_2
+        elif isinstance(player_id, str):
+            flags = _PLAYER_INLINE
+        else:
+            rest['player_id'] = player_id  # None or not a string: keep it in the payload
+            flags = _PLAYER_NONE
+
+        timestamp = _parse_timestamp(rest.get('timestamp'))
+        if timestamp is not None and (previous is None or timestamp.tzinfo == previous.tzinfo):
+            del rest['timestamp']
+            flags |= _HAS_TIMESTAMP
+        else:
+            timestamp = None
+
+        if list(rest) == ['move']:
+            payload = rest['move']
+        else:
+            payload = rest
+            flags |= _FULL_DICT
+
+        out.append(flags)
+        if flags & 0x03 == _PLAYER_INLINE:
+            _write_bytes(out, str(player_id).encode())
+        if timestamp is not None:
+            if previous is None:
+                _write_bytes(out, timestamp.isoformat().encode())
+            else:
+                delta = (timestamp - previous) // _MICROSECOND
+                _write_varint(out, (delta << 1) ^ (delta >> 63))
+            previous = timestamp
+        _write_bytes(out, json.dumps(payload, separators=(',', ':')).encode())
+    return zlib.compress(bytes(out), 6)
+
+
+def decode_moves(blob: bytes, player1_id: str, player2_id: str) -> List[Dict]:
+    """Inverse of encode_moves()"""
+    data = zlib.decompress(blob)
+    count, pos = _read_varint(data, 0)
+    moves = []
+    previous = None
+    for _ in range(count):
+        flags = data[pos]
+        pos += 1
+        player = flags & 0x03
+        if player == _PLAYER_INLINE:
+            raw, pos = _read_bytes(data, pos)
+            player_id = raw.decode()
+        else:
+            player_id = {_PLAYER_1: player1_id, _PLAYER_2: player2_id}.get(player)
+
+        timestamp = None
+        if flags & _HAS_TIMESTAMP:
+            if previous is None:
+                raw, pos = _read_bytes(data, pos)
+                timestamp = datetime.fromisoformat(raw.decode())
+            else:
+                zigzag, pos = _read_varint(data, pos)
+                timestamp = previous + (zigzag >> 1 ^ -(zigzag & 1)) * _MICROSECOND
+            previous = timestamp
+
+        raw, pos = _read_bytes(data, pos)
+        payload = json.loads(raw)
+        move = {} if player == _PLAYER_NONE else {'player_id': player_id}
+        if flags & _FULL_DICT:
+            move.update(payload)
+        else:
+            move['move'] = payload
+        if timestamp is not None:
+            move['timestamp'] = timestamp.isoformat()
+        moves.append(move)
+    return moves
+
+
 class MultiplayerDB:
-    def __init__(self, db_path: Path = DB_PATH):
+    def __init__(self, db_path: Path = DB_PATH, cache_size_kb: int = 8192,
+                 rating_system: str = 'elo'):
         """Initialize database connection and create tables if needed"""
+        if rating_system not in ratings.RATING_SYSTEMS:
+            raise ValueError(f"Unknown rating system {rating_system!r}")
         self.db_path = db_path
+        self.rating_system = rating_system
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_size_kb = cache_size_kb
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.listeners = []  # called with (league_rows, game_type_rows) after each save
         self.init_database()
     
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row  # Return rows as dict-like objects
+        """
+        Get this thread's database connection.
+        
+        Each thread (the event loop, the background writer) keeps one
+        connection open for the life of the process instead of reconnecting
+        per query. WAL lets readers carry on while the writer commits.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row  # Return rows as dict-like objects
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA cache_size=-{self.cache_size_kb}')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
         return conn
     
-    def init_database(self):
-        """Create database tables if they don't exist"""
+    @contextmanager
+    def transaction(self):
+        """
+        `with db.transaction() as cursor:` - one atomic write transaction.
+        
+        BEGIN IMMEDIATE takes the write lock up front, so concurrent writers
+        wait on the busy timeout instead of failing to upgrade a read lock.
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+    
+    def close(self):
+        """Close every thread's connection"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.execute('PRAGMA optimize')
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+    
+    def init_database(self):
+        """Create database tables if they don't exist, then run pending migrations"""
+        with self.transaction() as cursor:
+            self._create_tables(cursor)
+            version = self._migrate(cursor)
+        print(f"✅ Database initialized: {self.db_path} (schema v{version})")
+    
+    def _migrate(self, cursor) -> int:
+        """Apply every migration newer than PRAGMA user_version"""
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        migrated = False
+        for target, description, statements in MIGRATIONS:
+            if target <= version:
+                continue
+            for statement in statements:
+                cursor.execute(statement)
+            # PRAGMA doesn't take bound parameters; target is our own int
+            cursor.execute(f'PRAGMA user_version = {int(target)}')
+            version = target
+            print(f"🔧 Database migrated to v{target}: {description}")
+            migrated = True
+        if migrated:
+            # Refresh planner statistics for the new indexes
+            cursor.execute('ANALYZE')
+        return version
+    
+    def _create_tables(self, cursor):
+        """Base schema"""
         # Players table - persistent player profiles
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS players (
@@ -80,6 +346,17 @@ class MultiplayerDB:
             )
         ''')
         
+        # Packed move history - one compressed row per game (see encode_moves)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS game_move_blobs (
+                game_id TEXT PRIMARY KEY,
+                encoding INTEGER NOT NULL,
+                move_count INTEGER NOT NULL,
+                moves BLOB NOT NULL,
+                FOREIGN KEY (game_id) REFERENCES games(game_id)
+            )
+        ''')
+        
         # Statistics table - aggregated stats per game type
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS player_statistics (
@@ -113,46 +390,36 @@ class MultiplayerDB:
                 FOREIGN KEY (player_id) REFERENCES players(player_id)
             )
         ''')
-        
-        conn.commit()
-        conn.close()
-        print(f"✅ Database initialized: {self.db_path}")
     
     def get_or_create_player(self, player_id: str, player_name: str) -> Dict:
         """Get player from database or create new one"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM players WHERE player_id = ?', (player_id,))
-        row = cursor.fetchone()
-        
-        if row:
-            # Update last_seen
-            cursor.execute(
-                'UPDATE players SET last_seen = ? WHERE player_id = ?',
-                (datetime.now().isoformat(), player_id)
-            )
-            conn.commit()
-            conn.close()
-            return dict(row)
-        else:
+        with self.transaction() as cursor:
+            cursor.execute('SELECT * FROM players WHERE player_id = ?', (player_id,))
+            row = cursor.fetchone()
+            
+            if row:
+                # Update last_seen
+                cursor.execute(
+                    'UPDATE players SET last_seen = ? WHERE player_id = ?',
+                    (datetime.now().isoformat(), player_id)
+                )
+                return dict(row)
+            
             # Create new player
             now = datetime.now().isoformat()
             cursor.execute('''
-                INSERT INTO players 
+                INSERT INTO players
                 (player_id, player_name, first_seen, last_seen, created_at)
                 VALUES (?, ?, ?, ?, ?)
             ''', (player_id, player_name, now, now, now))
             
             # Initialize statistics
             cursor.execute('''
-                INSERT INTO league_standings 
+                INSERT INTO league_standings
                 (player_id, player_name, last_updated)
                 VALUES (?, ?, ?)
             ''', (player_id, player_name, now))
             
-            conn.commit()
-            conn.close()
             return {
                 'player_id': player_id,
                 'player_name': player_name,
@@ -168,9 +435,87 @@ class MultiplayerDB:
                   winner_id: Optional[str] = None, status: str = 'finished',
                   started_at: str = None, finished_at: str = None):
         """Save completed game to database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        self.save_games([{
+            'game_id': game_id,
+            'game_type': game_type,
+            'player1_id': player1_id,
+            'player2_id': player2_id,
+            'player1_name': player1_name,
+            'player2_name': player2_name,
+            'move_history': move_history,
+            'winner_id': winner_id,
+            'status': status,
+            'started_at': started_at,
+            'finished_at': finished_at
+        }])
+    
+    def save_games(self, games: List[Dict]):
+        """
+        Save several completed games in one transaction (group commit).
+        Every game is committed with its moves, stats and standings, or
+        nothing is.
+        """
+        with self.transaction() as cursor:
+            for game in games:
+                self._save_game(cursor, **game)
+            if self.listeners:
+                player_ids = {game[key] for game in games for key in ('player1_id', 'player2_id')}
+                league_rows = self.get_league_rows(player_ids, cursor)
+                game_type_rows = self.get_game_type_rows(
+                    {(player_id, game['game_type'])
+                     for game in games for player_id in (game['player1_id'], game['player2_id'])},
+                    cursor
+                )
+        
+        # Tell in-memory views (leaderboards) what changed, after the commit
+        for listener in self.listeners:
+            try:
+                listener(league_rows, game_type_rows)
+            except Exception as e:
+                log.exception("⚠️  Save listener failed: %s", e)
+    
+    def add_listener(self, listener):
+        """Register listener(league_rows, game_type_rows), called after every save"""
+        self.listeners.append(listener)
+    
+    def get_league_rows(self, player_ids=None, cursor=None) -> List[Dict]:
+        """league_standings rows for the given players (default: everyone)"""
+        cursor = cursor or self.get_connection().cursor()
+        if player_ids is None:
+            cursor.execute('SELECT * FROM league_standings')
+        else:
+            player_ids = list(player_ids)
+            placeholders = ','.join('?' * len(player_ids))
+            cursor.execute(f'SELECT * FROM league_standings WHERE player_id IN ({placeholders})',
+                           player_ids)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_game_type_rows(self, keys=None, cursor=None) -> List[Dict]:
+        """
+        player_statistics rows (with player_name) for the given
+        (player_id, game_type) pairs (default: everyone)
+        """
+        cursor = cursor or self.get_connection().cursor()
+        query = '''
+            SELECT ps.*, p.player_name
+            FROM player_statistics ps
+            JOIN players p ON ps.player_id = p.player_id
+        '''
+        if keys is None:
+            cursor.execute(query)
+        else:
+            keys = list(keys)
+            placeholders = ','.join('(?, ?)' for _ in keys)
+            params = [value for key in keys for value in key]
+            cursor.execute(query + f'WHERE (ps.player_id, ps.game_type) IN (VALUES {placeholders})',
+                           params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def _save_game(self, cursor, game_id: str, game_type: str, player1_id: str, player2_id: str,
+                   player1_name: str, player2_name: str, move_history: List[Dict],
+                   winner_id: Optional[str] = None, status: str = 'finished',
+                   started_at: str = None, finished_at: str = None):
+        """Write one game and its statistics using the caller's transaction"""
         if not started_at:
             started_at = datetime.now().isoformat()
         if not finished_at:
@@ -190,34 +535,121 @@ class MultiplayerDB:
         ''', (game_id, game_type, player1_id, player2_id, player1_name, player2_name,
               winner_id, status, len(move_history), started_at, finished_at, duration))
         
-        # Save moves
-        for i, move in enumerate(move_history):
-            cursor.execute('''
-                INSERT INTO game_moves 
-                (game_id, move_number, player_id, move_data, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (game_id, i + 1, move.get('player_id'), json.dumps(move), move.get('timestamp')))
+        # Save moves as one packed row instead of a row per move
+        cursor.execute('''
+            INSERT INTO game_move_blobs (game_id, encoding, move_count, moves)
+            VALUES (?, ?, ?, ?)
+        ''', (game_id, MOVE_ENCODING_V1, len(move_history),
+              encode_moves(move_history, player1_id, player2_id)))
         
         # Update player statistics
-        self._update_player_stats(player1_id, game_type, winner_id == player1_id, 
+        self._update_player_stats(cursor, player1_id, game_type, winner_id == player1_id, 
                                  winner_id == player2_id, winner_id is None)
-        self._update_player_stats(player2_id, game_type, winner_id == player2_id,
+        self._update_player_stats(cursor, player2_id, game_type, winner_id == player2_id,
                                  winner_id == player1_id, winner_id is None)
         
         # Update league standings
-        self._update_league_standings(player1_id, player1_name, winner_id == player1_id,
+        self._update_league_standings(cursor, player1_id, player1_name, winner_id == player1_id,
                                      winner_id == player2_id, winner_id is None)
-        self._update_league_standings(player2_id, player2_name, winner_id == player2_id,
+        self._update_league_standings(cursor, player2_id, player2_name, winner_id == player2_id,
                                      winner_id == player1_id, winner_id is None)
         
-        conn.commit()
-        conn.close()
+        # Abandoned games have no result to rate
+        if status == 'finished':
+            score1 = 1.0 if winner_id == player1_id else 0.0 if winner_id == player2_id else 0.5
+            self._update_ratings(cursor, player1_id, player2_id, score1)
+    
+    def _update_ratings(self, cursor, player1_id: str, player2_id: str, score1: float):
+        """Apply one game's rating change to both players (caller's transaction)"""
+        cursor.execute(f'''
+            SELECT player_id,
+                   COALESCE(rating, elo_rating, {ratings.DEFAULT_RATING}) AS rating,
+                   COALESCE(rating_deviation, {ratings.DEFAULT_DEVIATION}) AS rating_deviation,
+                   COALESCE(rating_volatility, {ratings.DEFAULT_VOLATILITY}) AS rating_volatility,
+                   COALESCE(rated_games, 0) AS rated_games
+            FROM players WHERE player_id IN (?, ?)
+        ''', (player1_id, player2_id))
+        current = {row['player_id']: row for row in cursor.fetchall()}
+        if player1_id not in current or player2_id not in current or player1_id == player2_id:
+            return
+        
+        p1, p2 = current[player1_id], current[player2_id]
+        new1, new2 = ratings.rate_game(
+            self.rating_system,
+            (p1['rating'], p1['rating_deviation'], p1['rating_volatility']),
+            (p2['rating'], p2['rating_deviation'], p2['rating_volatility']),
+            score1
+        )
+        self._store_ratings(cursor, [
+            (player1_id, new1, p1['rated_games'] + 1),
+            (player2_id, new2, p2['rated_games'] + 1)
+        ])
     
-    def _update_player_stats(self, player_id: str, game_type: str, won: bool, lost: bool, draw: bool):
+    def _store_ratings(self, cursor, updates):
+        """Write (player_id, (rating, deviation, volatility), rated_games) to players and standings"""
+        cursor.executemany('''
+            UPDATE players
+            SET rating = ?, rating_deviation = ?, rating_volatility = ?, elo_rating = ?, rated_games = ?
+            WHERE player_id = ?
+        ''', [(r, rd, vol, round(r), games, player_id) for player_id, (r, rd, vol), games in updates])
+        cursor.executemany(
+            'UPDATE league_standings SET elo_rating = ? WHERE player_id = ?',
+            [(round(r), player_id) for player_id, (r, _, _), _ in updates]
+        )
+    
+    def recompute_ratings(self, period_days: int = 0) -> Dict:
+        """
+        Rebuild every rating from the full game history (see
+        multiplayer_ratings.replay). period_days=0 reproduces the per-game
+        updates; N > 0 rates in N-day rating periods instead. Players
+        without finished games are reset.
+        """
+        started = time.perf_counter()
+        cursor = self.get_connection().cursor()
+        cursor.execute('''
+            SELECT player1_id, player2_id, winner_id, finished_at
+            FROM games
+            WHERE status = 'finished' AND player1_id != player2_id
+            ORDER BY finished_at
+        ''')
+        games = [
+            (p1, p2, 1.0 if winner == p1 else 0.0 if winner == p2 else 0.5, finished_at)
+            for p1, p2, winner, finished_at in cursor.fetchall()
+        ]
+        result = ratings.replay(games, self.rating_system, period_days)
+        
+        with self.transaction() as cursor:
+            cursor.execute(f'''
+                UPDATE players SET rating = {ratings.DEFAULT_RATING},
+                                   rating_deviation = {ratings.DEFAULT_DEVIATION},
+                                   rating_volatility = {ratings.DEFAULT_VOLATILITY},
+                                   elo_rating = {round(ratings.DEFAULT_RATING)},
+                                   rated_games = 0
+            ''')
+            cursor.execute(f'UPDATE league_standings SET elo_rating = {round(ratings.DEFAULT_RATING)}')
+            self._store_ratings(cursor, [
+                (player_id, (r['rating'], r['deviation'], r['volatility']), r['games'])
+                for player_id, r in result.items()
+            ])
+            league_rows = self.get_league_rows(cursor=cursor) if self.listeners else []
+        
+        for listener in self.listeners:
+            try:
+                listener(league_rows, [])
+            except Exception as e:
+                log.exception("⚠️  Save listener failed: %s", e)
+        
+        return {
+            'system': self.rating_system,
+            'games': len(games),
+            'players': len(result),
+            'period_days': period_days,
+            'backend': 'numpy' if ratings.np is not None else 'python',
+            'seconds': round(time.perf_counter() - started, 2)
+        }
+    
+    def _update_player_stats(self, cursor, player_id: str, game_type: str, won: bool, lost: bool, draw: bool):
         """Update player statistics for a specific game type"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         # Get or create stats record
         cursor.execute('''
             SELECT * FROM player_statistics 
@@ -252,15 +684,9 @@ class MultiplayerDB:
                 (player_id, game_type, games_played, wins, losses, draws, win_rate, last_played)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (player_id, game_type, games, wins, losses, draws, win_rate, datetime.now().isoformat()))
-        
-        conn.commit()
-        conn.close()
     
-    def _update_league_standings(self, player_id: str, player_name: str, won: bool, lost: bool, draw: bool):
+    def _update_league_standings(self, cursor, player_id: str, player_name: str, won: bool, lost: bool, draw: bool):
         """Update league standings"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         # Get current standings
         cursor.execute('SELECT * FROM league_standings WHERE player_id = ?', (player_id,))
         row = cursor.fetchone()
@@ -309,20 +735,15 @@ class MultiplayerDB:
                 SET total_games = ?, total_wins = ?, total_losses = ?, total_draws = ?
                 WHERE player_id = ?
             ''', (total_games, total_wins, total_losses, total_draws, player_id))
-        
-        conn.commit()
-        conn.close()
     
     def get_player_stats(self, player_id: str) -> Dict:
         """Get comprehensive statistics for a player"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         # Get player info
         cursor.execute('SELECT * FROM players WHERE player_id = ?', (player_id,))
         player = cursor.fetchone()
         if not player:
-            conn.close()
             return None
         
         player_dict = dict(player)
@@ -336,23 +757,57 @@ class MultiplayerDB:
         game_stats = [dict(row) for row in cursor.fetchall()]
         player_dict['game_stats'] = game_stats
         
-        # Get recent games
+        # Get recent games. One indexed branch per seat instead of an OR
+        # (which forces a scan); each branch stops after 10 rows.
         cursor.execute('''
-            SELECT * FROM games 
-            WHERE player1_id = ? OR player2_id = ?
+            SELECT * FROM (
+                SELECT * FROM (
+                    SELECT * FROM games WHERE player1_id = ?
+                    ORDER BY finished_at DESC LIMIT 10
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT * FROM games WHERE player2_id = ? AND player1_id != ?
+                    ORDER BY finished_at DESC LIMIT 10
+                )
+            )
             ORDER BY finished_at DESC
             LIMIT 10
-        ''', (player_id, player_id))
+        ''', (player_id, player_id, player_id))
         recent_games = [dict(row) for row in cursor.fetchall()]
         player_dict['recent_games'] = recent_games
         
-        conn.close()
         return player_dict
     
+    def get_game_moves(self, game_id: str) -> Optional[List[Dict]]:
+        """Move history of a saved game (packed or legacy per-move rows)"""
+        cursor = self.get_connection().cursor()
+        
+        cursor.execute('''
+            SELECT g.player1_id, g.player2_id, b.encoding, b.moves
+            FROM games g
+            LEFT JOIN game_move_blobs b ON b.game_id = g.game_id
+            WHERE g.game_id = ?
+        ''', (game_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        if row['moves'] is not None:
+            if row['encoding'] != MOVE_ENCODING_V1:
+                raise ValueError(f"Unknown move encoding {row['encoding']} for game {game_id}")
+            return decode_moves(row['moves'], row['player1_id'], row['player2_id'])
+        
+        # Games saved before moves were packed
+        cursor.execute('''
+            SELECT move_data FROM game_moves
+            WHERE game_id = ?
+            ORDER BY move_number
+        ''', (game_id,))
+        return [json.loads(r['move_data']) for r in cursor.fetchall()]
+    
     def get_league_table(self, limit: int = 50) -> List[Dict]:
         """Get league table/leaderboard"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         cursor.execute('''
             SELECT * FROM league_standings
@@ -362,13 +817,11 @@ class MultiplayerDB:
         ''', (limit,))
         
         standings = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         return standings
     
     def get_game_type_leaderboard(self, game_type: str, limit: int = 20) -> List[Dict]:
         """Get leaderboard for a specific game type"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         cursor.execute('''
             SELECT ps.*, p.player_name
@@ -391,6 +844,115 @@ class MultiplayerDB:
                 'win_rate': round(row['win_rate'], 1)
             })
         
-        conn.close()
         return leaderboard
 
+
+# Batch commits by the writer thread, on the server's multiplayer_db_duration_seconds histogram
+SAVE_SECONDS = histogram('multiplayer_db_duration_seconds', 'Database calls by operation',
+                         ('operation',)).labels('save_games')
+
+
+class PersistenceWriter:
+    """
+    Background writer thread for game results.
+    
+    The WebSocket server hands finished games to submit() and carries on;
+    the writer thread drains the bounded queue and saves everything that
+    has accumulated (up to batch_size games, waiting at most max_delay
+    seconds for company) in one transaction. close() flushes the queue
+    before returning, so no finished game is lost on shutdown.
+    """
+    _STOP = object()
+    
+    def __init__(self, db: MultiplayerDB, max_queue: int = 1000,
+                 batch_size: int = 50, max_delay: float = 0.05):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.saved = 0
+        self.failed = 0
+        self.batches = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name='multiplayer-db-writer', daemon=True)
+        self.thread.start()
+    
+    def submit(self, block: bool = True, **game) -> Future:
+        """
+        Queue a game for saving (same keyword arguments as save_game).
+        Returns a Future that resolves once the game is committed. Raises
+        queue.Full only when block=False and the queue is at capacity.
+        """
+        if self.closed:
+            raise RuntimeError('PersistenceWriter is closed')
+        future = Future()
+        self.queue.put((game, future), block=block)
+        return future
+    
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is self._STOP:
+                self.queue.task_done()
+                return
+            
+            batch = [job]
+            stop = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    job = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is self._STOP:
+                    stop = True
+                    break
+                batch.append(job)
+            
+            self._write(batch)
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                self.queue.task_done()
+                return
+    
+    def _write(self, batch):
+        """Commit a batch; on failure retry game by game so one bad row can't sink the rest"""
+        try:
+            with SAVE_SECONDS.time():
+                self.db.save_games([game for game, _ in batch])
+            self.batches += 1
+            self.saved += len(batch)
+            for _, future in batch:
+                future.set_result(True)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self.failed += 1
+                log.warning("⚠️  Failed to save game %s: %s", batch[0][0].get('game_id'), e)
+                batch[0][1].set_exception(e)
+                return
+        
+        for game, future in batch:
+            self._write([(game, future)])
+    
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        self.queue.join()
+    
+    def close(self):
+        """Write out everything still queued, then stop the thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(self._STOP)
+        self.thread.join()
+    
+    def stats(self) -> Dict:
+        return {
+            'queued': self.queue.qsize(),
+            'saved': self.saved,
+            'failed': self.failed,
+            'batches': self.batches
+        }
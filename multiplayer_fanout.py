@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+WebSocket Fan-Out for the Multiplayer Server
+Sends one already-encoded message to many sockets (multiplayer_codecs
+does the encoding, once per wire format). A socket that falls behind
+(too much unsent data, or a send that stalls) is reported back to the
+caller rather than holding up the rest.
+**Timestamp**: 2026-10-18
+"""
+
+import asyncio
+from typing import List, Sequence, Union
+
+from websockets.exceptions import ConnectionClosed
+
+# Unsent bytes a socket may have queued before it counts as too slow
+MAX_BUFFERED_BYTES = 256 * 1024
+# Longest a single send may wait for the socket to drain
+SEND_TIMEOUT = 5.0
+# Below this (queued + new bytes) a send can't block: websockets only waits
+# for the socket to drain past its write limit, 32 KiB by default
+INLINE_SEND_BYTES = 16 * 1024
+
+
+def buffered_bytes(websocket) -> int:
+    """Bytes written to the socket but not yet sent"""
+    transport = getattr(websocket, 'transport', None)
+    return transport.get_write_buffer_size() if transport else 0
+
+
+async def send_payload(websocket, payload: Union[str, bytes], timeout: float = SEND_TIMEOUT,
+                       max_buffered: int = MAX_BUFFERED_BYTES) -> bool:
+    """Send an already-serialized message; False if the socket is closed or too far behind"""
+    if buffered_bytes(websocket) > max_buffered:
+        return False
+    try:
+        await asyncio.wait_for(websocket.send(payload), timeout)
+        return True
+    except (asyncio.TimeoutError, ConnectionClosed):
+        return False
+
+
+async def fan_out(sockets: Sequence, payload: Union[str, bytes], timeout: float = SEND_TIMEOUT,
+                  max_buffered: int = MAX_BUFFERED_BYTES) -> List[bool]:
+    """
+    Send one payload to every socket. Returns a success flag per socket,
+    in order.
+
+    A socket with (almost) nothing queued accepts the frame without
+    waiting, so those are sent inline. Only sockets with a backlog get a
+    timed send, and those run concurrently: the slowest socket bounds the
+    wait, not the sum.
+    """
+    results = [False] * len(sockets)
+    backlogged = []
+    for index, websocket in enumerate(sockets):
+        buffered = buffered_bytes(websocket)
+        if buffered + len(payload) > INLINE_SEND_BYTES:
+            backlogged.append(index)
+            continue
+        try:
+            await websocket.send(payload)
+            results[index] = True
+        except ConnectionClosed:
+            pass
+    if backlogged:
+        sent = await asyncio.gather(*(send_payload(sockets[index], payload, timeout, max_buffered)
+                                      for index in backlogged))
+        for index, ok in zip(backlogged, sent):
+            results[index] = ok
+    return results
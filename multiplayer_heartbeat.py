@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Connection Heartbeats for the Multiplayer Server
+A timer wheel that pings idle WebSocket connections and reaps the ones
+that stop answering, with one task for every connection instead of the
+keepalive task websockets starts per connection. Also the process
+memory figure behind the per-connection stats.
+**Timestamp**: 2026-10-18
+"""
+
+import asyncio
+import math
+import os
+import sys
+from typing import Callable, Dict, Optional
+
+from websockets.exceptions import ConnectionClosed
+
+from multiplayer_fanout import INLINE_SEND_BYTES, buffered_bytes
+
+HEARTBEAT_INTERVAL = 20.0  # Idle seconds before a connection is pinged
+HEARTBEAT_TIMEOUT = 20.0  # Seconds to answer a ping before the connection counts as dead
+HEARTBEAT_TICK = 1.0  # Wheel resolution
+
+
+class Heartbeat:
+    """One connection on the wheel"""
+    __slots__ = ('websocket', 'last_seen', 'pinged_at', 'slot')
+
+    def __init__(self, websocket, now):
+        self.websocket = websocket
+        self.last_seen = now
+        self.pinged_at = None  # Outstanding ping, if any
+        self.slot = None
+
+
+class HeartbeatWheel:
+    """
+    Connections are kept in a ring of slots, one per tick, by when they
+    next need looking at. Each tick visits a single slot: connections
+    heard from recently go back on the wheel, idle ones are pinged, and
+    ones with an unanswered ping older than `timeout` are handed to
+    `on_dead`. Anything received from a connection (see seen()), and
+    every pong, counts as a sign of life.
+    """
+    def __init__(self, on_dead: Callable, interval: float = HEARTBEAT_INTERVAL,
+                 timeout: float = HEARTBEAT_TIMEOUT, tick: float = HEARTBEAT_TICK):
+        self.on_dead = on_dead
+        self.interval = interval
+        self.timeout = timeout
+        self.tick = tick
+        self.slots = [set() for _ in range(math.ceil(max(interval, timeout) / tick) + 1)]
+        self.position = 0
+        self.entries: Dict = {}  # websocket -> Heartbeat
+        self.loop = None
+        self.pings = 0
+        self.reaped = 0
+        self.task = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.create_task(self._run())
+
+    def add(self, websocket):
+        entry = Heartbeat(websocket, self.loop.time())
+        self.entries[websocket] = entry
+        self._schedule(entry, self.interval)
+
+    def remove(self, websocket):
+        entry = self.entries.pop(websocket, None)
+        if entry is not None:
+            self.slots[entry.slot].discard(entry)
+
+    def seen(self, websocket):
+        """Note activity; cheap enough to call for every frame received"""
+        entry = self.entries.get(websocket)
+        if entry is not None:
+            entry.last_seen = self.loop.time()
+
+    def idle_seconds(self, websocket) -> Optional[float]:
+        entry = self.entries.get(websocket)
+        return None if entry is None else self.loop.time() - entry.last_seen
+
+    def _schedule(self, entry, delay):
+        ticks = min(len(self.slots) - 1, max(1, math.ceil(delay / self.tick)))
+        entry.slot = (self.position + ticks) % len(self.slots)
+        self.slots[entry.slot].add(entry)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.position = (self.position + 1) % len(self.slots)
+            due = self.slots[self.position]
+            self.slots[self.position] = set()
+            now = self.loop.time()
+            for entry in due:
+                if self.entries.get(entry.websocket) is entry:  # Not closed meanwhile
+                    await self._check(entry, now)
+
+    async def _check(self, entry, now):
+        websocket = entry.websocket
+        if entry.pinged_at is not None and entry.last_seen < entry.pinged_at:
+            if now - entry.pinged_at >= self.timeout:
+                self._reap(entry)
+            else:
+                self._schedule(entry, entry.pinged_at + self.timeout - now)
+            return
+        entry.pinged_at = None
+        idle = now - entry.last_seen
+        if idle < self.interval:
+            self._schedule(entry, self.interval - idle)
+            return
+        if buffered_bytes(websocket) > INLINE_SEND_BYTES:
+            # Still flushing earlier frames, so a ping would queue behind them:
+            # count this as the ping, answered only by the peer sending something
+            entry.pinged_at = now
+            self._schedule(entry, self.timeout)
+            return
+        try:
+            pong = await websocket.ping()
+        except ConnectionClosed:
+            self._reap(entry)
+            return
+        except Exception:
+            # e.g. a ping already outstanding; look again next round
+            self._schedule(entry, self.timeout)
+            return
+        self.pings += 1
+        entry.pinged_at = now
+        pong.add_done_callback(lambda done, entry=entry: self._pong(entry, done))
+        self._schedule(entry, self.timeout)
+
+    def _pong(self, entry, done):
+        if not done.cancelled() and done.exception() is None:
+            entry.last_seen = self.loop.time()
+
+    def _reap(self, entry):
+        self.entries.pop(entry.websocket, None)
+        self.reaped += 1
+        self.on_dead(entry.websocket)
+
+    def close(self):
+        if self.task:
+            self.task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            'connections': len(self.entries),
+            'interval': self.interval,
+            'timeout': self.timeout,
+            'pings': self.pings,
+            'reaped': self.reaped
+        }
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident memory of this process right now (None where it can't be read)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak rather than current outside Linux; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
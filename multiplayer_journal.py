@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Game Journal for the Multiplayer Server
+An append-only log of the games in progress (start, move, rebind, end)
+so a restarted server can rebuild them. A background thread writes the
+records in batches, one fsync per batch, and once the log grows long
+compacts it into a snapshot of the games still active.
+**Timestamp**: 2026-10-18
+"""
+
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Dict
+
+from multiplayer_codecs import dumps, loads
+
+log = logging.getLogger(__name__)
+
+JOURNAL_DIR = Path('data/journal')
+COMPACT_RECORDS = 20000  # Log records after which the writer takes a snapshot
+
+
+def apply_record(games: Dict[str, Dict], record: Dict):
+    """
+    Replay one record onto {game_id: game}, where a game is
+    {game_type, players: [[id, name, account_id], ...x2], tokens: {id: token},
+    started_at, current_turn, moves: [{player_id, move, timestamp}]}.
+    """
+    op = record['op']
+    game_id = record['game_id']
+    if op == 'start':
+        games[game_id] = {
+            'game_type': record['game_type'],
+            'players': record['players'],
+            'tokens': record['tokens'],
+            'started_at': record['started_at'],
+            'current_turn': record['players'][0][0],
+            'moves': []
+        }
+        return
+    game = games.get(game_id)
+    if game is None:
+        return
+    if op == 'move':
+        game['moves'].append({
+            'player_id': record['player_id'],
+            'move': record['move'],
+            'timestamp': record['timestamp']
+        })
+        player1_id, player2_id = game['players'][0][0], game['players'][1][0]
+        game['current_turn'] = player2_id if record['player_id'] == player1_id else player1_id
+    elif op == 'rebind':
+        # A player resumed the game from a new connection (new player id)
+        old, new = record['old_player_id'], record['player_id']
+        for seat in game['players']:
+            if seat[0] == old:
+                seat[0] = new
+        if old in game['tokens']:
+            game['tokens'][new] = game['tokens'].pop(old)
+        if game['current_turn'] == old:
+            game['current_turn'] = new
+        for entry in game['moves']:
+            if entry['player_id'] == old:
+                entry['player_id'] = new
+    elif op == 'end':
+        del games[game_id]
+
+
+class GameJournal:
+    """
+    `<name>.journal` (JSON lines) plus `<name>.snapshot` in `directory`.
+
+    Call recover() once at startup, then start(); record() only queues,
+    so the event loop never waits on the disk. Every record gets a
+    sequence number and the snapshot remembers the last one it covers,
+    so a crash between writing a snapshot and truncating the log can't
+    replay a move twice. A torn last line (crash mid-write) is ignored
+    and cut off by a compaction before anything is appended.
+    """
+    _STOP = object()
+
+    def __init__(self, directory: Path = JOURNAL_DIR, name: str = 'games', sync: bool = True,
+                 compact_records: int = COMPACT_RECORDS, batch_size: int = 500):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.directory / f'{name}.journal'
+        self.snapshot_path = self.directory / f'{name}.snapshot'
+        self.sync = sync
+        self.compact_records = compact_records
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.games = {}  # Replayed state, owned by the writer thread once started
+        self.seq = 0
+        self.since_snapshot = 0
+        self.records = 0
+        self.batches = 0
+        self.compactions = 0
+        self.file = None
+        self.thread = None
+        self.closed = False
+
+    def recover(self) -> Dict[str, Dict]:
+        """
+        Load the snapshot and replay the log after it. Returns the active
+        games (see apply_record); the writer thread keeps updating these
+        dicts after start(), so copy anything you hold on to.
+        """
+        if self.snapshot_path.exists():
+            snapshot = loads(self.snapshot_path.read_bytes())
+            self.games = snapshot['games']
+            self.seq = snapshot['seq']
+        replayed = 0
+        torn = False
+        if self.log_path.exists():
+            with open(self.log_path, 'rb') as journal_file:
+                for line in journal_file:
+                    # A last line without its newline is torn even if it parses:
+                    # the next append would land on the end of it
+                    torn = not line.endswith(b'\n')
+                    try:
+                        record = loads(line)
+                    except Exception:
+                        log.warning("⚠️  Ignoring torn record at the end of %s", self.log_path)
+                        torn = True
+                        break
+                    if record['seq'] <= self.seq:
+                        continue  # Already in the snapshot
+                    apply_record(self.games, record)
+                    self.seq = record['seq']
+                    replayed += 1
+        if replayed or torn:
+            # Start from a clean snapshot and an empty log (dropping any torn tail)
+            self._compact()
+        return self.games
+
+    def start(self):
+        self.file = open(self.log_path, 'a', encoding='utf-8')
+        self.thread = threading.Thread(target=self._run, name='multiplayer-journal', daemon=True)
+        self.thread.start()
+
+    def record(self, op: str, **fields):
+        """Queue a record for the writer thread; never blocks"""
+        if self.closed:
+            return
+        fields['op'] = op
+        self.queue.put(fields)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            batch = [] if record is self._STOP else [record]
+            stop = record is self._STOP
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._STOP:
+                    stop = True
+                else:
+                    batch.append(record)
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    log.warning("⚠️  Journal write failed (%d record(s) lost): %s", len(batch), e)
+            for _ in range(len(batch) + stop):
+                self.queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        """Append a batch with one flush + fsync, then fold it into the replayed state"""
+        lines = []
+        for record in batch:
+            self.seq += 1
+            record['seq'] = self.seq
+            lines.append(dumps(record))
+            apply_record(self.games, record)
+        self.file.write('\n'.join(lines) + '\n')
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+        self.records += len(batch)
+        self.batches += 1
+        self.since_snapshot += len(batch)
+        if self.since_snapshot >= self.compact_records:
+            self._compact()
+
+    def _compact(self):
+        """Snapshot the active games atomically, then start a fresh log"""
+        temp_path = self.snapshot_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as snapshot:
+            snapshot.write(dumps({'seq': self.seq, 'games': self.games}))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        if hasattr(os, 'O_DIRECTORY'):
+            directory = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        if self.file:
+            self.file.close()
+        self.file = open(self.log_path, 'w', encoding='utf-8')
+        if self.thread is None:  # Compacting during recover(); start() reopens for appending
+            self.file.close()
+            self.file = None
+        self.since_snapshot = 0
+        self.compactions += 1
+
+    def flush(self):
+        """Block until everything queued so far is on disk"""
+        self.queue.join()
+
+    def close(self):
+        """Write out everything still queued, then stop the thread"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.thread:
+            self.queue.put(self._STOP)
+            self.thread.join()
+        if self.file:
+            self.file.close()
+
+    def stats(self) -> Dict:
+        return {
+            'active_games': len(self.games),
+            'queued': self.queue.qsize(),
+            'records': self.records,
+            'batches': self.batches,
+            'compactions': self.compactions,
+            'seq': self.seq
+        }
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+In-Memory Leaderboards for the Multiplayer Server
+Materialized copies of the league table and per-game-type leaderboards,
+loaded once from MultiplayerDB and updated as games are saved.
+**Timestamp**: 2026-10-18
+"""
+
+import random
+import threading
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+def league_sort_key(row: Dict) -> Tuple:
+    """ORDER BY points DESC, win_rate DESC, total_games DESC"""
+    return (-row['points'], -row['win_rate'], -row['total_games'], row['player_id'])
+
+
+def game_type_sort_key(row: Dict) -> Tuple:
+    """ORDER BY win_rate DESC, games_played DESC"""
+    return (-row['win_rate'], -row['games_played'], row['player_id'])
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, height: int):
+        self.key = key
+        self.next = [None] * height
+        self.width = [1] * height  # Keys jumped by each link, counting the one it lands on
+
+
+class RankIndex:
+    """
+    Indexable skip list of unique, comparable keys.
+
+    Insert, remove and rank are O(log n) expected; the first n keys are a
+    walk along the bottom level. A link to the end (None) counts as
+    landing one past the last key, so widths stay consistent at the tail.
+    """
+    MAX_HEIGHT = 32
+
+    def __init__(self):
+        self.head = _Node(None, self.MAX_HEIGHT)
+        self.height = 1
+        self.size = 0
+        self.random = random.Random()
+
+    def __len__(self):
+        return self.size
+
+    def _path(self, key) -> Tuple[List[_Node], List[int]]:
+        """Last node before `key` on each level, and its position (head = 0)"""
+        path = [self.head] * self.height
+        positions = [0] * self.height
+        node, position = self.head, 0
+        for level in reversed(range(self.height)):
+            following = node.next[level]
+            while following is not None and following.key < key:
+                position += node.width[level]
+                node, following = following, following.next[level]
+            path[level], positions[level] = node, position
+        return path, positions
+
+    def insert(self, key):
+        height = 1
+        while height < self.MAX_HEIGHT and self.random.random() < 0.5:
+            height += 1
+        for level in range(self.height, height):
+            self.head.next[level] = None
+            self.head.width[level] = self.size + 1
+        self.height = max(self.height, height)
+        path, positions = self._path(key)
+        position = positions[0] + 1
+        node = _Node(key, height)
+        for level in range(height):
+            before = path[level]
+            node.next[level] = before.next[level]
+            node.width[level] = before.width[level] - (position - positions[level]) + 1
+            before.next[level] = node
+            before.width[level] = position - positions[level]
+        for level in range(height, self.height):
+            path[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        path, _ = self._path(key)
+        node = path[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for level in range(self.height):
+            before = path[level]
+            if before.next[level] is node:
+                before.width[level] += node.width[level] - 1
+                before.next[level] = node.next[level]
+            else:
+                before.width[level] -= 1
+        while self.height > 1 and self.head.next[self.height - 1] is None:
+            self.height -= 1
+        self.size -= 1
+
+    def rank(self, key) -> Optional[int]:
+        """1-based position of `key`, or None if it isn't in the index"""
+        path, positions = self._path(key)
+        node = path[0].next[0]
+        if node is None or node.key != key:
+            return None
+        return positions[0] + 1
+
+    def first(self, limit: int) -> Iterator:
+        node = self.head.next[0]
+        while node is not None and limit > 0:
+            yield node.key
+            node = node.next[0]
+            limit -= 1
+
+
+class RankedBoard:
+    """
+    Players kept in rank order.
+
+    `keys` is a RankIndex of sort-key tuples (ending in player_id, so
+    every key is unique). Top-N walks the first N keys; rank lookup and
+    an update (remove the old key, insert the new one) are O(log n).
+    """
+    def __init__(self, sort_key: Callable[[Dict], Tuple], include: Callable[[Dict], bool]):
+        self.sort_key = sort_key
+        self.include = include
+        self.keys = RankIndex()
+        self.rows = {}  # player_id -> row
+        self.player_keys = {}  # player_id -> current sort key
+        self.version = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def update(self, row: Dict):
+        """Insert or move one player's row"""
+        player_id = row['player_id']
+        old_key = self.player_keys.pop(player_id, None)
+        if old_key is not None:
+            self.keys.remove(old_key)
+            del self.rows[player_id]
+        if self.include(row):
+            key = self.sort_key(row)
+            self.keys.insert(key)
+            self.player_keys[player_id] = key
+            self.rows[player_id] = row
+        self.version += 1
+
+    def top(self, limit: int) -> List[Dict]:
+        return [self.rows[key[-1]] for key in self.keys.first(limit)]
+
+    def rank(self, player_id: str) -> Optional[int]:
+        """1-based position, or None if the player isn't ranked"""
+        key = self.player_keys.get(player_id)
+        if key is None:
+            return None
+        return self.keys.rank(key)
+
+
+class Leaderboards:
+    """
+    League table plus one leaderboard per game type.
+
+    The persistence writer thread calls apply() after each commit while the
+    event loop serves reads, so both sides take the lock; reads only slice
+    or walk the skip list, so they hold it briefly. Every board has a version that is
+    bumped on change and used as the HTTP ETag.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Distinguishes ETags across restarts, when versions start over
+        self.epoch = uuid.uuid4().hex[:8]
+        self.league = RankedBoard(league_sort_key, lambda row: row['total_games'] > 0)
+        self.game_types = {}  # game_type -> RankedBoard
+
+    def _game_type_board(self, game_type: str) -> RankedBoard:
+        board = self.game_types.get(game_type)
+        if board is None:
+            board = RankedBoard(game_type_sort_key, lambda row: row['games_played'] > 0)
+            self.game_types[game_type] = board
+        return board
+
+    def load(self, db):
+        """Fill the boards from the database (once, at startup)"""
+        self.apply(db.get_league_rows(), db.get_game_type_rows())
+        print(f"🏆 Leaderboards loaded: {len(self.league)} ranked players, "
+              f"{len(self.game_types)} game types")
+
+    def apply(self, league_rows: List[Dict], game_type_rows: List[Dict]):
+        """Apply fresh standings rows (MultiplayerDB listener)"""
+        with self.lock:
+            for row in league_rows:
+                self.league.update(row)
+            for row in game_type_rows:
+                self._game_type_board(row['game_type']).update(row)
+
+    def _etag(self, name: str, board: Optional[RankedBoard], *parts) -> str:
+        version = board.version if board else 0
+        return '"' + '-'.join(str(p) for p in (self.epoch, name, version) + parts) + '"'
+
+    def league_top(self, limit: int) -> Tuple[List[Dict], str]:
+        """(top `limit` standings, ETag)"""
+        with self.lock:
+            return self.league.top(limit), self._etag('league', self.league, limit)
+
+    def league_rank(self, player_id: str) -> Tuple[Optional[Dict], str]:
+        """({'rank', 'of', 'standing'} or None, ETag)"""
+        with self.lock:
+            rank = self.league.rank(player_id)
+            etag = self._etag('league', self.league, 'rank', player_id)
+            if rank is None:
+                return None, etag
+            return {'rank': rank, 'of': len(self.league), 'standing': self.league.rows[player_id]}, etag
+
+    def game_type_top(self, game_type: str, limit: int) -> Tuple[List[Dict], str]:
+        with self.lock:
+            board = self.game_types.get(game_type)
+            etag = self._etag(game_type, board, limit)
+            rows = board.top(limit) if board else []
+            return [format_game_type_row(row) for row in rows], etag
+
+    def game_type_rank(self, game_type: str, player_id: str) -> Tuple[Optional[Dict], str]:
+        with self.lock:
+            board = self.game_types.get(game_type)
+            etag = self._etag(game_type, board, 'rank', player_id)
+            rank = board.rank(player_id) if board else None
+            if rank is None:
+                return None, etag
+            return {'rank': rank, 'of': len(board), 'standing': format_game_type_row(board.rows[player_id])}, etag
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'league': {'players': len(self.league), 'version': self.league.version},
+                'game_types': {
+                    name: {'players': len(board), 'version': board.version}
+                    for name, board in self.game_types.items()
+                }
+            }
+
+
+def format_game_type_row(row: Dict) -> Dict:
+    """Same shape as MultiplayerDB.get_game_type_leaderboard entries"""
+    return {
+        'player_id': row['player_id'],
+        'player_name': row['player_name'],
+        'games_played': row['games_played'],
+        'wins': row['wins'],
+        'losses': row['losses'],
+        'draws': row['draws'],
+        'win_rate': round(row['win_rate'], 1)
+    }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Matchmaking for the Multiplayer Server
+Per-game-type queues split into rating buckets. A new player is paired
+at once with someone from their own bucket; players who keep waiting
+are paired across progressively wider bucket ranges by a periodic tick.
+**Timestamp**: 2026-10-18
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class Ticket:
+    """One waiting player"""
+    __slots__ = ('player_id', 'game_type', 'rating', 'bucket', 'enqueued_at')
+
+    def __init__(self, player_id, game_type, rating, bucket, enqueued_at):
+        self.player_id = player_id
+        self.game_type = game_type
+        self.rating = rating
+        self.bucket = bucket
+        self.enqueued_at = enqueued_at
+
+
+class Matchmaker:
+    """
+    Waiting players, indexed three ways so every operation is O(1):
+
+    - tickets:  player_id -> Ticket
+    - buckets:  game_type -> bucket number -> OrderedDict of tickets,
+                oldest first (bucket = rating // bucket_width)
+    - arrivals: game_type -> OrderedDict of tickets, oldest first
+
+    A ticket that has waited `widen_every` seconds accepts opponents one
+    bucket further away, up to `max_widen` buckets. tick() walks only the
+    tickets old enough to have widened, oldest first, so its cost tracks
+    the long-waiting players rather than the whole queue.
+    """
+    def __init__(self, bucket_width: int = 100, widen_every: float = 5.0, max_widen: int = 10):
+        self.bucket_width = bucket_width
+        self.widen_every = widen_every
+        self.max_widen = max_widen
+        self.tickets = {}
+        self.buckets = {}
+        self.arrivals = {}
+        self.matched = 0
+        self.wait_total = 0.0
+
+    def __len__(self):
+        return len(self.tickets)
+
+    def __contains__(self, player_id):
+        return player_id in self.tickets
+
+    def enqueue(self, player_id: str, game_type: str, rating: float = 1000,
+                now: Optional[float] = None) -> Optional[str]:
+        """
+        Queue a player. Returns the opponent's player_id if someone in the
+        same game type and rating bucket is already waiting (that player
+        leaves the queue), otherwise None.
+        """
+        now = time.monotonic() if now is None else now
+        self.cancel(player_id)
+        bucket = int(rating // self.bucket_width)
+
+        waiting = self.buckets.get(game_type, {}).get(bucket)
+        if waiting:
+            opponent = next(iter(waiting.values()))
+            self._remove(opponent)
+            self._record_match(now - opponent.enqueued_at, 0.0)
+            return opponent.player_id
+
+        ticket = Ticket(player_id, game_type, rating, bucket, now)
+        self.tickets[player_id] = ticket
+        self.buckets.setdefault(game_type, {}).setdefault(bucket, OrderedDict())[player_id] = ticket
+        self.arrivals.setdefault(game_type, OrderedDict())[player_id] = ticket
+        return None
+
+    def cancel(self, player_id: str) -> bool:
+        """Take a player out of the queue (left, disconnected, re-queued)"""
+        ticket = self.tickets.get(player_id)
+        if ticket is None:
+            return False
+        self._remove(ticket)
+        return True
+
+    def _remove(self, ticket: Ticket):
+        del self.tickets[ticket.player_id]
+        buckets = self.buckets[ticket.game_type]
+        bucket = buckets[ticket.bucket]
+        del bucket[ticket.player_id]
+        if not bucket:
+            del buckets[ticket.bucket]
+            if not buckets:
+                del self.buckets[ticket.game_type]
+        arrivals = self.arrivals[ticket.game_type]
+        del arrivals[ticket.player_id]
+        if not arrivals:
+            del self.arrivals[ticket.game_type]
+
+    def _record_match(self, *waits: float):
+        """Count matched players and how long they queued"""
+        self.matched += len(waits)
+        self.wait_total += sum(waits)
+
+    def _window(self, ticket: Ticket, now: float) -> int:
+        """How many buckets either side this ticket will accept"""
+        return min(self.max_widen, int((now - ticket.enqueued_at) // self.widen_every))
+
+    def tick(self, now: Optional[float] = None) -> List[Tuple[str, str, str]]:
+        """
+        Pair long-waiting players across widened rating windows.
+        Returns (waiting_longer_id, opponent_id, game_type) tuples.
+        """
+        now = time.monotonic() if now is None else now
+        pairs = []
+        for game_type, arrivals in list(self.arrivals.items()):
+            # Arrivals are oldest first, so the widened tickets are a prefix
+            widened = []
+            for ticket in arrivals.values():
+                window = self._window(ticket, now)
+                if window == 0:
+                    break
+                widened.append((ticket, window))
+
+            for ticket, window in widened:
+                if ticket.player_id not in self.tickets:
+                    continue  # already paired in this tick
+                opponent = self._nearest(ticket, window)
+                if opponent is None:
+                    continue
+                self._remove(ticket)
+                self._remove(opponent)
+                self._record_match(now - ticket.enqueued_at, now - opponent.enqueued_at)
+                pairs.append((ticket.player_id, opponent.player_id, game_type))
+        return pairs
+
+    def _nearest(self, ticket: Ticket, window: int) -> Optional[Ticket]:
+        """Longest-waiting other ticket in the closest bucket within `window`"""
+        buckets = self.buckets.get(ticket.game_type, {})
+        for distance in range(window + 1):
+            for bucket in ((ticket.bucket,) if distance == 0 else
+                           (ticket.bucket - distance, ticket.bucket + distance)):
+                waiting = buckets.get(bucket)
+                if not waiting:
+                    continue
+                for candidate in waiting.values():
+                    if candidate is not ticket:
+                        return candidate
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            'waiting': len(self.tickets),
+            'by_game_type': {game_type: len(arrivals) for game_type, arrivals in self.arrivals.items()},
+            'matched': self.matched,
+            'avg_wait_seconds': round(self.wait_total / self.matched, 2) if self.matched else 0.0
+        }
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Rating Engine for Multiplayer Games - Elo and Glicko-2
+Per-game updates (applied by MultiplayerDB inside the save transaction)
+and rating-period replays over the whole game history. Replays are
+vectorized with NumPy when it is installed and fall back to plain Python.
+**Timestamp**: 2026-10-18
+
+Usage:
+  python multiplayer_ratings.py --recompute [--system glicko2] [--period-days 0] [--db PATH]
+  python multiplayer_ratings.py --benchmark 500000 [--players 20000] [--system elo]
+"""
+
+import math
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RATING_SYSTEMS = ('elo', 'glicko2')
+
+DEFAULT_RATING = 1000.0  # matches the elo_rating column default
+DEFAULT_DEVIATION = 350.0
+DEFAULT_VOLATILITY = 0.06
+
+ELO_K = 32
+
+# Glicko-2 works on its own scale: mu = (r - 1500) / 173.7178
+GLICKO_SCALE = 173.7178
+GLICKO_TAU = 0.5  # constrains volatility change; 0.3-1.2 per Glickman
+GLICKO_EPSILON = 0.000001
+
+# (rating, deviation, volatility); Elo only uses the rating
+Rating = Tuple[float, float, float]
+NEW_PLAYER: Rating = (DEFAULT_RATING, DEFAULT_DEVIATION, DEFAULT_VOLATILITY)
+
+
+# ---------------------------------------------------------------------------
+# Per-game updates
+# ---------------------------------------------------------------------------
+
+def elo_expected(rating: float, opponent: float) -> float:
+    return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / 400.0))
+
+
+def _g(phi):
+    return 1.0 / math.sqrt(1.0 + 3.0 * phi * phi / (math.pi * math.pi))
+
+
+def _glicko2_volatility(phi: float, sigma: float, delta: float, v: float,
+                        tau: float = GLICKO_TAU) -> float:
+    """New volatility by the Illinois algorithm (Glickman, step 5)"""
+    a = math.log(sigma * sigma)
+    phi2v = phi * phi + v
+    delta2 = delta * delta
+
+    def f(x):
+        ex = math.exp(x)
+        return ex * (delta2 - phi2v - ex) / (2.0 * (phi2v + ex) ** 2) - (x - a) / (tau * tau)
+
+    A = a
+    if delta2 > phi2v:
+        B = math.log(delta2 - phi2v)
+    else:
+        k = 1
+        while f(a - k * tau) < 0:
+            k += 1
+        B = a - k * tau
+    fA, fB = f(A), f(B)
+    while abs(B - A) > GLICKO_EPSILON:
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        if fC * fB <= 0:
+            A, fA = B, fB
+        else:
+            fA /= 2.0
+        B, fB = C, fC
+    return math.exp(A / 2.0)
+
+
+def glicko2_update(player: Rating, results: List[Tuple[Rating, float]]) -> Rating:
+    """
+    Glicko-2 rating after one rating period.
+    `results` holds (opponent rating, score) with score 1 / 0.5 / 0.
+    """
+    rating, deviation, volatility = player
+    mu = (rating - 1500.0) / GLICKO_SCALE
+    phi = deviation / GLICKO_SCALE
+    if not results:
+        phi_star = math.sqrt(phi * phi + volatility * volatility)
+        return rating, min(phi_star * GLICKO_SCALE, DEFAULT_DEVIATION), volatility
+
+    v_inv = 0.0
+    score_sum = 0.0
+    for (opp_rating, opp_deviation, _), score in results:
+        mu_j = (opp_rating - 1500.0) / GLICKO_SCALE
+        g = _g(opp_deviation / GLICKO_SCALE)
+        expected = 1.0 / (1.0 + math.exp(-g * (mu - mu_j)))
+        v_inv += g * g * expected * (1.0 - expected)
+        score_sum += g * (score - expected)
+    v = 1.0 / v_inv
+    new_volatility = _glicko2_volatility(phi, volatility, v * score_sum, v)
+    phi_star = math.sqrt(phi * phi + new_volatility * new_volatility)
+    new_phi = 1.0 / math.sqrt(1.0 / (phi_star * phi_star) + 1.0 / v)
+    new_mu = mu + new_phi * new_phi * score_sum
+    return new_mu * GLICKO_SCALE + 1500.0, new_phi * GLICKO_SCALE, new_volatility
+
+
+def rate_game(system: str, player1: Rating, player2: Rating, score1: float) -> Tuple[Rating, Rating]:
+    """New ratings for both players after one game (score1: 1 win, 0.5 draw, 0 loss)"""
+    if system == 'glicko2':
+        return (glicko2_update(player1, [(player2, score1)]),
+                glicko2_update(player2, [(player1, 1.0 - score1)]))
+    change = ELO_K * (score1 - elo_expected(player1[0], player2[0]))
+    return ((player1[0] + change, player1[1], player1[2]),
+            (player2[0] - change, player2[1], player2[2]))
+
+
+# ---------------------------------------------------------------------------
+# Rating-period replays
+# ---------------------------------------------------------------------------
+
+def _period_of(finished_at: Optional[str], period_days: int) -> int:
+    """Rating period number for an ISO timestamp"""
+    if not finished_at:
+        return 0
+    return date.fromisoformat(finished_at[:10]).toordinal() // period_days
+
+
+def _rounds(player1: List[int], player2: List[int]) -> List[Tuple[int, int]]:
+    """
+    Split games (in order) into runs where nobody plays twice. Games in
+    such a run don't depend on each other, so rating them all at once
+    from the same starting ratings gives exactly the game-by-game result.
+    """
+    slices = []
+    start = 0
+    busy = set()
+    for i, (a, b) in enumerate(zip(player1, player2)):
+        if a in busy or b in busy:
+            slices.append((start, i))
+            start = i
+            busy = set()
+        busy.add(a)
+        busy.add(b)
+    if start < len(player1):
+        slices.append((start, len(player1)))
+    return slices
+
+
+def replay(games: List[Tuple[str, str, float, str]], system: str = 'elo',
+           period_days: int = 0, use_numpy: Optional[bool] = None) -> Dict[str, Dict]:
+    """
+    Recompute every rating from scratch.
+
+    `games` is (player1_id, player2_id, score1, finished_at) in finishing
+    order.
+
+    period_days=0 replays game by game, reproducing the per-game updates
+    MultiplayerDB applies as games are saved. Games are batched into runs
+    of independent games (see _rounds), each run computed as one set of
+    array operations.
+
+    period_days=N groups games into rating periods of N days; every game in
+    a period is rated against the ratings at the start of the period, and
+    Glicko-2 deviations of idle players grow between periods (the Glicko
+    rating-period model).
+
+    Returns player_id -> {'rating', 'deviation', 'volatility', 'games'}.
+    """
+    if system not in RATING_SYSTEMS:
+        raise ValueError(f"Unknown rating system {system!r} (choose from {', '.join(RATING_SYSTEMS)})")
+    if use_numpy is None:
+        use_numpy = np is not None
+
+    index = {}
+    player1 = []
+    player2 = []
+    scores = []
+    periods = []
+    for p1, p2, score1, finished_at in games:
+        player1.append(index.setdefault(p1, len(index)))
+        player2.append(index.setdefault(p2, len(index)))
+        scores.append(score1)
+        if period_days:
+            periods.append(_period_of(finished_at, period_days))
+
+    if period_days:
+        # Slices of consecutive games sharing a period
+        bounds = [0]
+        for i in range(1, len(periods)):
+            if periods[i] != periods[i - 1]:
+                bounds.append(i)
+        bounds.append(len(periods))
+        slices = [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i] < bounds[i + 1]]
+    else:
+        slices = _rounds(player1, player2)
+
+    run = _replay_numpy if use_numpy else _replay_python
+    ratings, deviations, volatilities, counts = run(
+        len(index), player1, player2, scores, slices, system, decay=bool(period_days)
+    )
+    return {
+        player_id: {
+            'rating': float(ratings[i]),
+            'deviation': float(deviations[i]),
+            'volatility': float(volatilities[i]),
+            'games': int(counts[i])
+        }
+        for player_id, i in index.items()
+    }
+
+
+def _replay_python(n, player1, player2, scores, slices, system, decay):
+    ratings = [DEFAULT_RATING] * n
+    deviations = [DEFAULT_DEVIATION] * n
+    volatilities = [DEFAULT_VOLATILITY] * n
+    counts = [0] * n
+    seen = set()
+
+    for start, end in slices:
+        if system == 'elo':
+            changes = {}
+            for a, b, score in zip(player1[start:end], player2[start:end], scores[start:end]):
+                change = ELO_K * (score - elo_expected(ratings[a], ratings[b]))
+                changes[a] = changes.get(a, 0.0) + change
+                changes[b] = changes.get(b, 0.0) - change
+                counts[a] += 1
+                counts[b] += 1
+            for i, change in changes.items():
+                ratings[i] += change
+            continue
+
+        results = {}
+        for a, b, score in zip(player1[start:end], player2[start:end], scores[start:end]):
+            results.setdefault(a, []).append(((ratings[b], deviations[b], volatilities[b]), score))
+            results.setdefault(b, []).append(((ratings[a], deviations[a], volatilities[a]), 1.0 - score))
+        updated = {
+            i: glicko2_update((ratings[i], deviations[i], volatilities[i]), player_results)
+            for i, player_results in results.items()
+        }
+        if decay:
+            # Idle players grow less certain
+            for i in seen.difference(updated):
+                _, deviations[i], _ = glicko2_update((ratings[i], deviations[i], volatilities[i]), [])
+            seen.update(updated)
+        for i, rating in updated.items():
+            ratings[i], deviations[i], volatilities[i] = rating
+            counts[i] += len(results[i])
+    return ratings, deviations, volatilities, counts
+
+
+def _volatility_np(phi, sigma, delta, v, tau=GLICKO_TAU):
+    """_glicko2_volatility over arrays, iterating until every lane converges"""
+    a = np.log(sigma * sigma)
+    phi2v = phi * phi + v
+    delta2 = delta * delta
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta2 - phi2v - ex) / (2.0 * (phi2v + ex) ** 2) - (x - a) / (tau * tau)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        A = a.copy()
+        high = delta2 > phi2v
+        B = np.where(high, np.log(np.where(high, delta2 - phi2v, 1.0)), a - tau)
+        k = np.ones_like(a)
+        pending = ~high & (f(B) < 0)
+        while pending.any():
+            k[pending] += 1
+            B[pending] = a[pending] - k[pending] * tau
+            pending &= f(B) < 0
+
+        fA, fB = f(A), f(B)
+        active = np.abs(B - A) > GLICKO_EPSILON
+        while active.any():
+            C = A + (A - B) * fA / (fB - fA)
+            fC = f(C)
+            swap = active & (fC * fB <= 0)
+            halve = active & ~swap
+            A = np.where(swap, B, A)
+            fA = np.where(swap, fB, np.where(halve, fA / 2.0, fA))
+            B = np.where(active, C, B)
+            fB = np.where(active, fC, fB)
+            active &= np.abs(B - A) > GLICKO_EPSILON
+    return np.exp(A / 2.0)
+
+
+def _replay_numpy(n, player1, player2, scores, slices, system, decay):
+    player1 = np.asarray(player1, dtype=np.int64)
+    player2 = np.asarray(player2, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    counts = np.bincount(player1, minlength=n) + np.bincount(player2, minlength=n)
+
+    if system == 'elo':
+        ratings = np.full(n, DEFAULT_RATING)
+        for start, end in slices:
+            a, b = player1[start:end], player2[start:end]
+            expected = 1.0 / (1.0 + 10.0 ** ((ratings[b] - ratings[a]) / 400.0))
+            change = ELO_K * (scores[start:end] - expected)
+            np.add.at(ratings, a, change)
+            np.add.at(ratings, b, -change)
+        return ratings, np.full(n, DEFAULT_DEVIATION), np.full(n, DEFAULT_VOLATILITY), counts
+
+    mu = np.full(n, (DEFAULT_RATING - 1500.0) / GLICKO_SCALE)
+    phi = np.full(n, DEFAULT_DEVIATION / GLICKO_SCALE)
+    sigma = np.full(n, DEFAULT_VOLATILITY)
+    seen = np.zeros(n, dtype=bool)
+    max_phi = DEFAULT_DEVIATION / GLICKO_SCALE
+
+    for start, end in slices:
+        a, b, s = player1[start:end], player2[start:end], scores[start:end]
+        g_a = 1.0 / np.sqrt(1.0 + 3.0 * phi[a] ** 2 / np.pi ** 2)
+        g_b = 1.0 / np.sqrt(1.0 + 3.0 * phi[b] ** 2 / np.pi ** 2)
+        expected_a = 1.0 / (1.0 + np.exp(-g_b * (mu[a] - mu[b])))
+        expected_b = 1.0 / (1.0 + np.exp(-g_a * (mu[b] - mu[a])))
+
+        v_inv = np.zeros(n)
+        score_sum = np.zeros(n)
+        np.add.at(v_inv, a, g_b * g_b * expected_a * (1.0 - expected_a))
+        np.add.at(v_inv, b, g_a * g_a * expected_b * (1.0 - expected_b))
+        np.add.at(score_sum, a, g_b * (s - expected_a))
+        np.add.at(score_sum, b, g_a * ((1.0 - s) - expected_b))
+
+        played = v_inv > 0
+        if decay:
+            idle = seen & ~played
+            phi[idle] = np.minimum(np.sqrt(phi[idle] ** 2 + sigma[idle] ** 2), max_phi)
+            seen |= played
+
+        i = np.nonzero(played)[0]
+        v = 1.0 / v_inv[i]
+        new_sigma = _volatility_np(phi[i], sigma[i], v * score_sum[i], v)
+        phi_star = np.sqrt(phi[i] ** 2 + new_sigma ** 2)
+        new_phi = 1.0 / np.sqrt(1.0 / phi_star ** 2 + 1.0 / v)
+        mu[i] += new_phi ** 2 * score_sum[i]
+        phi[i] = new_phi
+        sigma[i] = new_sigma
+
+    return mu * GLICKO_SCALE + 1500.0, phi * GLICKO_SCALE, sigma, counts
+
+
+def synthetic_games(count: int, players: int, seed: int = 42) -> List[Tuple[str, str, float, str]]:
+    """Random games over the past year, in finishing order, for benchmarks"""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365)
+    games = []
+    for i in range(count):
+        p1, p2 = rng.sample(range(players), 2)
+        day = start + timedelta(days=i * 365 // count)
+        games.append((f'p{p1}', f'p{p2}', rng.choice((1.0, 0.5, 0.0)), day.isoformat()))
+    return games
+
+
+def main():
+    import argparse
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description='Recompute or benchmark multiplayer ratings')
+    parser.add_argument('--recompute', action='store_true', help='replay every finished game in the database')
+    parser.add_argument('--benchmark', type=int, metavar='GAMES', help='time a replay of synthetic games')
+    parser.add_argument('--players', type=int, default=20000, help='players in the synthetic benchmark')
+    parser.add_argument('--system', choices=RATING_SYSTEMS, default='elo')
+    parser.add_argument('--period-days', type=int, default=0,
+                        help='rating period length; 0 replays game by game (default)')
+    parser.add_argument('--db', type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        games = synthetic_games(args.benchmark, args.players)
+        backends = [True, False] if np is not None else [False]
+        for use_numpy in backends:
+            started = time.perf_counter()
+            result = replay(games, args.system, args.period_days, use_numpy=use_numpy)
+            elapsed = time.perf_counter() - started
+            print(f"⏱️  {args.system} replay of {len(games):,} games / {len(result):,} players "
+                  f"({'numpy' if use_numpy else 'python'}): {elapsed:.2f}s")
+        if np is None:
+            print("ℹ️  NumPy not installed - only the pure-Python path was timed")
+    elif args.recompute:
+        from multiplayer_db import DB_PATH, MultiplayerDB
+        db = MultiplayerDB(args.db or DB_PATH, rating_system=args.system)
+        summary = db.recompute_ratings(period_days=args.period_days)
+        db.close()
+        print(f"✅ Recomputed {summary['system']} ratings for {summary['players']:,} players "
+              f"from {summary['games']:,} games in {summary['seconds']}s ({summary['backend']})")
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
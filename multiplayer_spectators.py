@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Spectator Feeds for the Multiplayer Server
+Each spectator connection gets a SpectatorFeed: a bounded queue of game
+updates (shared Payloads, encoded once per wire format) drained by the
+feed's own task, so a slow spectator never delays the players or anyone
+else watching.
+**Timestamp**: 2026-10-18
+"""
+
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict
+
+from multiplayer_codecs import JSON, Payload
+from multiplayer_fanout import send_payload
+
+SPECTATOR_BUFFER = 64  # Queued updates per spectator before the backlog is coalesced
+
+# Kinds of update. A snapshot or end replaces everything before it for
+# that game, so those are never dropped; deltas can be.
+DELTA = 'delta'
+SNAPSHOT = 'snapshot'
+END = 'end'
+
+
+class SpectatorFeed:
+    """
+    Updates for every game one connection is watching.
+
+    A game starts out (and returns to) "resyncing": deltas are ignored
+    until its snapshot arrives. When more than `limit` updates are
+    waiting, the spectator is too slow to follow move by move, so the
+    backlog is discarded and a fresh snapshot is requested per game -
+    one message that says everything the dropped deltas would have.
+    """
+    def __init__(self, websocket, request_snapshot: Callable[[str], Awaitable[None]],
+                 codec: str = JSON, limit: int = SPECTATOR_BUFFER):
+        self.websocket = websocket
+        self.codec = codec
+        self.request_snapshot = request_snapshot
+        self.limit = limit
+        self.pending = deque()  # (game_id, Payload, kind)
+        self.watching = set()
+        self.resyncing = set()
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+        self.task = asyncio.create_task(self._run())
+
+    def watch(self, game_id: str):
+        self.watching.add(game_id)
+        self.resyncing.add(game_id)
+
+    def unwatch(self, game_id: str):
+        self.watching.discard(game_id)
+        self.resyncing.discard(game_id)
+
+    def push(self, game_id: str, payload: Payload, kind: str = DELTA):
+        """Queue an update; never blocks"""
+        if game_id not in self.watching:
+            return
+        if kind == DELTA:
+            if game_id in self.resyncing:
+                return
+            if len(self.pending) >= self.limit:
+                self._coalesce()
+                return
+        else:
+            # Supersedes whatever is still queued for this game
+            self.pending = deque(item for item in self.pending if item[0] != game_id)
+            self.resyncing.discard(game_id)
+            if kind == END:
+                self.watching.discard(game_id)
+        self.pending.append((game_id, payload, kind))
+        self.wakeup.set()
+
+    def _coalesce(self):
+        # Keep only the endings: games still being watched get a snapshot instead
+        self.pending = deque(item for item in self.pending if item[2] == END)
+        self.coalesced += 1
+        for game_id in self.watching:
+            self.resyncing.add(game_id)
+            asyncio.ensure_future(self.request_snapshot(game_id))
+
+    async def _run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.pending:
+                _, payload, _ = self.pending.popleft()
+                if not await send_payload(self.websocket, payload.encode(self.codec)):
+                    # Closed, or stalled outright; the connection handler cleans up
+                    asyncio.ensure_future(self.websocket.close(code=1013, reason='Too slow'))
+                    return
+                self.sent += 1
+
+    def close(self):
+        self.task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            'watching': len(self.watching),
+            'pending': len(self.pending),
+            'sent': self.sent,
+            'coalesced': self.coalesced
+        }
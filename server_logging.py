@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Server Logging - queue-backed, level-gated logging for every server
+Log calls on the event loop only put the record on a queue; a background
+thread formats and writes it, so a slow terminal or pipe never holds up
+a search or a request. Shared by multiplayer-server.py and the engine
+backends (engine_bridge).
+**Timestamp**: 2026-10-18
+
+Environment:
+  SERVER_LOG_LEVEL   debug | info (default) | warning | error
+  SERVER_LOG_FORMAT  text (default, the usual emoji lines) | json (one object per line)
+  SERVER_LOG_SAMPLE  keep 1 in N records below WARNING for a logger and its children,
+                     e.g. "engine_bridge.output=100,multiplayer.connections=10"
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Dict
+
+QUEUE_SIZE = 10000  # Records waiting for the writer thread; beyond this they are dropped
+# LogRecord attributes that aren't user data (anything else came in through extra=)
+_STANDARD = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+_handler = None
+
+
+class SampleFilter(logging.Filter):
+    """Keep 1 in N records below WARNING for loggers under each configured prefix"""
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))  # Most specific first
+        self.seen = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, every in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                count = self.seen[prefix] = self.seen.get(prefix, 0) + 1
+                return every <= 1 or count % every == 1
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """{"ts", "level", "logger", "msg", ...extra fields, "exc"?} per line"""
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The message as print() used to show it, plus any traceback"""
+    def format(self, record):
+        message = record.getMessage()
+        if record.exc_text:
+            message = f'{message}\n{record.exc_text}'
+        return message
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Does the minimum on the caller's thread and never blocks: a full queue drops the record"""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge args now (they may change later), leave formatting to the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Below(logging.Filter):
+    def __init__(self, level):
+        super().__init__()
+        self.level = level
+
+    def filter(self, record):
+        return record.levelno < self.level
+
+
+def parse_rates(spec: str) -> Dict[str, int]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, every = item.partition('=')
+        try:
+            rates[name.strip()] = max(1, int(every))
+        except ValueError:
+            print(f"⚠️  Ignoring SERVER_LOG_SAMPLE entry '{item}' (want name=N)", file=sys.stderr)
+    return rates
+
+
+def setup_logging(level: str = None, fmt: str = None, sample: str = None):
+    """
+    Route the root logger through the queue (once per process; later calls
+    return straight away). Arguments override the SERVER_LOG_* variables.
+    Records below ERROR go to stdout, the rest to stderr.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+    level = (level or os.environ.get('SERVER_LOG_LEVEL', 'info')).upper()
+    fmt = (fmt or os.environ.get('SERVER_LOG_FORMAT', 'text')).lower()
+    sample = sample if sample is not None else os.environ.get('SERVER_LOG_SAMPLE', '')
+
+    formatter = JSONFormatter() if fmt == 'json' else TextFormatter()
+    stdout = logging.StreamHandler(sys.stdout)
+    stdout.addFilter(_Below(logging.ERROR))
+    stderr = logging.StreamHandler(sys.stderr)
+    stderr.setLevel(logging.ERROR)
+    for handler in (stdout, stderr):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(QUEUE_SIZE)
+    _handler = _QueueHandler(log_queue)
+    rates = parse_rates(sample)
+    if rates:
+        _handler.addFilter(SampleFilter(rates))
+    root = logging.getLogger()
+    root.handlers[:] = [_handler]
+    root.setLevel(getattr(logging, level, logging.INFO))
+    # One line per request / per connection otherwise (never shown before logging was set up)
+    for name in ('aiohttp.access', 'websockets.server'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, stdout, stderr, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out whatever is still queued and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        if _handler.dropped:
+            print(f"⚠️  {_handler.dropped} log record(s) dropped (queue full)", file=sys.stderr)
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler else 0
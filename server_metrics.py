@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Server Metrics - Prometheus-style counters, gauges and histograms
+Shared by multiplayer-server.py and the engine backends (engine_bridge),
+which serve them as text on /metrics. Gauges can be computed when
+scraped (set_function), so state that already exists costs nothing
+until someone asks. SERVER_METRICS=off turns every metric into a no-op
+and /metrics into a 404.
+**Timestamp**: 2026-10-18
+"""
+
+import bisect
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from aiohttp import web
+
+ENABLED = os.environ.get('SERVER_METRICS', 'on').lower() not in ('off', '0', 'false', 'no')
+# Seconds; from sub-millisecond WebSocket sends up to long engine searches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Timer:
+    """`with histogram.time():` or `async with ...`: observes the elapsed seconds"""
+    __slots__ = ('observe', 'started')
+
+    def __init__(self, observe):
+        self.observe = observe
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.observe(time.perf_counter() - self.started)
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        self.__exit__()
+
+
+class _Noop:
+    """Stands in for every metric when metrics are disabled"""
+    __slots__ = ()
+
+    def labels(self, *values, **named):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def set_function(self, function):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+NOOP = _Noop()
+
+
+class _Value:
+    """One labelled series of a counter or gauge"""
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function: Callable[[], Optional[float]]):
+        """Read the value from `function` at scrape time (None leaves the series out)"""
+        self.function = function
+
+    def read(self):
+        return self.function() if self.function else self.value
+
+
+class _Distribution:
+    """One labelled series of a histogram"""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        return _Timer(self.observe)
+
+
+class Metric:
+    """
+    A metric family. With label names, pick a series with
+    labels(*values); without, the family forwards inc/set/observe/...
+    to its single series, so `REQUESTS.inc()` just works.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.series = {}  # label values (as strings) -> series
+        self.lookup = {}  # label values as passed -> series, so repeat calls skip str()
+        if not self.labelnames:
+            series = self.labels()
+            for method in ('inc', 'dec', 'set', 'set_function', 'observe', 'time'):
+                if hasattr(series, method):
+                    setattr(self, method, getattr(series, method))
+
+    def new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **named):
+        if named:
+            values = tuple(named[name] for name in self.labelnames)
+        series = self.lookup.get(values)
+        if series is None:
+            key = tuple(str(value) for value in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name} takes labels {self.labelnames}, got {key}')
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = self.new_series()
+            self.lookup[values] = series
+        return series
+
+    def samples(self) -> List:
+        """[(suffix, {label: value}, number)] for rendering"""
+        samples = []
+        for key, series in list(self.series.items()):
+            value = series.read()
+            if value is not None:
+                samples.append(('', dict(zip(self.labelnames, key)), value))
+        return samples
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def new_series(self):
+        return _Value()
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def new_series(self):
+        return _Value()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def new_series(self):
+        return _Distribution(self.bounds)
+
+    def samples(self):
+        samples = []
+        for key, series in list(self.series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), series.counts):
+                cumulative += count
+                samples.append(('_bucket', {**labels, 'le': _number(bound)}, cumulative))
+            samples.append(('_sum', labels, series.sum))
+            samples.append(('_count', labels, series.count))
+        return samples
+
+
+class Registry:
+    """Named metrics of one process; asking twice for a name returns the same metric"""
+    def __init__(self, enabled: bool = ENABLED):
+        self.enabled = enabled
+        self.metrics: Dict[str, Metric] = {}
+
+    def _get(self, cls, name, help, labelnames, **options):
+        if not self.enabled:
+            return NOOP
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, help, labelnames, **options)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f'metric {name} already registered differently')
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def collect(self) -> List[Dict]:
+        """Plain data (picklable, JSON-able) for render() or another process"""
+        families = []
+        for metric in list(self.metrics.values()):
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                print(f"⚠️  Metric {metric.name} failed: {e}")
+                continue
+            families.append({'name': metric.name, 'help': metric.help, 'type': metric.kind,
+                             'samples': samples})
+        return families
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def with_labels(families: List[Dict], **labels) -> List[Dict]:
+    """The same families with extra labels on every sample (e.g. worker="2")"""
+    return [{**family, 'samples': [(suffix, {**labels, **sample_labels}, value)
+                                   for suffix, sample_labels, value in family['samples']]}
+            for family in families]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render(families: List[Dict]) -> str:
+    """Prometheus text exposition format; families sharing a name are merged"""
+    merged = {}
+    for family in families:
+        if family['name'] in merged:
+            merged[family['name']]['samples'].extend(family['samples'])
+        else:
+            merged[family['name']] = {**family, 'samples': list(family['samples'])}
+    lines = []
+    for name, family in merged.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for suffix, labels, value in family['samples']:
+            if labels:
+                text = ','.join(f'{key}="{_escape(v)}"' for key, v in labels.items())
+                lines.append(f"{name}{suffix}{{{text}}} {_number(value)}")
+            else:
+                lines.append(f"{name}{suffix} {_number(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_response(families: List[Dict]) -> web.Response:
+    return web.Response(body=render(families).encode(), headers={'Content-Type': CONTENT_TYPE})
+
+
+async def handle_metrics(request):
+    """GET /metrics for this process's default registry"""
+    if not REGISTRY.enabled:
+        raise web.HTTPNotFound(text='Metrics are disabled (SERVER_METRICS=off)')
+    return metrics_response(REGISTRY.collect())
+
+
+def request_timer(server: str):
+    """
+    aiohttp middleware timing every request by route and status. Routes
+    are the registered patterns ("/api/player/{player_id}/stats"), so
+    ids in paths don't make new series.
+    """
+    seconds = histogram('http_request_duration_seconds', 'HTTP request latency',
+                        ('server', 'route', 'status'))
+
+    @web.middleware
+    async def middleware(request, handler):
+        if not REGISTRY.enabled:
+            return await handler(request)
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            info = request.match_info.route.resource
+            route = info.canonical if info is not None else 'unmatched'
+            seconds.labels(server, route, status).observe(time.perf_counter() - started)
+    return middleware
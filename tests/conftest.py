@@ -0,0 +1,9 @@
+"""
+Python tests (pytest) for the multiplayer server and its modules, which
+live at the repository root. The JavaScript game tests are run by vitest.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,86 @@
+"""
+Tests for multiplayer_chess: the server's chess rules
+Run with: python -m pytest tests
+"""
+
+import json
+
+import pytest
+
+from multiplayer_chess import START_FEN, ChessBoard, IllegalMove
+
+
+def client_move(from_row, from_col, to_row, to_col):
+    """What chess-3d.js sends: JSON.stringify({fromRow, fromCol, toRow, toCol})"""
+    return json.dumps({'fromRow': from_row, 'fromCol': from_col, 'toRow': to_row, 'toCol': to_col},
+                      separators=(',', ':'))
+
+
+def test_plays_chess_3d_payload():
+    board = ChessBoard()
+    board.play(client_move(6, 4, 4, 4))  # e2e4
+    board.play('{"fromRow": 1, "fromCol": 4, "toRow": 3, "toCol": 4}')  # e7e5, with spaces
+    assert board.fen() == 'rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2'
+
+
+def test_payload_forms_agree():
+    for move in ('e2e4', {'fromRow': 6, 'fromCol': 4, 'toRow': 4, 'toCol': 4}, client_move(6, 4, 4, 4)):
+        assert ChessBoard().parse_move(move) == ChessBoard().parse_move('e2e4')
+
+
+@pytest.mark.parametrize('move', [
+    client_move(6, 4, 6, 4),  # from == to
+    client_move(6, 4, 3, 4),  # pawn three squares
+    '{"fromRow": 6, "fromCol": 4',  # truncated JSON
+    '{"fromRow": 6}',
+])
+def test_rejects_bad_client_payloads(move):
+    board = ChessBoard()
+    with pytest.raises(IllegalMove):
+        board.play(move)
+    assert board.fen() == START_FEN
+
+
+# Reference node counts (chessprogramming.org "Perft Results"); the deeper
+# levels and throughput live in bench-multiplayer-chess.py
+KIWIPETE = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+
+
+@pytest.mark.parametrize('fen, counts', [
+    (START_FEN, [20, 400, 8902]),
+    (KIWIPETE, [48, 2039, 97862]),
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238]),
+    ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9467]),
+    ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379]),
+    ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10', [46, 2079]),
+], ids=['start', 'kiwipete', 'position3', 'position4', 'position5', 'position6'])
+def test_perft(fen, counts):
+    board = ChessBoard(fen)
+    assert [board.perft(depth) for depth in range(1, len(counts) + 1)] == counts
+    assert board.fen() == fen  # perft unmakes every move it makes
+
+
+@pytest.mark.parametrize('fen, move', [
+    ('4k3/8/8/8/8/8/4r3/4K3 w - - 0 1', 'e1d2'),  # king walks into check
+    ('4k3/4r3/8/8/8/8/4N3/4K3 w - - 0 1', 'e2c3'),  # pinned knight
+    ('4k3/8/8/8/8/8/7P/r3K3 w - - 0 1', 'h2h3'),  # ignores a check
+    ('8/8/8/KPp4r/8/8/8/7k w - c6 0 1', 'b5c6'),  # en passant uncovers the rank
+    ('4kr2/8/8/8/8/8/8/4K2R w K - 0 1', 'e1g1'),  # castles through check
+    ('4k3/4r3/8/8/8/8/8/4K2R w K - 0 1', 'e1g1'),  # castles out of check
+    ('r3k2r/8/8/8/8/8/8/R3K2R w - - 0 1', 'e1g1'),  # no castling rights
+    (START_FEN, 'e1g1'),  # castles through its own pieces
+    (START_FEN, 'e7e5'),  # black piece on white's turn
+    (START_FEN, 'g1g3'),  # not how knights move
+    (START_FEN, 'a1a3'),  # rook through its own pawn
+])
+def test_rejects_illegal_moves(fen, move):
+    board = ChessBoard(fen)
+    with pytest.raises(IllegalMove):
+        board.play(move)
+    assert board.fen() == fen
+
+
+def test_en_passant():
+    board = ChessBoard('8/8/8/KPp5/8/8/8/7k w - c6 0 1')
+    board.play('b5c6')
+    assert board.fen() == '8/8/2P5/K7/8/8/8/7k b - - 0 1'
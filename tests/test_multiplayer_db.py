@@ -0,0 +1,60 @@
+"""
+Tests for multiplayer_db: the packed move history format
+Run with: python -m pytest tests
+"""
+
+import pytest
+
+from multiplayer_db import decode_moves, encode_moves
+
+P1, P2 = 'alice', 'bob'
+
+
+def roundtrip(move_history, player1_id=P1, player2_id=P2):
+    return decode_moves(encode_moves(move_history, player1_id, player2_id), player1_id, player2_id)
+
+
+@pytest.mark.parametrize('move_history', [
+    [],
+    [{'player_id': P1, 'move': 'e2e4', 'timestamp': '2026-10-18T12:00:00.250000'},
+     {'player_id': P2, 'move': 'e7e5', 'timestamp': '2026-10-18T12:00:03'},
+     {'player_id': P1, 'move': 'g1f3', 'timestamp': '2026-10-18T12:00:03.000001'}],
+    # Out of order and far apart: negative and large zigzag deltas
+    [{'player_id': P1, 'move': 1, 'timestamp': '2026-10-18T12:00:00'},
+     {'player_id': P2, 'move': 2, 'timestamp': '2026-10-18T11:59:59.999999'},
+     {'player_id': P1, 'move': 3, 'timestamp': '1970-01-01T00:00:00'},
+     {'player_id': P2, 'move': 4, 'timestamp': '2999-12-31T23:59:59.999999'}],
+    # Time zones: shared offsets use deltas, mixed ones stay inline
+    [{'player_id': P1, 'move': 'a', 'timestamp': '2026-10-18T12:00:00+02:00'},
+     {'player_id': P2, 'move': 'b', 'timestamp': '2026-10-18T12:00:01+02:00'},
+     {'player_id': P1, 'move': 'c', 'timestamp': '2026-10-18T12:00:02'},
+     {'player_id': P2, 'move': 'd', 'timestamp': '2026-10-18T10:00:03+00:00'}],
+    # Timestamps that don't round-trip through datetime are kept verbatim
+    [{'player_id': P1, 'move': 'x', 'timestamp': '2026-10-18T12:00:00.000000'},
+     {'player_id': P2, 'move': 'y', 'timestamp': 1760788800},
+     {'player_id': P1, 'move': 'z', 'timestamp': None},
+     {'player_id': P2, 'move': 'w', 'timestamp': 'yesterday'}],
+    # Unknown, missing, null and non-string movers; extra keys; nested payloads
+    [{'player_id': 'carol', 'move': 'e2e4'},
+     {'move': 'pass'},
+     {'player_id': None, 'move': 'e7e5'},
+     {'player_id': 7, 'move': 'd2d4'},
+     {'player_id': P1, 'move': {'fromRow': 6, 'toRow': 4}, 'san': 'e4', 'timestamp': '2026-10-18T12:00:00'},
+     {'player_id': P2},
+     {}],
+])
+def test_moves_roundtrip(move_history):
+    assert roundtrip(move_history) == move_history
+
+
+def test_moves_roundtrip_without_player_ids():
+    move_history = [{'player_id': None, 'move': 'e2e4'}, {'move': 'e7e5'}]
+    assert roundtrip(move_history, None, None) == move_history
+
+
+def test_long_game_roundtrip():
+    move_history = [
+        {'player_id': (P1, P2)[ply % 2], 'move': ply, 'timestamp': f'2026-10-18T12:{ply // 60:02d}:{ply % 60:02d}'}
+        for ply in range(600)
+    ]
+    assert roundtrip(move_history) == move_history
@@ -0,0 +1,101 @@
+"""
+Tests for multiplayer_journal: crash recovery of games in progress
+Run with: python -m pytest tests
+"""
+
+from multiplayer_journal import GameJournal
+
+PLAYERS = [['p1', 'Alice', 'acct-alice'], ['p2', 'Bob', 'acct-bob']]
+
+
+def journal(tmp_path, **options):
+    game_journal = GameJournal(tmp_path, sync=False, **options)
+    game_journal.recover()
+    game_journal.start()
+    return game_journal
+
+
+def start(game_journal, game_id='g1'):
+    game_journal.record('start', game_id=game_id, game_type='chess', players=PLAYERS,
+                        tokens={'p1': 't1', 'p2': 't2'}, started_at='2026-10-18T12:00:00')
+
+
+def move(game_journal, player_id, uci, game_id='g1'):
+    game_journal.record('move', game_id=game_id, player_id=player_id, move=uci, timestamp=0)
+
+
+def moves(games, game_id='g1'):
+    return [entry['move'] for entry in games[game_id]['moves']]
+
+
+def test_replays_after_restart(tmp_path):
+    game_journal = journal(tmp_path)
+    start(game_journal)
+    move(game_journal, 'p1', 'e2e4')
+    move(game_journal, 'p2', 'e7e5')
+    game_journal.record('rebind', game_id='g1', old_player_id='p1', player_id='p3')
+    start(game_journal, 'g2')
+    game_journal.record('end', game_id='g2')
+    game_journal.close()
+
+    games = GameJournal(tmp_path, sync=False).recover()
+    assert list(games) == ['g1']
+    assert moves(games) == ['e2e4', 'e7e5']
+    assert games['g1']['players'][0] == ['p3', 'Alice', 'acct-alice']
+    assert games['g1']['tokens'] == {'p3': 't1', 'p2': 't2'}
+    assert games['g1']['current_turn'] == 'p3'
+
+
+def test_survives_compaction(tmp_path):
+    game_journal = journal(tmp_path, compact_records=3)
+    start(game_journal)
+    for ply in range(5):
+        move(game_journal, 'p1' if ply % 2 == 0 else 'p2', f'm{ply}')
+    game_journal.close()
+    assert game_journal.compactions >= 1
+
+    assert moves(GameJournal(tmp_path, sync=False).recover()) == [f'm{ply}' for ply in range(5)]
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    game_journal = journal(tmp_path)
+    start(game_journal)
+    move(game_journal, 'p1', 'e2e4')
+    game_journal.close()
+    with open(game_journal.log_path, 'a', encoding='utf-8') as log:
+        log.write('{"op": "move", "game_id": "g1", "pla')  # Crash mid-write
+
+    assert moves(GameJournal(tmp_path, sync=False).recover()) == ['e2e4']
+
+
+def test_writes_after_torn_tail_replay(tmp_path):
+    # The torn record is the first one after the snapshot, so nothing is
+    # replayed from the log; later records must still not be appended to it
+    game_journal = journal(tmp_path, compact_records=2)
+    start(game_journal)
+    move(game_journal, 'p1', 'e2e4')
+    game_journal.close()
+    with open(game_journal.log_path, 'a', encoding='utf-8') as log:
+        log.write('{"op": "move", "game_id": "g1", "pla')
+
+    game_journal = journal(tmp_path)
+    move(game_journal, 'p2', 'e7e5')
+    move(game_journal, 'p1', 'g1f3')
+    game_journal.close()
+
+    assert moves(GameJournal(tmp_path, sync=False).recover()) == ['e2e4', 'e7e5', 'g1f3']
+
+
+def test_record_without_newline_is_kept(tmp_path):
+    game_journal = journal(tmp_path)
+    start(game_journal)
+    move(game_journal, 'p1', 'e2e4')
+    game_journal.close()
+    log_bytes = game_journal.log_path.read_bytes()
+    game_journal.log_path.write_bytes(log_bytes.rstrip(b'\n'))  # Crash just before the newline
+
+    game_journal = journal(tmp_path)
+    move(game_journal, 'p2', 'e7e5')
+    game_journal.close()
+
+    assert moves(GameJournal(tmp_path, sync=False).recover()) == ['e2e4', 'e7e5']
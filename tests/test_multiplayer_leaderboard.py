@@ -0,0 +1,49 @@
+"""
+Tests for multiplayer_leaderboard: the in-memory ranked boards
+Run with: python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+from multiplayer_leaderboard import RankedBoard, RankIndex, league_sort_key
+
+
+def test_rank_index_matches_sorted_list():
+    rng = random.Random(7)
+    index, expected = RankIndex(), []
+    for step in range(5000):
+        if expected and rng.random() < 0.45:
+            key = expected.pop(rng.randrange(len(expected)))
+            index.remove(key)
+        else:
+            key = (rng.randrange(100), step)
+            expected.append(key)
+            index.insert(key)
+        if step % 250 == 0:
+            expected.sort()
+            assert len(index) == len(expected)
+            assert list(index.first(len(expected) + 1)) == expected
+            assert [index.rank(key) for key in expected] == list(range(1, len(expected) + 1))
+    assert index.rank((-1, -1)) is None
+    with pytest.raises(KeyError):
+        index.remove((-1, -1))
+
+
+def standing(player_id, points, games=1, win_rate=50.0):
+    return {'player_id': player_id, 'points': points, 'win_rate': win_rate, 'total_games': games}
+
+
+def test_ranked_board_moves_players():
+    board = RankedBoard(league_sort_key, lambda row: row['total_games'] > 0)
+    for player_id, points in (('a', 10), ('b', 30), ('c', 20)):
+        board.update(standing(player_id, points))
+    assert [row['player_id'] for row in board.top(10)] == ['b', 'c', 'a']
+    assert board.top(0) == [] and board.top(-1) == []
+
+    board.update(standing('a', 40))
+    assert [board.rank(player_id) for player_id in 'abc'] == [1, 2, 3]
+    board.update(standing('b', 30, games=0))  # Dropped from the table
+    assert board.rank('b') is None and len(board) == 2
+    assert [row['player_id'] for row in board.top(1)] == ['a']
@@ -0,0 +1,85 @@
+"""
+Tests for multiplayer_matchmaking: rating buckets and search widening
+Run with: python -m pytest tests
+"""
+
+from multiplayer_matchmaking import Matchmaker
+
+
+def matchmaker():
+    return Matchmaker(bucket_width=100, widen_every=5.0, max_widen=3)
+
+
+def test_pairs_within_bucket_at_once():
+    mm = matchmaker()
+    assert mm.enqueue('a', 'chess', 1010, now=0) is None
+    assert mm.enqueue('b', 'chess', 1090, now=1) == 'a'
+    assert len(mm) == 0 and 'a' not in mm and 'b' not in mm
+
+
+def test_neighbouring_buckets_wait():
+    mm = matchmaker()
+    assert mm.enqueue('a', 'chess', 1099, now=0) is None
+    assert mm.enqueue('b', 'chess', 1100, now=0) is None  # 1 point apart, different buckets
+    assert len(mm) == 2
+
+
+def test_oldest_in_bucket_goes_first():
+    mm = matchmaker()
+    mm.enqueue('a', 'chess', 1000, now=0)
+    mm.enqueue('b', 'go', 1000, now=1)
+    mm.enqueue('c', 'chess', 1500, now=2)
+    assert mm.enqueue('d', 'chess', 1050, now=3) == 'a'
+    mm.enqueue('e', 'chess', 1020, now=4)
+    assert mm.enqueue('f', 'chess', 1030, now=5) == 'e'
+    assert mm.enqueue('g', 'chess', 1510, now=6) == 'c'
+
+
+def test_game_types_are_separate():
+    mm = matchmaker()
+    mm.enqueue('a', 'chess', 1000, now=0)
+    assert mm.enqueue('b', 'go', 1000, now=0) is None
+    assert mm.tick(now=100) == []  # Widening never crosses game types
+    assert mm.enqueue('c', 'go', 1000, now=100) == 'b'
+    assert mm.stats()['by_game_type'] == {'chess': 1}
+
+
+def test_tick_widens_with_waiting_time():
+    mm = matchmaker()
+    mm.enqueue('a', 'chess', 1000, now=0)
+    mm.enqueue('b', 'chess', 1150, now=0)  # One bucket up
+    mm.enqueue('c', 'chess', 1250, now=0)  # Two buckets up from a
+    assert mm.tick(now=4.9) == []
+    assert mm.tick(now=5.0) == [('a', 'b', 'chess')]
+    assert list(mm.tickets) == ['c']
+
+
+def test_tick_prefers_closest_bucket():
+    mm = matchmaker()
+    mm.enqueue('far', 'chess', 1200, now=0)
+    mm.enqueue('a', 'chess', 1000, now=0)
+    mm.enqueue('near', 'chess', 900, now=1)
+    assert mm.tick(now=11) == [('far', 'a', 'chess')]  # far waited longest; a is 2 buckets off
+    mm.enqueue('b', 'chess', 1000, now=11)
+    assert mm.tick(now=16) == [('near', 'b', 'chess')]
+
+
+def test_widening_is_capped():
+    mm = matchmaker()
+    mm.enqueue('a', 'chess', 1000, now=0)
+    mm.enqueue('b', 'chess', 1400, now=0)  # Four buckets apart, max_widen is 3
+    assert mm.tick(now=1000) == []
+    mm.enqueue('c', 'chess', 1300, now=1000)
+    assert mm.tick(now=1000) == [('a', 'c', 'chess')]
+
+
+def test_cancel_and_requeue():
+    mm = matchmaker()
+    mm.enqueue('a', 'chess', 1000, now=0)
+    assert mm.cancel('a') and not mm.cancel('a')
+    assert mm.enqueue('b', 'chess', 1000, now=1) is None
+    # Re-queueing moves a player to the new game type / bucket
+    mm.enqueue('b', 'go', 1000, now=2)
+    assert mm.enqueue('c', 'chess', 1000, now=3) is None
+    assert mm.enqueue('d', 'go', 1000, now=4) == 'b'
+    assert mm.stats() == {'waiting': 1, 'by_game_type': {'chess': 1}, 'matched': 2, 'avg_wait_seconds': 1.0}
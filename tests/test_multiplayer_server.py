@@ -0,0 +1,96 @@
+"""
+Tests for multiplayer-server.py message handling
+The server module is loaded fresh for each test inside a temporary
+directory (its database goes to data/ there), with sends and database
+saves captured instead of performed.
+Run with: python -m pytest tests
+"""
+
+import asyncio
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SERVER_PATH = Path(__file__).resolve().parent.parent / 'multiplayer-server.py'
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('SERVER_METRICS', 'off')
+    spec = importlib.util.spec_from_file_location('multiplayer_server', SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.sent = []  # (player_id, message)
+    module.saved = []  # persist_game() keyword arguments
+
+    async def send_to_player(player_id, message):
+        module.sent.append((player_id, message))
+
+    async def persist_game(**game):
+        module.saved.append(game)
+
+    monkeypatch.setattr(module, 'send_to_player', send_to_player)
+    monkeypatch.setattr(module, 'persist_game', persist_game)
+    yield module
+    if module.db_writer:
+        module.db_writer.close()
+
+
+def start_game(server, game_type='chess'):
+    game = server.GameState('g1', 'white', 'black', game_type, {'white': 'Alice', 'black': 'Bob'})
+    game.started_at = game.created_at
+    game.spectators.add('watcher')
+    server.games['g1'] = game
+    return game
+
+
+def messages_to(server, player_id):
+    return [message for recipient, message in server.sent if recipient == player_id]
+
+
+def test_spectator_cannot_end_game(server):
+    start_game(server)
+    asyncio.run(server.handle_game_message('watcher', {'type': 'game_end', 'game_id': 'g1', 'result': 'win'}))
+    assert 'g1' in server.games and server.games['g1'].status == 'active'
+    assert server.saved == []
+    assert messages_to(server, 'white') == [] and messages_to(server, 'black') == []
+    assert messages_to(server, 'watcher')[0]['type'] == 'error'
+
+
+def test_spectator_cannot_chat(server):
+    start_game(server)
+    asyncio.run(server.handle_game_message('watcher', {'type': 'chat', 'game_id': 'g1', 'message': 'resign!'}))
+    assert messages_to(server, 'white') == [] and messages_to(server, 'black') == []
+    assert messages_to(server, 'watcher')[0]['type'] == 'error'
+
+
+def test_players_can_chat_and_end_game(server):
+    start_game(server)
+    asyncio.run(server.handle_game_message('black', {'type': 'chat', 'game_id': 'g1', 'message': 'gg'}))
+    assert messages_to(server, 'white') == [{'type': 'chat', 'game_id': 'g1', 'from': 'Bob', 'message': 'gg'}]
+
+    asyncio.run(server.handle_game_message('black', {'type': 'game_end', 'game_id': 'g1', 'result': 'win'}))
+    assert 'g1' not in server.games
+    assert [game['winner_id'] for game in server.saved] == ['black']
+
+
+def test_token_keeps_account_across_connections(server):
+    token = 'a-secret-browser-token'
+    first = asyncio.run(server.register_player(object(), 'Alice', account_id=server.account_for(token)))
+    second = asyncio.run(server.register_player(object(), 'Alice', account_id=server.account_for(token)))
+    assert first != second  # Connections still get their own routing ids
+    assert server.players[first]['account_id'] == server.players[second]['account_id']
+    assert server.account_for(token) != token  # The secret itself never becomes a public id
+    assert server.account_for('short') is None and server.account_for(None) is None
+    anonymous = asyncio.run(server.register_player(object(), 'Bob'))
+    assert server.players[anonymous]['account_id'] == anonymous
+
+
+def test_results_saved_under_accounts(server):
+    game = start_game(server)
+    game.accounts = {'white': 'acct-alice', 'black': 'acct-bob'}
+    asyncio.run(server.handle_game_message('black', {'type': 'game_end', 'game_id': 'g1', 'result': 'win'}))
+    [saved] = server.saved
+    assert (saved['player1_id'], saved['player2_id'], saved['winner_id']) == ('acct-alice', 'acct-bob', 'acct-bob')